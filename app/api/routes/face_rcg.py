@@ -1,12 +1,73 @@
-from fastapi import APIRouter
+from typing import Union
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel
 
 
 router = APIRouter()
 
 
+class StartRequest(BaseModel):
+    name: str
+    source: Union[str, int]
+
+
+class StopRequest(BaseModel):
+    name: str
+
+
 @router.post("/start")
-def start_record(): ...
+def start_record(request: Request, body: StartRequest):
+    """Starts a background session processing a video file, RTSP URL or camera."""
+    try:
+        return request.app.state.sessions.start(body.name, body.source)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 
 @router.post("/stop")
-def stop_record(): ...
+def stop_record(request: Request, body: StopRequest):
+    """Stops a session and returns its last status."""
+    try:
+        return request.app.state.sessions.stop(body.name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown session {body.name}")
+
+
+@router.get("/sessions")
+def list_sessions(request: Request):
+    """Returns the status, FPS and queue depths of every session."""
+    return request.app.state.sessions.sessions()
+
+
+@router.get("/sessions/{name}")
+def get_session(request: Request, name: str):
+    """Returns the status, FPS and queue depths of a session."""
+    try:
+        return request.app.state.sessions.status(name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown session {name}")
+
+
+@router.websocket("/sessions/{name}/results")
+async def stream_results(websocket: WebSocket, name: str):
+    """Streams the per-frame tracks and faces of a session until it stops."""
+    sessions = websocket.app.state.sessions
+    try:
+        queue = sessions.subscribe(name)
+    except KeyError:
+        await websocket.close(code=1008, reason=f"Unknown session {name}")
+        return
+
+    await websocket.accept()
+    try:
+        while True:
+            message = await queue.get()
+            if message is None:
+                break
+            await websocket.send_json(message)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sessions.unsubscribe(name, queue)
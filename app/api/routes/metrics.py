@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+from app.common.metrics import render_family, render_prometheus
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics(request: Request):
+    """Exposes the service and session metrics in the Prometheus text format."""
+    lines = [render_prometheus()]
+
+    sessions = getattr(request.app.state, "sessions", None)
+    if sessions is not None:
+        statuses = sessions.sessions()
+        lines += render_family(
+            "session_fps",
+            "gauge",
+            (
+                ("session_fps", {"session": status["name"]}, status["fps"])
+                for status in statuses
+            ),
+        )
+        lines += render_family(
+            "session_queue_depth",
+            "gauge",
+            (
+                (
+                    "session_queue_depth",
+                    {"session": status["name"], "stage": stage},
+                    depth,
+                )
+                for status in statuses
+                for stage, depth in status["queue_depths"].items()
+            ),
+        )
+        lines.append("")
+
+    return PlainTextResponse("\n".join(lines), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/health")
+def health(request: Request):
+    """Reports the startup time and the load and warmup time of each model."""
+    models = getattr(request.app.state, "models", None)
+    return {
+        "status": "ok",
+        "startup_ms": getattr(request.app.state, "startup_ms", None),
+        "models": models.stats()["models"] if models is not None else {},
+    }
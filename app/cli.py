@@ -0,0 +1,83 @@
+"""
+Headless processing of video files, as fast as the hardware allows.
+
+    python -m app.cli ./examples/videos/face_detection.mp4 -o tracks.jsonl
+    python -m app.cli archive.mp4 -o tracks.parquet --video annotated.mp4
+"""
+
+import argparse
+import json
+
+from app.core.config import Settings
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("video", help="The video file to process.")
+    parser.add_argument(
+        "-o", "--output", required=True, help="The .jsonl or .parquet results file."
+    )
+    parser.add_argument("--video-output", help="Also write an annotated .mp4 video.")
+    parser.add_argument(
+        "--detect-batch",
+        type=int,
+        default=None,
+        help="Frames per detector call. Defaults to the detector batch size.",
+    )
+    parser.add_argument("--face-workers", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=32)
+    parser.add_argument(
+        "--stride",
+        type=int,
+        default=None,
+        help="Detect every N frames. Defaults to the DETECT_STRIDE setting.",
+    )
+    parser.add_argument(
+        "--face-cache",
+        action="store_true",
+        help="Reuse the faces of a track between frames (one face worker).",
+    )
+    parser.add_argument("--embeddings", action="store_true", help="Write embeddings.")
+    parser.add_argument("--progress", type=float, default=2.0, help="Seconds, 0=off.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    # The models are only imported once the arguments are valid
+    from app.modules import Tracking
+    from app.modules.face_detect.cache import CachedFaceExtractor
+    from app.modules.registry import default_registry, face_extractor
+    from app.pipeline.offline import process_video
+
+    settings = Settings()
+    models = default_registry(settings)
+    models.load_all()
+    extractor = face_extractor(models, settings)
+    if args.face_cache:
+        extractor = CachedFaceExtractor(extractor)
+
+    try:
+        stats = process_video(
+            args.video,
+            detector=models.get("person_detect"),
+            tracker=Tracking(),
+            extractor=extractor,
+            output=args.output,
+            video_output=args.video_output,
+            detect_batch_size=args.detect_batch,
+            face_workers=args.face_workers,
+            queue_size=args.queue_size,
+            detect_stride=args.stride or settings.DETECT_STRIDE,
+            embeddings=args.embeddings,
+            progress_interval=args.progress,
+        )
+    finally:
+        models.close()
+
+    print(json.dumps(stats, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
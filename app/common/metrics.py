@@ -0,0 +1,264 @@
+import bisect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+_current_trace: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "current_trace", default=None
+)
+
+
+class ServiceMetrics:
+    """
+    The call count, error count, latency histogram and payload sizes of one service
+    method. Recording a call costs one lock and one bisect.
+    """
+
+    def __init__(self, service: str, method: str) -> None:
+        self.service = service
+        self.method = method
+        self.calls = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+
+    def observe(self, latency: float, error: bool = False) -> None:
+        """Records one call and its latency in seconds."""
+        idx = bisect.bisect_left(LATENCY_BUCKETS, latency)
+        with self._lock:
+            self.calls += 1
+            self.errors += error
+            self.latency_sum += latency
+            self.buckets[idx] += 1
+
+    def observe_payload(self, sent: int = 0, received: int = 0) -> None:
+        """Records the bytes sent and received by a remote call."""
+        with self._lock:
+            self.bytes_sent += sent
+            self.bytes_received += received
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimates a latency percentile from the histogram.
+
+        Args:
+            q: The percentile, in [0, 1].
+
+        Returns:
+            The estimated latency in seconds, interpolated within its bucket.
+        """
+        with self._lock:
+            buckets = list(self.buckets)
+        total = sum(buckets)
+        if not total:
+            return 0.0
+
+        rank = q * total
+        seen = 0
+        for idx, count in enumerate(buckets):
+            if count and seen + count >= rank:
+                lower = LATENCY_BUCKETS[idx - 1] if idx else 0.0
+                upper = LATENCY_BUCKETS[idx] if idx < len(LATENCY_BUCKETS) else lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return LATENCY_BUCKETS[-1]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "mean_ms": 1000 * self.latency_sum / self.calls if self.calls else 0.0,
+            "p50_ms": 1000 * self.percentile(0.5),
+            "p95_ms": 1000 * self.percentile(0.95),
+            "p99_ms": 1000 * self.percentile(0.99),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+        }
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics of every service, keyed by service name and method, and the
+    free-form counters and gauges of the other components.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[Tuple[str, str], ServiceMetrics] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._gauges: Dict[Tuple[str, Tuple], float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, service: str, method: str = "inference") -> ServiceMetrics:
+        key = (service, method)
+        metrics = self._metrics.get(key)
+        if metrics is None:
+            with self._lock:
+                metrics = self._metrics.setdefault(key, ServiceMetrics(service, method))
+        return metrics
+
+    def all(self) -> List[ServiceMetrics]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        """Adds to a counter, e.g. `increment("bytes_total", 10, kind="raw")`."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        """Sets a gauge to its current value."""
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def counter(self, name: str, **labels: str) -> float:
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def gauge(self, name: str, **labels: str) -> Optional[float]:
+        return self._gauges.get((name, tuple(sorted(labels.items()))))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {f"{m.service}.{m.method}": m.summary() for m in self.all()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def values(self) -> List[Tuple[str, str, Dict[str, str], float]]:
+        """Returns the (type, name, labels, value) of every counter and gauge."""
+        with self._lock:
+            counters = [
+                ("counter", name, dict(labels), value)
+                for (name, labels), value in self._counters.items()
+            ]
+            gauges = [
+                ("gauge", name, dict(labels), value)
+                for (name, labels), value in self._gauges.items()
+            ]
+        return sorted(counters + gauges, key=lambda item: item[1])
+
+
+REGISTRY = MetricsRegistry()
+
+
+def _labels(metrics: ServiceMetrics, **extra: str) -> Dict[str, str]:
+    return {"service": metrics.service, "method": metrics.method, **extra}
+
+
+def render_family(
+    name: str, kind: str, samples: Iterable[Tuple[str, Dict[str, Any], Any]]
+) -> List[str]:
+    """
+    Renders one metric family: its `# TYPE` line directly followed by its samples,
+    as the Prometheus text format requires.
+
+    Args:
+        name: The name of the family.
+        kind: The Prometheus type, e.g. 'counter', 'gauge' or 'histogram'.
+        samples: The (sample name, labels, value) of every sample of the family.
+
+    Returns:
+        The lines of the family.
+    """
+    lines = [f"# TYPE {name} {kind}"]
+    for sample, labels, value in samples:
+        text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+        lines.append(f"{sample}{{{text}}} {value}" if text else f"{sample} {value}")
+    return lines
+
+
+def _histogram_samples(metrics: ServiceMetrics) -> Iterator[tuple]:
+    name = "service_latency_seconds"
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), metrics.buckets):
+        cumulative += count
+        yield f"{name}_bucket", _labels(metrics, le=str(bound)), cumulative
+    yield f"{name}_sum", _labels(metrics), metrics.latency_sum
+    yield f"{name}_count", _labels(metrics), metrics.calls
+
+
+def render_prometheus(registry: MetricsRegistry = REGISTRY) -> str:
+    """
+    Renders the service metrics in the Prometheus text exposition format.
+
+    Args:
+        registry: The registry to render. Defaults to the global one.
+
+    Returns:
+        str: The exposition text.
+    """
+    services = registry.all()
+    lines = []
+    for name, kind, attribute in (
+        ("service_calls_total", "counter", "calls"),
+        ("service_errors_total", "counter", "errors"),
+        ("service_bytes_sent_total", "counter", "bytes_sent"),
+        ("service_bytes_received_total", "counter", "bytes_received"),
+    ):
+        lines += render_family(
+            name,
+            kind,
+            ((name, _labels(m), getattr(m, attribute)) for m in services),
+        )
+    lines += render_family(
+        "service_latency_seconds",
+        "histogram",
+        (sample for m in services for sample in _histogram_samples(m)),
+    )
+
+    families: Dict[str, Tuple[str, List[tuple]]] = {}
+    for kind, name, labels, value in registry.values():
+        families.setdefault(name, (kind, []))[1].append((name, labels, value))
+    for name, (kind, samples) in families.items():
+        lines += render_family(name, kind, samples)
+    return "\n".join(lines) + "\n"
+
+
+# ===== TRACE =====
+@contextmanager
+def trace(spans: Optional[Dict[str, float]] = None) -> Iterator[Dict[str, float]]:
+    """
+    Attributes the time spent in every service called within the block.
+
+    Args:
+        spans: The dict receiving the seconds spent per service. A new one if None.
+
+    Yields:
+        The dict of spans, filled as services are called.
+    """
+    spans = {} if spans is None else spans
+    token = _current_trace.set(spans)
+    try:
+        yield spans
+    finally:
+        _current_trace.reset(token)
+
+
+def record_span(name: str, seconds: float) -> None:
+    """Adds time to a span of the current trace, if any."""
+    spans = _current_trace.get()
+    if spans is not None:
+        spans[name] = spans.get(name, 0.0) + seconds
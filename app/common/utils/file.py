@@ -1,8 +1,15 @@
-import cv2
+import asyncio
 import base64
-import httpx
+import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Iterable, Iterator, NamedTuple, Optional
 from urllib.parse import urlparse
 
+import cv2
+import httpx
 import numpy as np
 
 
@@ -45,12 +52,43 @@ def read_image(path_or_url):
         return None
 
 
-def image_to_base64(image, image_format=".jpg"):
+def _encode_params(image_format, quality):
+    if quality is None or image_format.lower() not in (".jpg", ".jpeg"):
+        return []
+    return [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+
+
+def image_to_bytes(image, image_format=".jpg", quality=None):
+    """
+    Encodes an image to compressed bytes.
+
+    Args:
+        image (numpy.ndarray): The image to encode.
+        image_format (str): The target format extension. Defaults to ".jpg".
+        quality (int): The JPEG quality, from 0 to 100. Defaults to OpenCV's 95.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    try:
+        success, buffer = cv2.imencode(
+            image_format, image, _encode_params(image_format, quality)
+        )
+        if not success:
+            raise ValueError("Failed to encode image.")
+        return buffer.tobytes()
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+
+
+def image_to_base64(image, image_format=".jpg", quality=None):
     """
     Encodes an image to a Base64 string.
 
     Args:
         image_path (str): The file path of the image.
+        quality (int): The JPEG quality, from 0 to 100. Defaults to OpenCV's 95.
 
     Returns:
         str: The Base64-encoded string of the image.
@@ -58,7 +96,9 @@ def image_to_base64(image, image_format=".jpg"):
     try:
         # Read the image file
         # Encode the image as a binary buffer
-        _, buffer = cv2.imencode(image_format, image)
+        _, buffer = cv2.imencode(
+            image_format, image, _encode_params(image_format, quality)
+        )
 
         # Convert the binary buffer to a Base64 string
         base64_string = base64.b64encode(buffer).decode("utf-8")
@@ -67,3 +107,242 @@ def image_to_base64(image, image_format=".jpg"):
     except Exception as e:
         print(f"Error: {e}")
         return None
+
+
+# ===== BULK LOADING =====
+class LoadedImage(NamedTuple):
+    """The outcome of loading one source with `load_images`."""
+
+    index: int
+    source: str
+    image: Optional[np.ndarray]
+    error: Optional[Exception] = None
+
+
+class ImageCache:
+    """
+    A least recently used cache of images bounded by their total size in bytes.
+
+    Entries are keyed by URL or path and validated by an ETag (the modification time
+    of local files). They hold either the encoded bytes, compact, or the decoded
+    arrays, which skip decoding but are shared: do not modify them in place.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, decoded: bool = False):
+        """
+        Initializes the ImageCache.
+
+        Args:
+            max_bytes: The maximum total size of the cached images.
+            decoded: Whether to cache the decoded arrays instead of the encoded bytes.
+        """
+        self.max_bytes = max_bytes
+        self.decoded = decoded
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Returns the (etag, value) of a key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, value: Any, etag: Optional[str]) -> None:
+        """Stores the encoded bytes or decoded array of a key."""
+        size = len(value) if isinstance(value, bytes) else value.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= _nbytes(previous[1])
+            self._entries[key] = (etag, value)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= _nbytes(evicted)
+
+
+def _nbytes(value: Any) -> int:
+    return len(value) if isinstance(value, bytes) else value.nbytes
+
+
+def _decode(data: bytes) -> np.ndarray:
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Failed to decode image.")
+    return image
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def _load(
+    source: str,
+    client: httpx.AsyncClient,
+    executor: ThreadPoolExecutor,
+    cache: Optional[ImageCache],
+) -> np.ndarray:
+    """Fetches or reads one source, reusing its cached copy while still valid."""
+    loop = asyncio.get_running_loop()
+    cached = cache.get(source) if cache is not None else None
+    hit = False
+
+    if urlparse(source).scheme in ("http", "https"):
+        headers = {"If-None-Match": cached[0]} if cached and cached[0] else {}
+        response = await client.get(source, headers=headers)
+        hit = response.status_code == 304 and cached is not None
+        if not hit:
+            response.raise_for_status()
+            data, etag = response.content, response.headers.get("etag")
+    else:
+        stat = await loop.run_in_executor(executor, os.stat, source)
+        etag = str(stat.st_mtime_ns)
+        hit = cached is not None and cached[0] == etag
+        if not hit:
+            data = await loop.run_in_executor(executor, _read_file, source)
+
+    if cache is not None:
+        cache.hits += hit
+        cache.misses += not hit
+    if hit:
+        if cache.decoded:
+            return cached[1]
+        data = cached[1]
+
+    image = await loop.run_in_executor(executor, _decode, data)
+    if cache is not None and not hit:
+        cache.put(source, image if cache.decoded else data, etag)
+    return image
+
+
+async def aload_images(
+    sources: Iterable[str],
+    concurrency: int = 16,
+    cache: Optional[ImageCache] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    timeout: float = 10.0,
+    decode_workers: Optional[int] = None,
+) -> AsyncIterator[LoadedImage]:
+    """
+    Loads images from URLs and local paths concurrently, yielding them as they
+    complete.
+
+    Args:
+        sources: The URLs and paths, possibly a lazy iterable.
+        concurrency: The maximum number of images fetched or decoded at once.
+        cache: An optional ImageCache reused across calls.
+        client: An existing async HTTP client to share. It is not closed here.
+        timeout: The timeout in seconds of each request of the owned client.
+        decode_workers: The number of decoding threads. Defaults to the
+            ThreadPoolExecutor default.
+
+    Yields:
+        LoadedImage: The index and source of each image, with its BGR array or the
+        error that prevented loading it. The order is the completion order.
+
+    Raises:
+        Exception: The error raised by the `sources` iterable itself.
+    """
+    owns_client = client is None
+    if owns_client:
+        client = httpx.AsyncClient(
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=concurrency, max_keepalive_connections=concurrency
+            ),
+        )
+    executor = ThreadPoolExecutor(max_workers=decode_workers)
+    pending = enumerate(sources)
+    results: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+
+    closing = False
+
+    async def worker() -> None:
+        failure = None
+        try:
+            # the workers share the iterator, so at most `concurrency` loads run at once
+            for index, source in pending:
+                try:
+                    image, error = await _load(source, client, executor, cache), None
+                except Exception as e:
+                    image, error = None, e
+                await results.put(LoadedImage(index, source, image, error))
+        except Exception as e:
+            failure = e  # the sources iterable raised
+        finally:
+            # the end of a worker, or its failure, unless the consumer is gone
+            if not closing:
+                await results.put(failure)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        finished = 0
+        while finished < len(tasks):
+            item = await results.get()
+            if isinstance(item, LoadedImage):
+                yield item
+                continue
+            finished += 1
+            if item is not None:
+                raise item
+    finally:
+        closing = True
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        executor.shutdown(wait=False)
+        if owns_client:
+            await client.aclose()
+
+
+def load_images(sources: Iterable[str], **kwargs) -> Iterator[LoadedImage]:
+    """
+    Synchronous version of `aload_images`, running the loader in a background event
+    loop. Accepts the same keyword arguments.
+
+    Yields:
+        LoadedImage: The loaded images, in completion order.
+    """
+    out: queue.Queue = queue.Queue(maxsize=kwargs.get("concurrency", 16))
+    stop = threading.Event()
+    done = object()
+    errors = []
+
+    async def consume() -> None:
+        # the handoff blocks in a thread, never in the event loop of the loader
+        loop = asyncio.get_running_loop()
+        try:
+            async for item in aload_images(sources, **kwargs):
+                if stop.is_set():
+                    break
+                await loop.run_in_executor(None, out.put, item)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            await loop.run_in_executor(None, out.put, done)
+
+    thread = threading.Thread(target=asyncio.run, args=(consume(),), daemon=True)
+    thread.start()
+    try:
+        while (item := out.get()) is not done:
+            yield item
+        if errors:
+            raise errors[0]
+    finally:
+        # unblock the loader if the caller stopped early, then let it clean up
+        stop.set()
+        while item is not done:
+            item = out.get()
+        thread.join()
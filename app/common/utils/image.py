@@ -1,7 +1,22 @@
 import cv2
+import numpy as np
 
 
 # ===== BOX =====
+def xyxy_to_xywh_batch(boxes):
+    """
+    Converts bounding boxes from (x_min, y_min, x_max, y_max) format to (x, y, width, height) format.
+
+    Args:
+        boxes (array-like): An (N, 4) array of boxes; extra columns are ignored.
+
+    Returns:
+        numpy.ndarray: An (N, 4) array of boxes.
+    """
+    boxes = np.asarray(boxes)[..., :4]
+    return np.concatenate([boxes[..., :2], boxes[..., 2:4] - boxes[..., :2]], axis=-1)
+
+
 def xyxy_to_xywh(xyxy):
     """
     Converts a bounding box from (x_min, y_min, x_max, y_max) format to (x, y, width, height) format.
@@ -12,10 +27,97 @@ def xyxy_to_xywh(xyxy):
     Returns:
         tuple: A tuple (x, y, width, height).
     """
-    x_min, y_min, x_max, y_max = xyxy
-    width = x_max - x_min
-    height = y_max - y_min
-    return (x_min, y_min, width, height)
+    return tuple(xyxy_to_xywh_batch(np.asarray(xyxy)[None, :4])[0].tolist())
+
+
+def clip_boxes(boxes, image_shape):
+    """
+    Converts bounding boxes to integers and clips them to the image boundaries.
+
+    Args:
+        boxes (array-like): An (N, 4) array of (x_min, y_min, x_max, y_max) boxes.
+        image_shape (tuple): The (height, width, ...) shape of the image.
+
+    Returns:
+        numpy.ndarray: An (N, 4) integer array of clipped boxes.
+    """
+    boxes = np.asarray(boxes)[..., :4].astype(int)
+    height, width = image_shape[:2]
+    limits = np.array([width, height, width, height])
+    return np.clip(boxes, 0, limits)
+
+
+def crop_images(image, boxes):
+    """
+    Crops several regions of an image in one pass.
+
+    Args:
+        image (numpy.ndarray): The input image as a NumPy array.
+        boxes (array-like): An (N, 4) array of (x_min, y_min, x_max, y_max) boxes.
+
+    Returns:
+        tuple: The list of cropped images, which are views into `image`, and the
+        (N, 4) integer array of clipped boxes used to crop them.
+    """
+    boxes = np.asarray(boxes)
+    if len(boxes) == 0:
+        return [], np.empty((0, 4), dtype=int)
+
+    clipped = clip_boxes(boxes, image.shape)
+    crops = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in clipped.tolist()]
+    return crops, clipped
+
+
+def crop_origins(boxes):
+    """
+    Returns the top-left corners of the crops `crop_images` cuts for some boxes,
+    which are the offsets from the crop to the image coordinates.
+
+    Args:
+        boxes (array-like): An (N, 4+) array of (x_min, y_min, x_max, y_max, ...) boxes.
+
+    Returns:
+        numpy.ndarray: An (N, 2) integer array of (x, y) origins.
+    """
+    return np.maximum(np.asarray(boxes)[..., :2].astype(int), 0)
+
+
+def face_to_frame(face, person_bbox):
+    """
+    Maps a face found in the crop of a person box to the image coordinates.
+
+    Args:
+        face (dict): The face, with its "bbox" and "landmarks" in the crop coordinates.
+        person_bbox (array-like): The person box (x1, y1, x2, y2) the crop was cut from.
+
+    Returns:
+        tuple: The face box (x1, y1, x2, y2) and the list of (x, y) landmarks in the
+        image coordinates, each None when the face has none.
+    """
+    origin = crop_origins(person_bbox)
+    bbox = landmarks = None
+    if face.get("bbox") is not None:
+        bbox = (np.asarray(face["bbox"], dtype=float)[:4] + np.tile(origin, 2)).tolist()
+    if face.get("landmarks") is not None and len(face["landmarks"]):
+        points = np.asarray(face["landmarks"], dtype=float).reshape(-1, 2) + origin
+        landmarks = [tuple(point) for point in points.tolist()]
+    return bbox, landmarks
+
+
+def largest_boxes(boxes, limit):
+    """
+    Selects the largest boxes.
+
+    Args:
+        boxes (array-like): An (N, 4+) array of (x_min, y_min, x_max, y_max, ...) boxes.
+        limit (int): The number of boxes to keep.
+
+    Returns:
+        numpy.ndarray: The indices of the `limit` largest boxes, in input order.
+    """
+    boxes = np.asarray(boxes, dtype=float).reshape(len(boxes), -1)[:, :4]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return np.sort(np.argsort(-areas, kind="stable")[:limit])
 
 
 def crop_image(image, bbox):
@@ -30,18 +132,30 @@ def crop_image(image, bbox):
     Returns:
         numpy.ndarray: The cropped image.
     """
-    # Convert bounding box to integers
-    x_min, y_min, x_max, y_max = map(int, bbox)
+    crops, _ = crop_images(image, np.asarray(bbox)[None, :4])
+    return crops[0]
 
-    # Ensure the coordinates are within the image boundaries
-    x_min = max(0, x_min)
-    y_min = max(0, y_min)
-    x_max = min(image.shape[1], x_max)
-    y_max = min(image.shape[0], y_max)
 
-    # Crop the image
-    cropped_image = image[y_min:y_max, x_min:x_max]
-    return cropped_image
+def adjust_bboxes(person_boxes, face_boxes):
+    """
+    Aligns each face bounding box with its person bounding box by shifting it to the
+    center of the person bounding box.
+
+    Args:
+        person_boxes (array-like): An (N, 4) array of person boxes (x1, y1, x2, y2).
+        face_boxes (array-like): An (N, 4) array of face boxes (x1, y1, x2, y2).
+
+    Returns:
+        numpy.ndarray: An (N, 4) array of adjusted face boxes.
+    """
+    person_boxes = np.asarray(person_boxes, dtype=float)[..., :4]
+    face_boxes = np.asarray(face_boxes, dtype=float)[..., :4]
+
+    person_centers = (person_boxes[..., :2] + person_boxes[..., 2:]) / 2
+    face_centers = (face_boxes[..., :2] + face_boxes[..., 2:]) / 2
+    shift = person_centers - face_centers
+
+    return face_boxes + np.concatenate([shift, shift], axis=-1)
 
 
 def adjust_bbox(person_bbox, face_bbox):
@@ -56,28 +170,35 @@ def adjust_bbox(person_bbox, face_bbox):
     Returns:
         list: Adjusted face bounding box (x1, y1, x2, y2).
     """
+    return adjust_bboxes(
+        np.asarray(person_bbox)[None, :4], np.asarray(face_bbox)[None, :4]
+    )[0].tolist()
+
 
-    # Calculate center of person bounding box
-    person_center_x = (person_bbox[0] + person_bbox[2]) / 2
-    person_center_y = (person_bbox[1] + person_bbox[3]) / 2
+def reproject_landmarks(landmarks, source_boxes, target_boxes):
+    """
+    Maps landmarks from their source face boxes onto target face boxes, keeping
+    their position relative to the box.
 
-    # Calculate center of face bounding box
-    face_center_x = (face_bbox[0] + face_bbox[2]) / 2
-    face_center_y = (face_bbox[1] + face_bbox[3]) / 2
+    Args:
+        landmarks (array-like): An (N, K, 2) array of landmark coordinates (x, y).
+        source_boxes (array-like): An (N, 4) array of the boxes the landmarks are in.
+        target_boxes (array-like): An (N, 4) array of the boxes to map them onto.
 
-    # Calculate shift amounts
-    x_shift = person_center_x - face_center_x
-    y_shift = person_center_y - face_center_y
+    Returns:
+        numpy.ndarray: An (N, K, 2) array of re-projected landmarks.
+    """
+    landmarks = np.asarray(landmarks, dtype=float)
+    source_boxes = np.asarray(source_boxes, dtype=float)[..., None, :4]
+    target_boxes = np.asarray(target_boxes, dtype=float)[..., None, :4]
 
-    # Shift face bounding box coordinates
-    aligned_face_bbox = [
-        face_bbox[0] + x_shift,
-        face_bbox[1] + y_shift,
-        face_bbox[2] + x_shift,
-        face_bbox[3] + y_shift,
-    ]
+    source_origin, target_origin = source_boxes[..., :2], target_boxes[..., :2]
+    source_size = source_boxes[..., 2:] - source_origin
+    target_size = target_boxes[..., 2:] - target_origin
 
-    return aligned_face_bbox
+    # Normalize landmark coordinates to [0, 1] range within the source box
+    normalized = (landmarks - source_origin) / source_size
+    return normalized * target_size + target_origin
 
 
 def adjust_landmarks(landmarks, face_bbox):
@@ -91,22 +212,11 @@ def adjust_landmarks(landmarks, face_bbox):
     Returns:
         list: Adjusted landmark coordinates.
     """
-    face_width = face_bbox[2] - face_bbox[0]
-    face_height = face_bbox[3] - face_bbox[1]
-
-    adjusted_landmarks = []
-    for x, y in landmarks:
-        # Normalize landmark coordinates to [0, 1] range within the face bbox
-        normalized_x = (x - face_bbox[0]) / face_width
-        normalized_y = (y - face_bbox[1]) / face_height
-
-        # Adjust landmarks based on the new face bbox position (assuming aligned)
-        adjusted_x = normalized_x * face_width + face_bbox[0]
-        adjusted_y = normalized_y * face_height + face_bbox[1]
-
-        adjusted_landmarks.append((adjusted_x, adjusted_y))
-
-    return adjusted_landmarks
+    if len(landmarks) == 0:
+        return []
+    face_bbox = np.asarray(face_bbox)[None, :4]
+    adjusted = reproject_landmarks(np.asarray(landmarks)[None], face_bbox, face_bbox)
+    return [tuple(point) for point in adjusted[0].tolist()]
 
 
 def draw_bounding_box(
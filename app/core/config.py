@@ -1,8 +1,57 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
-import torch
 
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="my_prefix_")
 
-    DEVICE: str = "cuda" if torch.cuda.is_available() else "cpu"
+    # None lets each backend pick its device, so loading the settings never needs
+    # torch (the ONNX backend runs without it)
+    DEVICE: Optional[str] = None
+
+    PERSON_MODEL_PATH: str = "./weights/yolo11n.pt"
+    PERSON_THRESHOLD: float = 0.75
+    # 'torch', or 'onnx' to run the detector through ONNX Runtime on CPU
+    PERSON_BACKEND: str = "torch"
+    PERSON_INT8: bool = False
+    ONNX_INTRA_OP_THREADS: int = 0
+    ONNX_INTER_OP_THREADS: int = 0
+    # A comma-separated list balances the requests over several replicas
+    INSIGHTFACE_URL: str = "http://0.0.0.0:18080/extract"
+    # Seconds after which a face extraction request fails, hedging included
+    INSIGHTFACE_DEADLINE: float = 5.0
+    # Resend the requests slower than the p95 latency to a second replica
+    INSIGHTFACE_HEDGE: bool = True
+    # 'remote' (insightface), 'local' (in-process MediaPipe, no embeddings), or
+    # 'routed' (MediaPipe first, insightface only for the crops with a face)
+    FACE_BACKEND: str = "remote"
+    FACE_MODEL_PATH: str = "./weights/blaze_face_short_range.tflite"
+    # Only the top FACE_ROI_HEAD_RATIO of a person box is sent for face extraction,
+    # downsized to FACE_ROI_MAX_SIDE pixels (0 keeps the full resolution)
+    FACE_ROI_HEAD_RATIO: float = 0.5
+    FACE_ROI_MAX_SIDE: int = 320
+    FACE_JPEG_QUALITY: int = 90
+    # When above 0, only the sharpest crop of each track is sent every
+    # FACE_SELECTION_WINDOW frames, instead of caching the results per track
+    FACE_SELECTION_WINDOW: int = 0
+    # The crops of every stream are sent together, in batches of up to
+    # FACE_BATCH_SIZE crops waiting at most FACE_BATCH_WAIT seconds, with at most
+    # FACE_BATCH_CONCURRENCY requests in flight (0 disables the shared batching)
+    FACE_BATCH_SIZE: int = 16
+    FACE_BATCH_WAIT: float = 0.005
+    FACE_BATCH_CONCURRENCY: int = 4
+
+    # Person detection runs every DETECT_STRIDE frames, the tracker predicts the others
+    DETECT_STRIDE: int = 1
+    # Also detect early when the number of tracks changes or they move fast
+    DETECT_ADAPTIVE: bool = False
+    # Mean box displacement, relative to the box height, triggering a detection
+    DETECT_MOTION_THRESHOLD: float = 0.1
+
+    # When above 0, the frame latency the pipelines keep under by degrading their
+    # quality (detector input size and threshold, face lookups, crop size)
+    TARGET_LATENCY_MS: float = 0
+
+    # Run a dummy inference through every model when the app starts
+    WARMUP_MODELS: bool = True
@@ -1,13 +1,80 @@
-from typing import Any
+import functools
+import inspect
+import time
+from typing import Any, Callable
 from abc import ABC, abstractmethod
 
+from app.common.metrics import REGISTRY, ServiceMetrics, record_span
+
+# The methods of a service that are timed and counted automatically
+INSTRUMENTED_METHODS = ("inference", "inference_batch")
+
+
+def _instrument(fn: Callable, method: str) -> Callable:
+    """Wraps a service method to record its latency, errors and trace span."""
+
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def async_wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            error = False
+            try:
+                return await fn(self, *args, **kwargs)
+            except BaseException:
+                error = True
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                self.metrics_for(method).observe(elapsed, error)
+                record_span(self.name, elapsed)
+
+        async_wrapper._instrumented = True
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        error = False
+        try:
+            return fn(self, *args, **kwargs)
+        except BaseException:
+            error = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.metrics_for(method).observe(elapsed, error)
+            record_span(self.name, elapsed)
+
+    wrapper._instrumented = True
+    return wrapper
+
 
 class ServiceInterface(ABC):
-    """An abstract base class for defining service interfaces."""
+    """An abstract base class for defining service interfaces.
+
+    The `inference` and `inference_batch` methods of every subclass are instrumented:
+    their calls, errors and latencies are recorded in the metrics registry under the
+    service name, and their duration is added to the current per-frame trace.
+    """
 
     def __init__(self, name: str = "undefined"):
         self.name = name
 
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        for method in INSTRUMENTED_METHODS:
+            fn = cls.__dict__.get(method)
+            if fn is None or getattr(fn, "_instrumented", False):
+                continue
+            if getattr(fn, "__isabstractmethod__", False):
+                continue
+            setattr(cls, method, _instrument(fn, method))
+
+    def metrics_for(self, method: str = "inference") -> ServiceMetrics:
+        """Returns the metrics of one method of this service."""
+        return REGISTRY.get(self.name, method)
+
     @abstractmethod
     def inference(self, payload: Any, *args, **kwargs) -> Any:
         """
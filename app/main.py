@@ -0,0 +1,60 @@
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from app.api.routes import face_rcg, metrics
+from app.core.config import Settings
+from app.modules.registry import default_registry, face_extractor
+from app.pipeline import FaceBatcher, StreamManager
+from app.pipeline.sessions import SessionManager
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Loads the models once and owns the processing sessions of the app."""
+    from app.modules import Tracking  # imports boxmot and torch, only when served
+
+    start = time.perf_counter()
+    settings = Settings()
+    models = default_registry(settings)
+    models.load_all()
+    detector = models.get("person_detect")
+    extractor = face_extractor(models, settings)
+    if settings.FACE_BATCH_CONCURRENCY > 0:
+        extractor = FaceBatcher(
+            extractor,
+            max_batch_size=settings.FACE_BATCH_SIZE,
+            max_wait=settings.FACE_BATCH_WAIT,
+            max_concurrency=settings.FACE_BATCH_CONCURRENCY,
+        )
+    sessions = SessionManager(
+        lambda sink: StreamManager(
+            detector=detector,
+            tracker_factory=Tracking,
+            extractor=extractor,
+            sink=sink,
+            detect_stride=settings.DETECT_STRIDE,
+            adaptive_stride=settings.DETECT_ADAPTIVE,
+            face_selection_window=settings.FACE_SELECTION_WINDOW,
+            target_latency=settings.TARGET_LATENCY_MS / 1000,
+        )
+    )
+
+    app.state.settings = settings
+    app.state.models = models
+    app.state.sessions = sessions
+    app.state.startup_ms = 1000 * (time.perf_counter() - start)
+    print(f"Started in {app.state.startup_ms:.0f} ms: {models.stats()['models']}")
+    try:
+        yield
+    finally:
+        sessions.close()
+        if isinstance(extractor, FaceBatcher):
+            extractor.close()
+        models.close()
+
+
+app = FastAPI(title="Face Recognition", lifespan=lifespan)
+app.include_router(face_rcg.router)
+app.include_router(metrics.router)
@@ -1,5 +1,24 @@
-from app.modules.face_detect.insightface import FaceInsightExtractor
-from app.modules.human_detect.person_detection import PersonDetect
-from app.modules.tracking.ocsort_tracker import Tracking
+import importlib
 
-__all__ = [FaceInsightExtractor, PersonDetect, Tracking]
+# The heavy dependencies (ultralytics, boxmot, httpx) are only imported when a
+# service is first accessed, so importing `app.modules` stays cheap.
+_LAZY = {
+    "FaceInsightExtractor": "app.modules.face_detect.insightface",
+    "PersonDetect": "app.modules.human_detect.person_detection",
+    "Tracking": "app.modules.tracking.ocsort_tracker",
+}
+
+__all__ = ["FaceInsightExtractor", "PersonDetect", "Tracking"]
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,275 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.common.utils.image import clip_boxes, crop_images, largest_boxes
+from app.interface import ServiceInterface
+
+
+class _CacheEntry:
+    __slots__ = ("bbox", "faces", "prob", "frame_idx", "timestamp", "last_seen")
+
+    def __init__(self, bbox, faces, prob, frame_idx, timestamp):
+        self.bbox = bbox
+        self.faces = faces
+        self.prob = prob
+        self.frame_idx = frame_idx
+        self.timestamp = timestamp
+        self.last_seen = frame_idx
+
+
+class FaceResultCache:
+    """
+    Caches the last face result of each track so it can be reused on later frames.
+    """
+
+    def __init__(
+        self,
+        ttl_frames: int = 15,
+        ttl_seconds: float = 1.0,
+        max_scale_change: float = 0.2,
+        min_prob: float = 0.8,
+        max_tracks: int = 512,
+        max_idle_frames: int = 30,
+    ) -> None:
+        """
+        Initializes the FaceResultCache.
+
+        Args:
+            ttl_frames: The number of frames after which a result is refreshed.
+            ttl_seconds: The number of seconds after which a result is refreshed.
+            max_scale_change: The relative change of the person box width or height
+                above which a result is refreshed.
+            min_prob: The face detection probability below which a result is refreshed.
+            max_tracks: The maximum number of tracks kept, least recently used first out.
+            max_idle_frames: The number of frames after which an unseen track is evicted.
+        """
+        self.ttl_frames = ttl_frames
+        self.ttl_seconds = ttl_seconds
+        self.max_scale_change = max_scale_change
+        self.min_prob = min_prob
+        self.max_tracks = max_tracks
+        self.max_idle_frames = max_idle_frames
+
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the cache counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+            "size": len(self._entries),
+        }
+
+    def _is_stale(self, entry: _CacheEntry, bbox, frame_idx: int, now: float) -> bool:
+        if frame_idx - entry.frame_idx >= self.ttl_frames:
+            return True
+        if now - entry.timestamp >= self.ttl_seconds:
+            return True
+        if entry.prob < self.min_prob:
+            return True
+
+        if not (_has_area(entry.bbox) and _has_area(bbox)):
+            return True
+        old_w, old_h = entry.bbox[2] - entry.bbox[0], entry.bbox[3] - entry.bbox[1]
+        new_w, new_h = bbox[2] - bbox[0], bbox[3] - bbox[1]
+        return (
+            abs(new_w / old_w - 1) > self.max_scale_change
+            or abs(new_h / old_h - 1) > self.max_scale_change
+        )
+
+    def get(
+        self, track_id: Any, bbox, frame_idx: int, now: Optional[float] = None
+    ) -> Optional[list]:
+        """
+        Looks up the faces of a track.
+
+        Args:
+            track_id: The track index returned by the tracker.
+            bbox: The current person bounding box (x1, y1, x2, y2).
+            frame_idx: The index of the current frame.
+            now: The current time in seconds. Defaults to `time.monotonic()`.
+
+        Returns:
+            The cached faces re-projected onto the current person box, or None when
+            the track has to be refreshed.
+        """
+        now = time.monotonic() if now is None else now
+        key = int(track_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.last_seen = frame_idx
+            self._entries.move_to_end(key)
+            if not self._is_stale(entry, bbox, frame_idx, now):
+                self.hits += 1
+                return [_reproject(face, entry.bbox, bbox) for face in entry.faces]
+
+        self.misses += 1
+        return None
+
+    def peek(self, track_id: Any, bbox) -> Optional[list]:
+        """
+        Returns the cached faces of a track re-projected onto `bbox`, even if stale,
+        without touching the counters. None when the track has no entry, or when
+        either box is empty.
+        """
+        entry = self._entries.get(int(track_id))
+        if entry is None or not (_has_area(entry.bbox) and _has_area(bbox)):
+            return None
+        return [_reproject(face, entry.bbox, bbox) for face in entry.faces]
+
+    def put(
+        self,
+        track_id: Any,
+        bbox,
+        faces: list,
+        frame_idx: int,
+        now: Optional[float] = None,
+    ) -> None:
+        """
+        Stores the faces extracted from the person crop of a track.
+
+        Args:
+            track_id: The track index returned by the tracker.
+            bbox: The person bounding box the faces were extracted from.
+            faces: The faces, in the person crop coordinates.
+            frame_idx: The index of the current frame.
+            now: The current time in seconds. Defaults to `time.monotonic()`.
+        """
+        now = time.monotonic() if now is None else now
+        key = int(track_id)
+        prob = max((float(face.get("prob", 0.0)) for face in faces), default=0.0)
+        self._entries[key] = _CacheEntry(
+            [float(v) for v in bbox[:4]], faces, prob, frame_idx, now
+        )
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_tracks:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def evict_idle(self, frame_idx: int) -> int:
+        """
+        Removes the tracks that have not been seen for `max_idle_frames` frames.
+
+        Args:
+            frame_idx: The index of the current frame.
+
+        Returns:
+            The number of evicted tracks.
+        """
+        idle = [
+            key
+            for key, entry in self._entries.items()
+            if frame_idx - entry.last_seen > self.max_idle_frames
+        ]
+        for key in idle:
+            del self._entries[key]
+        self.evictions += len(idle)
+        return len(idle)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def _has_area(bbox) -> bool:
+    return bbox[2] > bbox[0] and bbox[3] > bbox[1]
+
+
+def _reproject(face: dict, old_bbox, new_bbox) -> dict:
+    """
+    Rescales a face expressed in the coordinates of an old person crop so that it
+    matches a new person crop of a slightly different size.
+    """
+    sx = (new_bbox[2] - new_bbox[0]) / (old_bbox[2] - old_bbox[0])
+    sy = (new_bbox[3] - new_bbox[1]) / (old_bbox[3] - old_bbox[1])
+    face = dict(face)
+    if face.get("bbox") is not None:
+        x1, y1, x2, y2 = face["bbox"][:4]
+        face["bbox"] = [x1 * sx, y1 * sy, x2 * sx, y2 * sy]
+    if face.get("landmarks") is not None:
+        face["landmarks"] = [[x * sx, y * sy] for x, y in face["landmarks"]]
+    return face
+
+
+class CachedFaceExtractor(ServiceInterface):
+    """
+    A face extraction service that only queries the wrapped extractor for the tracks
+    whose cached result is missing or stale.
+    """
+
+    # Takes the frame and the tracks, see `face_step`
+    per_track = True
+
+    def __init__(
+        self,
+        extractor: Any,
+        cache: Optional[FaceResultCache] = None,
+        name: str = "cached_face_extractor",
+    ) -> None:
+        """
+        Initializes the CachedFaceExtractor.
+
+        Args:
+            extractor: The face extractor providing `inference_batch`.
+            cache: The track cache to use. Defaults to a FaceResultCache.
+            name: The name of the service. Defaults to 'cached_face_extractor'.
+        """
+        super().__init__(name=name)
+        self.extractor = extractor
+        self.cache = cache if cache is not None else FaceResultCache()
+        self.frame_idx = 0
+
+    def inference(
+        self, frame: Any, tracks: Any, max_lookups: Optional[int] = None
+    ) -> List[list]:
+        """
+        Extracts the faces of every tracked person of a frame.
+
+        Args:
+            frame: The current frame.
+            tracks: The tracker output => [[x1, y1, x2, y2, track_idx, conf, cls_idx, 0]]
+            max_lookups: The maximum number of tracks looked up in this frame, the
+                largest first. The other stale tracks keep their last result.
+
+        Returns:
+            A list of face lists aligned with `tracks`, in the person crop coordinates.
+        """
+        now = time.monotonic()
+        # the faces are relative to the crops, which are the boxes clipped to the frame
+        boxes = clip_boxes(np.asarray(tracks).reshape(len(tracks), -1), frame.shape)
+        results: List[Optional[list]] = []
+        for track, box in zip(tracks, boxes):
+            results.append(self.cache.get(track[4], box, self.frame_idx, now))
+
+        missing = [idx for idx, faces in enumerate(results) if faces is None]
+        if max_lookups is not None and len(missing) > max_lookups:
+            keep = set(largest_boxes(boxes[missing], max_lookups).tolist())
+            for position, idx in enumerate(missing):
+                if position not in keep:
+                    results[idx] = self.cache.peek(tracks[idx][4], boxes[idx]) or []
+            missing = [idx for position, idx in enumerate(missing) if position in keep]
+        if missing:
+            crops, _ = crop_images(image=frame, boxes=boxes[missing])
+            for idx, faces in zip(missing, self.extractor.inference_batch(crops)):
+                results[idx] = faces
+                self.cache.put(tracks[idx][4], boxes[idx], faces, self.frame_idx, now)
+
+        self.cache.evict_idle(self.frame_idx)
+        self.frame_idx += 1
+        return results
@@ -1,24 +1,139 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Sequence, Union
+
 import httpx
+import msgpack
+import numpy as np
 
-from app.common.utils.file import image_to_base64
+from app.common.metrics import REGISTRY, ServiceMetrics
+from app.common.utils.file import image_to_base64, image_to_bytes
 from app.interface import ServiceInterface
 
 
+class Replica:
+    """
+    One endpoint of the remote service, with its outstanding requests and its
+    circuit breaker.
+
+    After `failure_threshold` consecutive failures the replica is ejected for
+    `recovery_time` seconds. It then receives requests again: the first success
+    closes the breaker, the next failure ejects it again.
+    """
+
+    __slots__ = ("url", "outstanding", "failures", "open_until", "ejections")
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.outstanding = 0
+        self.failures = 0
+        self.open_until = 0.0
+        self.ejections = 0
+
+    def available(self, now: float) -> bool:
+        return self.open_until <= now
+
+    def record(
+        self, ok: bool, now: float, failure_threshold: int, recovery_time: float
+    ) -> None:
+        """Records the outcome of a request, ejecting the replica when unhealthy."""
+        if ok:
+            self.failures = 0
+            self.open_until = 0.0
+            return
+        self.failures += 1
+        if self.failures >= failure_threshold:
+            self.open_until = now + recovery_time
+            self.ejections += 1
+
+
 class FaceInsightExtractor(ServiceInterface):
     """
     A class for extracting face insights from an image frame using a remote service.
+
+    With several replicas, each request goes to the healthy replica with the fewest
+    outstanding requests. When it has not answered after the p95 request latency, it
+    is hedged to a second replica and the first answer wins.
     """
 
     def __init__(
         self,
-        url: str = "http://0.0.0.0:18080/extract",
+        url: Union[str, Sequence[str]] = "http://0.0.0.0:18080/extract",
         name: str = "insightface_service",
+        max_batch_size: int = 16,
+        max_payload_bytes: int = 8 * 1024 * 1024,
+        timeout: float = 10.0,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 10,
+        client: Optional[Any] = None,
+        use_msgpack: bool = False,
+        jpeg_quality: Optional[int] = None,
+        deadline: Optional[float] = None,
+        hedge: bool = True,
+        hedge_quantile: float = 0.95,
+        hedge_delay: float = 0.1,
+        hedge_min_samples: int = 20,
+        failure_threshold: int = 3,
+        recovery_time: float = 5.0,
     ):
         """
         Initializes the FaceInsightExtractor.
+
+        Args:
+            url: The endpoint of the remote insightface service, or the endpoints of
+                its replicas.
+            name: The name of the service. Defaults to 'insightface_service'.
+            max_batch_size: The maximum number of crops sent in one request.
+            max_payload_bytes: The maximum size of the encoded images sent in one request.
+            timeout: The timeout in seconds applied to each request.
+            max_connections: The maximum number of pooled connections.
+            max_keepalive_connections: The maximum number of idle connections kept alive.
+            client: An existing HTTP client to share. It is not closed by this service.
+            use_msgpack: Whether to send raw JPEG bytes and receive msgpack responses
+                instead of Base64 JSON. Faces are then returned with NumPy arrays.
+            jpeg_quality: The JPEG quality of the encoded crops, from 0 to 100.
+                Defaults to OpenCV's 95.
+            deadline: The maximum number of seconds a request may take, hedge
+                included, after which it fails. Defaults to `timeout`.
+            hedge: Whether to hedge slow requests to a second replica.
+            hedge_quantile: The latency percentile after which a request is hedged.
+            hedge_delay: The hedging delay in seconds used until `hedge_min_samples`
+                requests were observed.
+            hedge_min_samples: The number of requests needed to trust the percentile.
+            failure_threshold: The consecutive failures ejecting a replica.
+            recovery_time: The seconds an ejected replica is left alone.
         """
         super().__init__(name=name)
-        self.url = url
+        urls = [url] if isinstance(url, str) else list(url)
+        if not urls:
+            raise ValueError("At least one insightface URL is needed.")
+        self.url = urls[0]
+        self.replicas = [Replica(replica_url) for replica_url in urls]
+        self.deadline = deadline if deadline is not None else timeout
+        self.hedge = hedge and len(self.replicas) > 1
+        self.hedge_quantile = hedge_quantile
+        self.hedge_delay = hedge_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.hedges = 0
+        self.rejected = 0
+        self._replica_lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # the latencies of the successful requests only, which set the hedging delay
+        self._ok_latency = ServiceMetrics(name, "request_ok")
+        self.max_batch_size = max_batch_size
+        self.max_payload_bytes = max_payload_bytes
+        self.jpeg_quality = jpeg_quality
+        self.timeout = httpx.Timeout(timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self._owns_client = client is None
+        self.client = client if client is not None else self._create_client()
         self.default_params = {
             "threshold": 0.6,
             "extract_ga": True,
@@ -28,8 +143,286 @@ class FaceInsightExtractor(ServiceInterface):
             "embed_only": False,
             "limit_faces": 0,
             "detect_masks": True,
-            "msgpack": False,
+            "msgpack": use_msgpack,
+        }
+
+    def _create_client(self) -> httpx.Client:
+        """Creates the long-lived, pooled HTTP client used for every request."""
+        return httpx.Client(timeout=self.timeout, limits=self.limits)
+
+    def close(self) -> None:
+        """Closes the HTTP client if it is owned by this service."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        if self._owns_client:
+            self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def use_msgpack(self) -> bool:
+        return bool(self.default_params.get("msgpack"))
+
+    def _encode(self, image: Any) -> Any:
+        """Encodes an image as raw bytes (msgpack) or a Base64 string (JSON)."""
+        if self.use_msgpack:
+            return image_to_bytes(image, quality=self.jpeg_quality)
+        return image_to_base64(image, quality=self.jpeg_quality)
+
+    def _post_kwargs(self, images: List[Any]) -> dict:
+        """Builds the request arguments for a list of encoded images."""
+        payload = {"images": {"data": images}, **self.default_params}
+        if self.use_msgpack:
+            return {
+                "content": msgpack.packb(payload, use_bin_type=True),
+                "headers": {
+                    "content-type": "application/msgpack",
+                    "accept": "application/msgpack",
+                },
+            }
+        return {"json": payload}
+
+    def _decode(self, response: httpx.Response) -> Any:
+        """Decodes a response body according to its content type."""
+        if "msgpack" in response.headers.get("content-type", ""):
+            return msgpack.unpackb(response.content, raw=False)
+        return response.json()
+
+    def _faces(self, item: Any) -> list:
+        """Returns the faces of one image result, as NumPy arrays in msgpack mode."""
+        faces = (item or {}).get("faces", [])
+        if self.use_msgpack:
+            faces = [_face_to_arrays(face) for face in faces]
+        return faces
+
+    def _observe_request(
+        self, start: float, response: Optional[httpx.Response], error: bool = False
+    ) -> None:
+        """Records the latency and payload sizes of one HTTP request."""
+        latency = time.perf_counter() - start
+        metrics = self.metrics_for("request")
+        metrics.observe(latency, error)
+        if not error:
+            self._ok_latency.observe(latency)
+        if response is not None:
+            metrics.observe_payload(
+                len(response.request.content), len(response.content)
+            )
+
+    def replica_stats(self) -> List[Dict[str, Any]]:
+        """Returns the outstanding requests and the breaker state of each replica."""
+        now = time.monotonic()
+        with self._replica_lock:
+            return [
+                {
+                    "url": replica.url,
+                    "outstanding": replica.outstanding,
+                    "failures": replica.failures,
+                    "ejected": not replica.available(now),
+                    "ejections": replica.ejections,
+                }
+                for replica in self.replicas
+            ]
+
+    def _pick(self, exclude: Optional[Replica] = None) -> Optional[Replica]:
+        """
+        Reserves the available replica with the fewest outstanding requests.
+
+        Returns:
+            The replica, or None when every candidate is ejected.
+        """
+        now = time.monotonic()
+        with self._replica_lock:
+            candidates = [
+                replica
+                for replica in self.replicas
+                if replica is not exclude and replica.available(now)
+            ]
+            if not candidates:
+                return None
+            replica = min(candidates, key=lambda replica: replica.outstanding)
+            replica.outstanding += 1
+            return replica
+
+    def _release(self, replica: Replica, ok: Optional[bool]) -> None:
+        """Frees a reserved replica and records the outcome, unless `ok` is None."""
+        now = time.monotonic()
+        with self._replica_lock:
+            replica.outstanding -= 1
+            if ok is not None:
+                replica.record(ok, now, self.failure_threshold, self.recovery_time)
+            available = replica.available(now)
+        REGISTRY.set_gauge(
+            "insightface_replica_up", float(available), replica=replica.url
+        )
+
+    def _hedge_after(self) -> float:
+        """
+        The seconds after which a request is hedged to a second replica, from the
+        latencies of the successful requests: failures, often timeouts, would
+        otherwise push the percentile up.
+        """
+        if self._ok_latency.calls < self.hedge_min_samples:
+            return self.hedge_delay
+        return self._ok_latency.percentile(self.hedge_quantile)
+
+    def _attempt_failed(self, replica: Replica, start: float, error: Exception) -> bool:
+        """Records a failed request and returns whether the replica is still healthy."""
+        response = error.response if isinstance(error, httpx.HTTPStatusError) else None
+        self._observe_request(start, response, error=True)
+        print(f"Error getting insights from {replica.url}: {error!r}")
+        # a 4xx is the fault of the request, not of the replica
+        return response is not None and response.status_code < 500
+
+    def _send(
+        self,
+        replica: Replica,
+        kwargs: dict,
+        deadline: float,
+        started: Optional[threading.Event] = None,
+    ) -> Any:
+        """
+        Posts a request to one replica, released however the request ends.
+
+        Args:
+            replica: The replica reserved by `_pick`.
+            kwargs: The body of the request, see `_post_kwargs`.
+            deadline: The `time.monotonic()` time after which the request is useless.
+            started: An event set once the request leaves the queue of the pool.
+
+        Returns:
+            The decoded response body, or None if the request failed, its body could
+            not be decoded or the deadline passed before it started.
+        """
+        if started is not None:
+            started.set()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._release(replica, ok=None)
+            return None
+
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = self.client.post(
+                url=replica.url, timeout=httpx.Timeout(remaining), **kwargs
+            )
+            response.raise_for_status()  # Raise an exception for non-2xx status codes
+            data = self._decode(response)
+            ok = True
+        except (httpx.HTTPError, ValueError) as e:
+            ok = self._attempt_failed(replica, start, e)
+            return None
+        finally:
+            self._release(replica, ok=ok)
+
+        self._observe_request(start, response)
+        return data
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._replica_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.limits.max_connections or 10,
+                        thread_name_prefix=f"{self.name}-request",
+                    )
+        return self._pool
+
+    def _request(self, images: List[Any]) -> Any:
+        """
+        Posts a list of encoded images to the remote service.
+
+        The requests run in a thread pool so the caller gives up at the deadline,
+        the httpx timeouts only bounding each phase of a request.
+
+        Args:
+            images: The encoded images.
+
+        Returns:
+            The decoded response body, or None if the request failed, timed out or
+            every replica is ejected.
+        """
+        kwargs = self._post_kwargs(images)
+        deadline = time.monotonic() + self.deadline
+        replica = self._pick()
+        if replica is None:
+            self.rejected += 1
+            return None
+
+        pool = self._get_pool()
+        started = threading.Event()
+        attempts = {
+            pool.submit(self._send, replica, kwargs, deadline, started): replica
         }
+        pending = set(attempts)
+        try:
+            if self.hedge:
+                # the hedging delay runs from the start of the request, not from its
+                # submission, or the time spent queued would trigger hedges
+                started.wait(timeout=_remaining(deadline))
+                done, pending = wait(
+                    pending, timeout=min(self._hedge_after(), _remaining(deadline))
+                )
+                for future in done:
+                    if future.result() is not None:
+                        return future.result()
+
+                # slow or failed: try a second replica, the first answer wins
+                backup = self._pick(exclude=replica) if _remaining(deadline) else None
+                if backup is not None:
+                    self.hedges += 1
+                    REGISTRY.increment("insightface_hedges_total")
+                    future = pool.submit(self._send, backup, kwargs, deadline)
+                    attempts[future] = backup
+                    pending.add(future)
+
+            while pending:
+                done, pending = wait(
+                    pending, timeout=_remaining(deadline), return_when=FIRST_COMPLETED
+                )
+                if not done:
+                    break  # the deadline passed, the late answers are dropped
+                for future in done:
+                    if future.result() is not None:
+                        return future.result()
+            return None
+        finally:
+            for future, attempt in attempts.items():
+                # an attempt still queued will never run, its replica is freed now
+                if future.cancel():
+                    self._release(attempt, ok=None)
+
+    def _split_batches(self, encoded: List[Any]) -> List[List[int]]:
+        """
+        Groups encoded images into batches honoring the batch size and payload caps.
+
+        Args:
+            encoded: The encoded images; None entries are skipped.
+
+        Returns:
+            A list of batches, each one a list of indices into `encoded`.
+        """
+        batches, current, current_bytes = [], [], 0
+        for idx, image in enumerate(encoded):
+            if image is None:
+                continue
+            size = len(image)
+            if current and (
+                len(current) >= self.max_batch_size
+                or current_bytes + size > self.max_payload_bytes
+            ):
+                batches.append(current)
+                current, current_bytes = [], 0
+            current.append(idx)
+            current_bytes += size
+        if current:
+            batches.append(current)
+        return batches
 
     def inference(self, frame, is_pretty: bool = True) -> list:
         """
@@ -37,22 +430,201 @@ class FaceInsightExtractor(ServiceInterface):
 
         """
 
+        data = self._request([self._encode(frame)])
+        if data is None:
+            return []
+
+        if is_pretty:
+            return self._faces(data.get("data", [{}])[0])
+        else:
+            return data
+
+    def _encode_crops(self, crops: List[Any]) -> List[Any]:
+        """Encodes the non-empty crops, leaving None for the empty ones."""
+        return [
+            self._encode(crop) if crop is not None and crop.size else None
+            for crop in crops
+        ]
+
+    def _collect(self, results: List[list], batch: List[int], data: Any) -> None:
+        """Scatters the faces of a batched response back to their crop positions."""
+        if data is None:
+            return
+        for idx, item in zip(batch, data.get("data", [])):
+            results[idx] = self._faces(item)
+
+    def inference_batch(self, crops: List[Any]) -> List[list]:
+        """
+        Extracts insights from several image crops using as few requests as possible.
+
+        Args:
+            crops: The image crops to process, e.g. every tracked person of a frame.
+
+        Returns:
+            A list of face lists aligned with `crops`. Crops that are empty or whose
+            request failed yield an empty list.
+        """
+        results = [[] for _ in crops]
+        encoded = self._encode_crops(crops)
+
+        for batch in self._split_batches(encoded):
+            data = self._request([encoded[idx] for idx in batch])
+            self._collect(results, batch, data)
+
+        return results
+
+
+def _remaining(deadline: float) -> float:
+    """The seconds left until a `time.monotonic()` deadline, never negative."""
+    return max(0.0, deadline - time.monotonic())
+
+
+def _face_to_arrays(face: dict) -> dict:
+    """
+    Converts the geometry and embedding of a msgpack-decoded face to NumPy arrays.
+
+    Args:
+        face: A face as returned by the remote service.
+
+    Returns:
+        The face with `bbox` and `landmarks` as float32 arrays and `vec` as a float32
+        vector, decoded straight from its buffer when sent as bytes.
+    """
+    face = dict(face)
+    for key in ("bbox", "landmarks"):
+        if face.get(key) is not None:
+            face[key] = np.asarray(face[key], dtype=np.float32)
+    vec = face.get("vec")
+    if isinstance(vec, (bytes, bytearray)):
+        face["vec"] = np.frombuffer(vec, dtype=np.float32)
+    elif vec is not None:
+        face["vec"] = np.asarray(vec, dtype=np.float32)
+    return face
+
+
+class AsyncFaceInsightExtractor(FaceInsightExtractor):
+    """
+    An asynchronous FaceInsightExtractor so many crops and streams can be in flight
+    concurrently from one event loop.
+    """
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """Creates the long-lived, pooled asynchronous HTTP client."""
+        return httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+
+    def close(self) -> None:
+        raise TypeError("Use 'await aclose()' to close an AsyncFaceInsightExtractor.")
+
+    async def aclose(self) -> None:
+        """Closes the HTTP client if it is owned by this service."""
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _send(self, replica: Replica, kwargs: dict, deadline: float) -> Any:
+        start = time.perf_counter()
+        ok: Optional[bool] = False
         try:
-            response = httpx.post(
-                url=self.url,
-                json={
-                    "images": {"data": [image_to_base64(frame)]},
-                    **self.default_params,
-                },
+            remaining = _remaining(deadline)
+            response = await asyncio.wait_for(
+                self.client.post(
+                    url=replica.url, timeout=httpx.Timeout(remaining), **kwargs
+                ),
+                timeout=remaining,
             )
             response.raise_for_status()  # Raise an exception for non-2xx status codes
-        except httpx.HTTPStatusError as e:
-            print(f"Error getting insights: {e}")
-            return []
+            data = self._decode(response)
+            ok = True
+        except (httpx.HTTPError, ValueError, asyncio.TimeoutError) as e:
+            ok = self._attempt_failed(replica, start, e)
+            return None
+        except asyncio.CancelledError:
+            ok = None  # the hedge lost, the replica is not at fault
+            raise
+        finally:
+            self._release(replica, ok=ok)
+
+        self._observe_request(start, response)
+        return data
 
-        data = response.json()
+    async def _request(self, images: List[str]) -> Any:
+        kwargs = self._post_kwargs(images)
+        deadline = time.monotonic() + self.deadline
+        replica = self._pick()
+        if replica is None:
+            self.rejected += 1
+            return None
+        if not self.hedge:
+            return await self._send(replica, kwargs, deadline)
+
+        pending = {asyncio.ensure_future(self._send(replica, kwargs, deadline))}
+        done, pending = await asyncio.wait(
+            pending, timeout=min(self._hedge_after(), _remaining(deadline))
+        )
+        for task in done:
+            if task.result() is not None:
+                return task.result()
+
+        backup = self._pick(exclude=replica)
+        if backup is not None:
+            self.hedges += 1
+            REGISTRY.increment("insightface_hedges_total")
+            pending.add(asyncio.ensure_future(self._send(backup, kwargs, deadline)))
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=_remaining(deadline),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    break
+                for task in done:
+                    if task.result() is not None:
+                        return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+        return None
+
+    async def inference(self, frame, is_pretty: bool = True) -> list:
+        """
+        Extracts insights from an image frame.
+
+        """
+
+        data = await self._request([self._encode(frame)])
+        if data is None:
+            return []
 
         if is_pretty:
-            return data.get("data", [{}])[0].get("faces", [])
+            return self._faces(data.get("data", [{}])[0])
         else:
             return data
+
+    async def inference_batch(self, crops: List[Any]) -> List[list]:
+        """
+        Extracts insights from several image crops, sending the batches concurrently.
+
+        Args:
+            crops: The image crops to process, e.g. every tracked person of a frame.
+
+        Returns:
+            A list of face lists aligned with `crops`.
+        """
+        results = [[] for _ in crops]
+        encoded = self._encode_crops(crops)
+        batches = self._split_batches(encoded)
+
+        responses = await asyncio.gather(
+            *(self._request([encoded[idx] for idx in batch]) for batch in batches)
+        )
+        for batch, data in zip(batches, responses):
+            self._collect(results, batch, data)
+
+        return results
@@ -0,0 +1,111 @@
+import threading
+from typing import Any, List
+
+import cv2
+
+from app.interface import ServiceInterface
+
+
+def _to_faces(detection_result: Any, width: int, height: int) -> List[dict]:
+    """
+    Converts a MediaPipe detection result to the face schema of the insightface
+    service.
+
+    Args:
+        detection_result: The FaceDetectorResult of one image.
+        width: The width of the image, to scale the normalized keypoints.
+        height: The height of the image.
+
+    Returns:
+        A list of faces with `bbox` (x1, y1, x2, y2), `prob` and `landmarks`, in the
+        order right eye, left eye, nose tip, mouth center, right ear, left ear.
+    """
+    faces = []
+    for detection in detection_result.detections:
+        box = detection.bounding_box
+        faces.append(
+            {
+                "bbox": [
+                    box.origin_x,
+                    box.origin_y,
+                    box.origin_x + box.width,
+                    box.origin_y + box.height,
+                ],
+                "prob": float(detection.categories[0].score),
+                "landmarks": [
+                    [point.x * width, point.y * height]
+                    for point in detection.keypoints or []
+                ],
+            }
+        )
+    return faces
+
+
+class MediaPipeFaceDetector(ServiceInterface):
+    """
+    Detects faces in-process on CPU with MediaPipe. It returns boxes, probabilities and
+    landmarks only, without embeddings or attributes.
+    """
+
+    def __init__(
+        self,
+        model_path: str = "./weights/blaze_face_short_range.tflite",
+        name: str = "mediapipe_face",
+        threshold: float = 0.6,
+    ) -> None:
+        """
+        Initializes the MediaPipeFaceDetector.
+
+        Args:
+            model_path: The path to the MediaPipe face detection model.
+            name: The name of the service. Defaults to 'mediapipe_face'.
+            threshold: The minimum detection confidence. Defaults to 0.6, the
+                threshold of the insightface service.
+        """
+        import mediapipe as mp
+        from mediapipe.tasks import python
+        from mediapipe.tasks.python import vision
+
+        super().__init__(name=name)
+        self._mp = mp
+        options = vision.FaceDetectorOptions(
+            base_options=python.BaseOptions(model_asset_path=model_path),
+            min_detection_confidence=threshold,
+        )
+        self.detector = vision.FaceDetector.create_from_options(options)
+        # A MediaPipe task is not safe to call from several threads at once
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self.detector.close()
+
+    def inference(self, frame: Any) -> List[dict]:
+        """
+        Detects the faces of a BGR image.
+
+        Args:
+            frame: The image, e.g. a person crop.
+
+        Returns:
+            A list of faces with `bbox`, `prob` and `landmarks`.
+        """
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        image = self._mp.Image(image_format=self._mp.ImageFormat.SRGB, data=rgb)
+        with self._lock:
+            result = self.detector.detect(image)
+        return _to_faces(result, width=frame.shape[1], height=frame.shape[0])
+
+    def inference_batch(self, crops: List[Any]) -> List[list]:
+        """
+        Detects the faces of several image crops.
+
+        Args:
+            crops: The image crops to process, e.g. every tracked person of a frame.
+
+        Returns:
+            A list of face lists aligned with `crops`. Empty crops yield an empty list.
+        """
+        return [
+            self.inference(crop) if crop is not None and crop.size else []
+            for crop in crops
+        ]
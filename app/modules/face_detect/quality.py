@@ -0,0 +1,245 @@
+import heapq
+import itertools
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from app.common.utils.image import crop_images
+from app.interface import ServiceInterface
+from app.modules.face_detect.cache import _reproject
+
+
+def sharpness(crop: np.ndarray, size: int = 64) -> float:
+    """
+    Returns the variance of the Laplacian of a crop, downsized to `size` pixels wide
+    so that the cost does not depend on the crop size.
+    """
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    if gray.shape[1] > size:
+        height = max(1, round(gray.shape[0] * size / gray.shape[1]))
+        gray = cv2.resize(gray, (size, height), interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def crop_quality(
+    crop: np.ndarray,
+    min_side: int = 64,
+    sharpness_scale: float = 100.0,
+    aspect: float = 2.5,
+    face: Optional[dict] = None,
+) -> float:
+    """
+    Scores how likely a person crop is to yield a good face embedding, in [0, 1].
+
+    The score is the product of a size term, a sharpness term (variance of the
+    Laplacian), an aspect ratio term and, when an earlier face result of the track is
+    known, its probability and frontality.
+
+    Args:
+        crop: The person crop.
+        min_side: The width from which the size term is 1.
+        sharpness_scale: The Laplacian variance at which the sharpness term is 0.5.
+        aspect: The expected height / width ratio of a person crop.
+        face: The last face found for the track, with its `prob` and optional
+            `pose` as (pitch, yaw, roll) in degrees.
+
+    Returns:
+        float: The quality score, 0 for an empty crop.
+    """
+    if crop is None or not crop.size:
+        return 0.0
+    h, w = crop.shape[:2]
+    size = min(1.0, w / min_side)
+    sharp = sharpness(crop)
+    sharp = sharp / (sharp + sharpness_scale)
+    shape = float(np.exp(-abs(np.log((h / w) / aspect))))
+    score = size * sharp * shape
+
+    if face:
+        score *= float(face.get("prob", 1.0))
+        pose = face.get("pose")
+        if pose is not None and len(pose) >= 2:
+            pitch, yaw = float(pose[0]), float(pose[1])
+            score *= max(0.0, np.cos(np.radians(yaw)) * np.cos(np.radians(pitch)))
+    return score
+
+
+class _TrackCandidates:
+    __slots__ = ("heap", "window_start", "faces", "bbox", "last_face", "last_seen")
+
+    def __init__(self, frame_idx: int) -> None:
+        self.heap: List[tuple] = []  # (score, order, crop, bbox), worst first
+        self.window_start = frame_idx
+        self.faces: Optional[list] = None
+        self.bbox = None
+        self.last_face: Optional[dict] = None
+        self.last_seen = frame_idx
+
+
+class BestFrameSelector(ServiceInterface):
+    """
+    A face extraction service that buffers the best crops of each track and only
+    sends the top-K of every time window to the wrapped extractor.
+
+    Between submissions a track gets the faces of its last submission, re-projected
+    onto its current box.
+    """
+
+    # Takes the frame and the tracks, see `face_step`
+    per_track = True
+
+    def __init__(
+        self,
+        extractor: Any,
+        window: int = 30,
+        top_k: int = 1,
+        buffer_size: int = 4,
+        min_quality: float = 0.05,
+        max_idle_frames: int = 30,
+        name: str = "best_frame_selector",
+    ) -> None:
+        """
+        Initializes the BestFrameSelector.
+
+        Args:
+            extractor: The face extractor providing `inference_batch`.
+            window: The number of frames of a selection window.
+            top_k: The number of crops of each track submitted per window.
+            buffer_size: The number of candidate crops kept per track.
+            min_quality: The quality below which a crop is never submitted.
+            max_idle_frames: The number of frames after which an unseen track is
+                forgotten.
+            name: The name of the service. Defaults to 'best_frame_selector'.
+        """
+        super().__init__(name=name)
+        self.extractor = extractor
+        self.window = window
+        self.top_k = top_k
+        self.buffer_size = max(buffer_size, top_k)
+        self.min_quality = min_quality
+        self.max_idle_frames = max_idle_frames
+
+        self._tracks: Dict[int, _TrackCandidates] = {}
+        self._order = itertools.count()
+        self.frame_idx = 0
+        self.crops_seen = 0
+        self.crops_submitted = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the number of crops seen and submitted, and their ratio."""
+        return {
+            "crops_seen": self.crops_seen,
+            "crops_submitted": self.crops_submitted,
+            "submit_ratio": (
+                self.crops_submitted / self.crops_seen if self.crops_seen else 0.0
+            ),
+            "tracks": len(self._tracks),
+        }
+
+    def _offer(self, state: _TrackCandidates, crop: np.ndarray, bbox) -> None:
+        score = crop_quality(crop, face=state.last_face)
+        if score < self.min_quality:
+            return
+        if len(state.heap) == self.buffer_size and score <= state.heap[0][0]:
+            return
+        # the crop is a view of the frame, which the next stages may modify
+        candidate = (score, next(self._order), crop.copy(), bbox)
+        if len(state.heap) < self.buffer_size:
+            heapq.heappush(state.heap, candidate)
+        else:
+            heapq.heapreplace(state.heap, candidate)
+
+    def _due(self, state: _TrackCandidates) -> bool:
+        if not state.heap:
+            return False
+        return state.faces is None or self.frame_idx - state.window_start >= self.window
+
+    def inference(
+        self, frame: Any, tracks: Any, max_lookups: Optional[int] = None
+    ) -> List[list]:
+        """
+        Extracts the faces of every tracked person of a frame.
+
+        Args:
+            frame: The current frame.
+            tracks: The tracker output => [[x1, y1, x2, y2, track_idx, conf, cls_idx, 0]]
+            max_lookups: The maximum number of crops submitted in this frame. The
+                tracks without any result go first, the other due tracks wait.
+
+        Returns:
+            A list of face lists aligned with `tracks`, in the person crop coordinates.
+            Tracks without any submitted crop yet get an empty list.
+        """
+        crops, boxes = crop_images(image=frame, boxes=tracks)
+        self.crops_seen += len(crops)
+
+        keys = [int(track[4]) for track in tracks]
+        for key, crop, bbox in zip(keys, crops, boxes):
+            state = self._tracks.get(key)
+            if state is None:
+                state = self._tracks[key] = _TrackCandidates(self.frame_idx)
+            state.last_seen = self.frame_idx
+            self._offer(state, crop, bbox)
+
+        # submit the best candidates of every due track in one batch
+        due = [
+            self._tracks[key]
+            for key in dict.fromkeys(keys)
+            if self._due(self._tracks[key])
+        ]
+        if max_lookups is not None:
+            due.sort(key=lambda state: state.faces is not None)
+        batch, owners = [], []
+        for state in due:
+            if max_lookups is not None and len(batch) >= max_lookups:
+                break
+            top_k = self.top_k
+            if max_lookups is not None:
+                top_k = min(top_k, max_lookups - len(batch))
+            for _, _, crop, bbox in heapq.nlargest(top_k, state.heap):
+                batch.append(crop)
+                owners.append((state, bbox))
+            state.heap = []
+            state.window_start = self.frame_idx
+        if batch:
+            self.crops_submitted += len(batch)
+            self._collect(owners, self.extractor.inference_batch(batch))
+
+        results = []
+        for key, bbox in zip(keys, boxes):
+            state = self._tracks[key]
+            if not state.faces:
+                results.append([])
+            else:
+                results.append([_reproject(f, state.bbox, bbox) for f in state.faces])
+
+        self._evict_idle()
+        self.frame_idx += 1
+        return results
+
+    def _collect(self, owners: List[tuple], results: List[list]) -> None:
+        """
+        Keeps, for each track, the result whose best face is the most probable. A
+        window without any face keeps the faces of the previous window.
+        """
+        best: Dict[int, float] = {}
+        for (state, bbox), faces in zip(owners, results):
+            face = max(faces, key=lambda f: float(f.get("prob", 0.0)), default=None)
+            if face is None:
+                if state.faces is None:
+                    state.faces, state.bbox = [], bbox
+                continue
+            prob = float(face.get("prob", 0.0))
+            if prob > best.get(id(state), -1.0):
+                best[id(state)] = prob
+                state.faces, state.bbox, state.last_face = faces, bbox, face
+
+    def _evict_idle(self) -> None:
+        idle = [
+            key
+            for key, state in self._tracks.items()
+            if self.frame_idx - state.last_seen > self.max_idle_frames
+        ]
+        for key in idle:
+            del self._tracks[key]
@@ -0,0 +1,174 @@
+from typing import Any, List, Tuple
+
+import cv2
+import numpy as np
+
+from app.common.metrics import REGISTRY
+from app.common.utils.file import image_to_bytes
+from app.interface import ServiceInterface
+
+
+def head_region(crop: np.ndarray, head_ratio: float, width_ratio: float) -> tuple:
+    """
+    Returns the (x0, y0, x1, y1) region of a person crop where the face should be:
+    the top `head_ratio` of its height and the central `width_ratio` of its width.
+    """
+    h, w = crop.shape[:2]
+    roi_w = max(1, int(round(w * width_ratio)))
+    x0 = (w - roi_w) // 2
+    return x0, 0, x0 + roi_w, max(1, int(round(h * head_ratio)))
+
+
+def _map_points(points: Any, region: tuple) -> Any:
+    """
+    Maps (x, y) points from a resized region back to the crop coordinates, with the
+    pixel center alignment of cv2.resize.
+    """
+    x0, y0, sx, sy = region
+    array = np.asarray(points, dtype=np.float32).copy()
+    flat = array.reshape(-1, 2)
+    flat[:] = (flat + 0.5) / (sx, sy) - 0.5 + (x0, y0)
+    return array if isinstance(points, np.ndarray) else array.tolist()
+
+
+def _to_crop(face: dict, region: tuple) -> dict:
+    """Maps a face found in a resized region back to the person crop coordinates."""
+    face = dict(face)
+    if face.get("bbox") is not None:
+        face["bbox"] = _map_points(face["bbox"][:4], region)
+    if face.get("landmarks") is not None and len(face["landmarks"]):
+        face["landmarks"] = _map_points(face["landmarks"], region)
+    return face
+
+
+class FaceRoiExtractor(ServiceInterface):
+    """
+    Narrows every person crop to its head region and downsizes it before handing it
+    to the wrapped face extractor, so less is encoded and sent. The faces are mapped
+    back to the person crop coordinates, like those of any face extractor, and
+    `face_to_frame` maps them to the frame.
+
+    The savings are measured on the JPEG encoded crops and regions, at the quality
+    of the wrapped extractor. Encoding the full crops costs as much as the requests
+    saved, so only one batch out of `measure_every` is measured.
+    """
+
+    def __init__(
+        self,
+        extractor: Any,
+        head_ratio: float = 0.5,
+        width_ratio: float = 1.0,
+        max_side: int = 320,
+        measure_every: int = 10,
+        name: str = "face_roi",
+    ) -> None:
+        """
+        Initializes the FaceRoiExtractor.
+
+        Args:
+            extractor: The face extractor providing `inference_batch`.
+            head_ratio: The top fraction of the person crop height that is kept.
+            width_ratio: The central fraction of the person crop width that is kept.
+            max_side: The maximum side of the region sent, larger ones are downsized.
+                0 disables resizing.
+            measure_every: One batch out of `measure_every` has its encoded sizes
+                measured. 0 disables the measure.
+            name: The name of the service. Defaults to 'face_roi'.
+        """
+        super().__init__(name=name)
+        self.extractor = extractor
+        self.head_ratio = head_ratio
+        self.width_ratio = width_ratio
+        self.max_side = max_side
+        self.measure_every = measure_every
+        self.batches = 0
+        self.measured_crops = 0
+        self.original_bytes = 0
+        self.roi_bytes = 0
+
+    def stats(self) -> dict:
+        """Returns the encoded bytes of the measured crops and of their regions."""
+        original, roi = self.original_bytes, self.roi_bytes
+        return {
+            "measured_crops": self.measured_crops,
+            "original_bytes": original,
+            "roi_bytes": roi,
+            "saved_ratio": 1 - roi / original if original else 0,
+        }
+
+    def narrow(self, crop: np.ndarray) -> Tuple[np.ndarray, tuple]:
+        """
+        Cuts and downsizes the head region of a person crop.
+
+        Args:
+            crop: The person crop.
+
+        Returns:
+            The region to send and its (x0, y0, scale_x, scale_y) placement in the
+            crop. The scales are those of the rounded size, so mapping back is exact.
+        """
+        x0, y0, x1, y1 = head_region(crop, self.head_ratio, self.width_ratio)
+        roi = crop[y0:y1, x0:x1]
+        width, height = x1 - x0, y1 - y0
+        if not self.max_side or max(width, height) <= self.max_side:
+            return roi, (x0, y0, 1.0, 1.0)
+
+        scale = self.max_side / max(width, height)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        roi = cv2.resize(roi, size, interpolation=cv2.INTER_AREA)
+        return roi, (x0, y0, size[0] / width, size[1] / height)
+
+    def inference(self, frame: Any) -> list:
+        return self._extract([frame])[0]
+
+    def inference_batch(self, crops: List[Any]) -> List[list]:
+        """
+        Extracts the faces of the head region of several person crops.
+
+        Args:
+            crops: The person crops.
+
+        Returns:
+            A list of face lists aligned with `crops`, in the person crop coordinates.
+        """
+        return self._extract(crops)
+
+    def _extract(self, crops: List[Any]) -> List[list]:
+        regions, rois = [], []
+        for crop in crops:
+            if crop is None or not crop.size:
+                regions.append(None)
+                rois.append(crop)
+                continue
+            roi, region = self.narrow(crop)
+            regions.append(region)
+            rois.append(roi)
+
+        self.batches += 1
+        if self.measure_every and (self.batches - 1) % self.measure_every == 0:
+            self._measure(crops, rois, regions)
+
+        results = self.extractor.inference_batch(rois)
+        return [
+            [_to_crop(face, region) for face in faces] if region else faces
+            for faces, region in zip(results, regions)
+        ]
+
+    def _measure(self, crops: List[Any], rois: List[Any], regions: List[Any]) -> None:
+        """Records the encoded size of the crops and of the regions cut from them."""
+        quality = getattr(self.extractor, "jpeg_quality", None)
+        original_bytes = roi_bytes = measured = 0
+        for crop, roi, region in zip(crops, rois, regions):
+            if region is None:
+                continue
+            original_bytes += len(image_to_bytes(crop, quality=quality) or b"")
+            roi_bytes += len(image_to_bytes(roi, quality=quality) or b"")
+            measured += 1
+
+        self.measured_crops += measured
+        self.original_bytes += original_bytes
+        self.roi_bytes += roi_bytes
+        REGISTRY.increment(
+            "face_crop_encoded_bytes_total", original_bytes, stage="original"
+        )
+        REGISTRY.increment("face_crop_encoded_bytes_total", roi_bytes, stage="roi")
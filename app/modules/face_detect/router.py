@@ -0,0 +1,95 @@
+from typing import Any, List, Optional
+
+from app.interface import ServiceInterface
+
+# When the remote service is called
+NEVER = "never"  # boxes and landmarks only, from the local detector
+ON_FACE = "on_face"  # only for the crops in which the local detector found a face
+ALWAYS = "always"  # for every crop, the local detector is skipped
+ROUTES = (NEVER, ON_FACE, ALWAYS)
+
+
+class FaceRouter(ServiceInterface):
+    """
+    Detects faces with a local in-process detector and only calls the remote
+    insightface service when embeddings or attributes are actually needed.
+    """
+
+    def __init__(
+        self,
+        local: Any,
+        remote: Any,
+        route: str = ON_FACE,
+        name: str = "face_router",
+    ) -> None:
+        """
+        Initializes the FaceRouter.
+
+        Args:
+            local: The in-process face detector providing `inference_batch`.
+            remote: The face extractor returning embeddings and attributes.
+            route: The default route, one of 'never', 'on_face' or 'always'.
+            name: The name of the service. Defaults to 'face_router'.
+        """
+        if route not in ROUTES:
+            raise ValueError(f"Unknown route '{route}', use one of {ROUTES}.")
+        super().__init__(name=name)
+        self.local = local
+        self.remote = remote
+        self.route = route
+        self.local_crops = 0
+        self.remote_crops = 0
+
+    def stats(self) -> dict:
+        """Returns the number of crops sent to each backend."""
+        return {"local_crops": self.local_crops, "remote_crops": self.remote_crops}
+
+    def inference(self, frame: Any, route: Optional[str] = None) -> list:
+        """
+        Extracts the faces of one image.
+
+        Args:
+            frame: The image to process.
+            route: Overrides the default route for this call.
+
+        Returns:
+            A list of faces.
+        """
+        return self._route([frame], route)[0]
+
+    def inference_batch(self, crops: List[Any], route: Optional[str] = None) -> list:
+        """
+        Extracts the faces of several image crops.
+
+        Args:
+            crops: The image crops to process, e.g. every tracked person of a frame.
+            route: Overrides the default route for this call.
+
+        Returns:
+            A list of face lists aligned with `crops`. The faces come from the remote
+            service when it was called for the crop and found faces, from the local
+            detector otherwise, e.g. when the remote request failed.
+        """
+        return self._route(crops, route)
+
+    def _route(self, crops: List[Any], route: Optional[str]) -> list:
+        route = route or self.route
+        if route == ALWAYS:
+            self.remote_crops += len(crops)
+            return self.remote.inference_batch(crops)
+
+        results = self.local.inference_batch(crops)
+        self.local_crops += len(crops)
+        if route == NEVER:
+            return results
+
+        with_faces = [idx for idx, faces in enumerate(results) if faces]
+        if with_faces:
+            remote = self.remote.inference_batch([crops[idx] for idx in with_faces])
+            self.remote_crops += len(with_faces)
+            for idx, faces in zip(with_faces, remote):
+                # an empty remote result (failed request, ejected replica) keeps the
+                # local faces instead of losing them
+                if faces:
+                    results[idx] = faces
+        return results
@@ -0,0 +1,262 @@
+import glob
+import os
+from typing import Any, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# ultralytics defaults, so both backends return the same boxes
+IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+PAD_VALUE = 114
+PERSON_CLASS = 0
+
+
+def onnx_path(model_path: str, imgsz: int) -> str:
+    """Returns the cache path of the ONNX export of a model."""
+    root, _ = os.path.splitext(model_path)
+    return f"{root}_{imgsz}.onnx"
+
+
+def _is_fresh(path: str, source: str) -> bool:
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source)
+
+
+def export_onnx(model_path: str, imgsz: int = 640) -> str:
+    """
+    Exports YOLO weights to ONNX once, with a dynamic batch and image size.
+
+    Args:
+        model_path: The path to the PyTorch YOLO weights.
+        imgsz: The image size the export is traced at.
+
+    Returns:
+        str: The path of the cached ONNX model, next to the weights.
+    """
+    path = onnx_path(model_path, imgsz)
+    if _is_fresh(path, model_path):
+        return path
+
+    from ultralytics import YOLO
+
+    exported = YOLO(model_path).export(
+        format="onnx", imgsz=imgsz, dynamic=True, simplify=True
+    )
+    os.replace(exported, path)
+    return path
+
+
+def calibration_images(directory: str, limit: int = 64) -> List[np.ndarray]:
+    """Loads up to `limit` images of a directory to calibrate the INT8 model."""
+    paths = sorted(
+        glob.glob(os.path.join(directory, "*.jpg"))
+        + glob.glob(os.path.join(directory, "*.png"))
+    )[:limit]
+    images = [cv2.imread(path) for path in paths]
+    return [image for image in images if image is not None]
+
+
+def quantize_int8(onnx_model: str, images: List[np.ndarray], imgsz: int = 640) -> str:
+    """
+    Statically quantizes an ONNX model to INT8, calibrated on sample images.
+
+    Args:
+        onnx_model: The path to the float ONNX model.
+        images: The BGR calibration images.
+        imgsz: The image size the calibration images are letterboxed to.
+
+    Returns:
+        str: The path of the cached INT8 model.
+    """
+    root, _ = os.path.splitext(onnx_model)
+    path = f"{root}_int8.onnx"
+    if _is_fresh(path, onnx_model):
+        return path
+    if not images:
+        raise ValueError("INT8 quantization needs at least one calibration image.")
+
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        quantize_static,
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    import onnxruntime as ort
+
+    input_name = (
+        ort.InferenceSession(onnx_model, providers=["CPUExecutionProvider"])
+        .get_inputs()[0]
+        .name
+    )
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self) -> None:
+            self._batches: Iterator[dict] = (
+                {input_name: letterbox([image], imgsz)[0]} for image in images
+            )
+
+        def get_next(self) -> Optional[dict]:
+            return next(self._batches, None)
+
+    prepared = f"{root}_prep.onnx"
+    quant_pre_process(onnx_model, prepared)
+    try:
+        quantize_static(
+            prepared, path, _Reader(), quant_format=QuantFormat.QDQ, per_channel=True
+        )
+    finally:
+        os.remove(prepared)
+    return path
+
+
+def letterbox(
+    frames: List[np.ndarray], imgsz: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Resizes frames into padded squares, the way ultralytics does.
+
+    Args:
+        frames: The BGR frames.
+        imgsz: The side of the square model input.
+
+    Returns:
+        The NCHW float32 RGB batch in [0, 1], the scale of each frame and the
+        (x, y) padding of each frame.
+    """
+    batch = np.full((len(frames), imgsz, imgsz, 3), PAD_VALUE, dtype=np.uint8)
+    scales = np.empty(len(frames), dtype=np.float32)
+    pads = np.empty((len(frames), 2), dtype=np.float32)
+    for idx, frame in enumerate(frames):
+        h, w = frame.shape[:2]
+        scale = min(imgsz / h, imgsz / w)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+        pad_x, pad_y = (imgsz - new_w) // 2, (imgsz - new_h) // 2
+        batch[idx, pad_y : pad_y + new_h, pad_x : pad_x + new_w] = cv2.resize(
+            frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR
+        )
+        scales[idx] = scale
+        pads[idx] = pad_x, pad_y
+
+    tensor = batch[..., ::-1].transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor), scales, pads
+
+
+def postprocess(
+    output: np.ndarray,
+    scale: float,
+    pad: np.ndarray,
+    shape: Tuple[int, int],
+    conf: float,
+    iou: float = IOU_THRESHOLD,
+) -> np.ndarray:
+    """
+    Decodes the raw YOLO output of one frame into person boxes.
+
+    Args:
+        output: The (4 + classes, anchors) output of the model for the frame.
+        scale: The letterbox scale of the frame.
+        pad: The (x, y) letterbox padding of the frame.
+        shape: The (height, width) of the original frame.
+        conf: The confidence threshold.
+        iou: The IoU threshold of the non-maximum suppression.
+
+    Returns:
+        np.ndarray: The [x1, y1, x2, y2, confidence, class_index] boxes, as returned
+        by the PyTorch backend.
+    """
+    scores = output[4:]
+    classes = scores.argmax(axis=0)
+    confidences = scores[classes, np.arange(scores.shape[1])]
+    keep = (classes == PERSON_CLASS) & (confidences >= conf)
+    if not keep.any():
+        return np.zeros((0, 6), dtype=np.float32)
+
+    cx, cy, w, h = output[:4, keep]
+    confidences = confidences[keep]
+    xywh = np.stack([cx - w / 2, cy - h / 2, w, h], axis=1)
+    indices = cv2.dnn.NMSBoxes(xywh.tolist(), confidences.tolist(), conf, iou)
+    indices = np.asarray(indices, dtype=int).reshape(-1)[:MAX_DETECTIONS]
+
+    boxes = np.zeros((len(indices), 6), dtype=np.float32)
+    boxes[:, 0] = xywh[indices, 0]
+    boxes[:, 1] = xywh[indices, 1]
+    boxes[:, 2] = xywh[indices, 0] + xywh[indices, 2]
+    boxes[:, 3] = xywh[indices, 1] + xywh[indices, 3]
+    boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad[0]) / scale
+    boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad[1]) / scale
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+    boxes[:, :4] = boxes[:, :4].astype(int)  # Convert coordinates to integers
+    boxes[:, 4] = confidences[indices]
+    boxes[:, 5] = PERSON_CLASS
+    return boxes
+
+
+class OnnxPersonModel:
+    """
+    Runs an exported YOLO model through ONNX Runtime on CPU.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        imgsz: int = 640,
+        int8: bool = False,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0,
+        calibration_dir: str = "./examples",
+    ) -> None:
+        """
+        Initializes the OnnxPersonModel.
+
+        Args:
+            model_path: The YOLO weights, exported once, or an ONNX model.
+            imgsz: The image size the weights are exported at.
+            int8: Whether to run the statically quantized INT8 model.
+            intra_op_threads: The threads used within an operator, 0 for all cores.
+            inter_op_threads: The threads running independent operators, 0 for the
+                default. Above 1, operators run in parallel.
+            calibration_dir: The directory of the INT8 calibration images.
+        """
+        import onnxruntime as ort
+
+        path = model_path
+        if not model_path.endswith(".onnx"):
+            path = export_onnx(model_path, imgsz=imgsz)
+        if int8:
+            path = quantize_int8(path, calibration_images(calibration_dir), imgsz)
+        self.path = path
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if inter_op_threads > 1:
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        self.session = ort.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, frames: List[Any], conf: float, imgsz: int) -> List[np.ndarray]:
+        """
+        Detects people in a batch of frames.
+
+        Args:
+            frames: The BGR frames.
+            conf: The confidence threshold.
+            imgsz: The side of the square model input, a multiple of 32.
+
+        Returns:
+            A list aligned with `frames` of [x1, y1, x2, y2, confidence, class_index]
+            arrays.
+        """
+        if not frames:
+            return []
+        tensor, scales, pads = letterbox(frames, imgsz)
+        outputs = self.session.run(None, {self.input_name: tensor})[0]
+        return [
+            postprocess(output, scale, pad, frame.shape[:2], conf)
+            for output, scale, pad, frame in zip(outputs, scales, pads, frames)
+        ]
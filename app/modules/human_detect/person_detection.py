@@ -1,6 +1,6 @@
 from typing import List, Any
 
-from ultralytics import YOLO
+import numpy as np
 from app.interface import ServiceInterface
 
 
@@ -10,7 +10,18 @@ class PersonDetect(ServiceInterface):
     """
 
     def __init__(
-        self, model_path: str, name: str = "person_detect", threshold: float = 0.75
+        self,
+        model_path: str,
+        name: str = "person_detect",
+        threshold: float = 0.75,
+        imgsz: int = 640,
+        batch_size: int = 8,
+        max_wait: float = 0.01,
+        backend: str = "torch",
+        int8: bool = False,
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 0,
+        calibration_dir: str = "./examples",
     ) -> None:
         """
         Initializes the PersonDetect service.
@@ -19,10 +30,61 @@ class PersonDetect(ServiceInterface):
             model_path: The path to the YOLO model.
             name: The name of the service. Defaults to 'person_detect'.
             threshold: The confidence threshold for person detection. Defaults to 0.75.
+            imgsz: The inference image size. Defaults to 640.
+            batch_size: The maximum number of frames per predict call in
+                `inference_batch`. Defaults to 8.
+            max_wait: The maximum number of seconds a batcher should wait to fill a
+                partial batch of frames for this detector. Defaults to 0.01.
+            backend: 'torch' to run the ultralytics model, or 'onnx' to run its ONNX
+                export through ONNX Runtime on CPU. Defaults to 'torch'.
+            int8: Whether the 'onnx' backend runs the statically quantized INT8 model.
+            intra_op_threads: The ONNX Runtime threads within an operator, 0 for all.
+            inter_op_threads: The ONNX Runtime threads across operators, 0 for default.
+            calibration_dir: The directory of the INT8 calibration images.
         """
         super().__init__(name=name)
-        self.model = YOLO(model_path)
+        if backend == "torch":
+            # ultralytics pulls in torch, which the 'onnx' backend does without
+            from ultralytics import YOLO
+
+            self.model = YOLO(model_path)
+        elif backend == "onnx":
+            from app.modules.human_detect.onnx_backend import OnnxPersonModel
+
+            self.model = OnnxPersonModel(
+                model_path,
+                imgsz=imgsz,
+                int8=int8,
+                intra_op_threads=intra_op_threads,
+                inter_op_threads=inter_op_threads,
+                calibration_dir=calibration_dir,
+            )
+        else:
+            raise ValueError(f"Unknown backend '{backend}', use 'torch' or 'onnx'.")
+        self.backend = backend
         self.threshold = threshold
+        self.imgsz = imgsz
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+
+    def _predict(self, source: Any) -> list:
+        if self.backend == "onnx":
+            frames = source if isinstance(source, list) else [source]
+            return self.model.predict(frames, conf=self.threshold, imgsz=self.imgsz)
+        return self.model.predict(
+            source, classes=0, conf=self.threshold, imgsz=self.imgsz, verbose=False
+        )
+
+    @staticmethod
+    def _to_boxes(model_result: Any) -> np.ndarray:
+        if isinstance(model_result, np.ndarray):
+            return model_result  # the onnx backend already returns boxes
+        # Extract and convert bounding boxes for detected people
+        person_bboxes = model_result.boxes.data.cpu().numpy()
+        person_bboxes[:, :4] = person_bboxes[:, :4].astype(
+            int
+        )  # Convert coordinates to integers
+        return person_bboxes
 
     def inference(self, frame: Any) -> List[List[float]]:
         """
@@ -36,17 +98,27 @@ class PersonDetect(ServiceInterface):
         """
 
         # Perform person detection using the YOLO model
-        model_results = self.model.predict(
-            frame, classes=0, conf=self.threshold, verbose=False
-        )
+        model_results = self._predict(frame)
 
         if not model_results:
             return []
 
-        # Extract and convert bounding boxes for detected people
-        person_bboxes = model_results[0].boxes.data.cpu().numpy()
-        person_bboxes[:, :4] = person_bboxes[:, :4].astype(
-            int
-        )  # Convert coordinates to integers
+        return self._to_boxes(model_results[0])
 
-        return person_bboxes
+    def inference_batch(self, frames: List[Any]) -> List[np.ndarray]:
+        """
+        Detects people in several frames with one predict call per `batch_size` frames.
+
+        Args:
+            frames: The frames to process, from one stream or from several streams.
+
+        Returns:
+            A list aligned with `frames` holding, for each frame, the array of
+            [x1, y1, x2, y2, confidence, class_index] boxes of the detected people.
+        """
+        results = []
+        for start in range(0, len(frames), self.batch_size):
+            chunk = list(frames[start : start + self.batch_size])
+            model_results = self._predict(chunk)
+            results.extend(self._to_boxes(result) for result in model_results)
+        return results
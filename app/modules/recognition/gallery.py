@@ -0,0 +1,221 @@
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize(embeddings: Any) -> np.ndarray:
+    """
+    L2-normalizes embeddings so that their dot product is the cosine similarity.
+
+    Args:
+        embeddings: An (N, D) array or a single (D,) vector.
+
+    Returns:
+        numpy.ndarray: A float32 (N, D) array of unit vectors.
+    """
+    embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+class FaceGallery:
+    """
+    An in-memory gallery of enrolled face embeddings answering cosine top-k queries.
+
+    Embeddings are normalized once when enrolled and stored in one contiguous
+    float32 matrix, so the queries of a whole frame are answered by a single matrix
+    multiplication. The matrix grows geometrically and removals swap the last row
+    into the freed one, so neither operation rebuilds the gallery.
+    """
+
+    EMBEDDINGS_FILE = "embeddings.npy"
+    IDS_FILE = "ids.npy"
+
+    def __init__(self, dim: int = 512, capacity: int = 1024) -> None:
+        """
+        Initializes an empty FaceGallery.
+
+        Args:
+            dim: The dimension of the embeddings. Defaults to 512.
+            capacity: The number of rows allocated up front.
+        """
+        self.dim = dim
+        self._embeddings = np.empty((max(1, capacity), dim), dtype=np.float32)
+        self._ids: List[str] = []
+        self._row_index: Optional[Dict[str, int]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, identity: str) -> bool:
+        return identity in self._rows
+
+    @property
+    def _rows(self) -> Dict[str, int]:
+        # Built on first use so that loading a large gallery stays instant
+        if self._row_index is None:
+            self._row_index = {identity: row for row, identity in enumerate(self._ids)}
+        return self._row_index
+
+    @property
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """The normalized embeddings of the enrolled identities, in row order."""
+        return self._embeddings[: len(self._ids)]
+
+    # ===== ENROLLMENT =====
+    def _reserve(self, size: int) -> None:
+        if size <= len(self._embeddings) and self._embeddings.flags.writeable:
+            return
+        capacity = max(size, 2 * len(self._embeddings))
+        embeddings = np.empty((capacity, self.dim), dtype=np.float32)
+        embeddings[: len(self._ids)] = self._embeddings[: len(self._ids)]
+        self._embeddings = embeddings
+
+    def add(self, ids: Iterable[str], embeddings: Any) -> None:
+        """
+        Enrolls identities, replacing the embedding of the ones already enrolled.
+
+        Args:
+            ids: The identity IDs.
+            embeddings: The (N, D) embeddings, one per ID.
+        """
+        ids = [str(identity) for identity in ids]
+        embeddings = normalize(embeddings)
+        if len(ids) != len(embeddings) or embeddings.shape[1] != self.dim:
+            raise ValueError(f"Expected {len(ids)} embeddings of dimension {self.dim}.")
+
+        with self._lock:
+            self._reserve(len(self._ids) + len(ids))
+            for identity, embedding in zip(ids, embeddings):
+                row = self._rows.get(identity)
+                if row is None:
+                    row = len(self._ids)
+                    self._ids.append(identity)
+                    self._rows[identity] = row
+                self._embeddings[row] = embedding
+
+    def remove(self, ids: Iterable[str]) -> int:
+        """
+        Removes identities from the gallery.
+
+        Args:
+            ids: The identity IDs to remove. Unknown IDs are ignored.
+
+        Returns:
+            The number of removed identities.
+        """
+        removed = 0
+        with self._lock:
+            self._reserve(len(self._ids))
+            for identity in ids:
+                row = self._rows.pop(str(identity), None)
+                if row is None:
+                    continue
+                last = len(self._ids) - 1
+                if row != last:
+                    self._embeddings[row] = self._embeddings[last]
+                    self._ids[row] = self._ids[last]
+                    self._rows[self._ids[row]] = row
+                self._ids.pop()
+                removed += 1
+        return removed
+
+    # ===== SEARCH =====
+    def search(self, queries: Any, k: int = 1) -> Tuple[np.ndarray, List[List[str]]]:
+        """
+        Finds the enrolled identities closest to each query embedding.
+
+        Args:
+            queries: The (M, D) query embeddings, e.g. every face of a frame.
+            k: The number of identities returned per query.
+
+        Returns:
+            tuple: The (M, k') cosine similarities, best first, and the matching lists
+            of identity IDs, with k' = min(k, len(gallery)).
+        """
+        queries = normalize(queries)
+        with self._lock:
+            count = len(self._ids)
+            k = min(k, count)
+            if k == 0 or len(queries) == 0:
+                return np.empty((len(queries), 0), dtype=np.float32), [
+                    [] for _ in queries
+                ]
+
+            scores = queries @ self._embeddings[:count].T
+            if k < count:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(count), (len(queries), count))
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            top_ids = [[self._ids[row] for row in rows] for rows in top.tolist()]
+
+        return top_scores, top_ids
+
+    def identify(self, queries: Any, threshold: float = 0.4) -> List[Optional[str]]:
+        """
+        Returns the best matching identity of each query, or None below the threshold.
+
+        Args:
+            queries: The (M, D) query embeddings.
+            threshold: The minimum cosine similarity of a match.
+
+        Returns:
+            A list of identity IDs or None, aligned with `queries`.
+        """
+        scores, ids = self.search(queries, k=1)
+        return [
+            matches[0] if matches and score[0] >= threshold else None
+            for score, matches in zip(scores, ids)
+        ]
+
+    # ===== PERSISTENCE =====
+    def save(self, directory: str) -> None:
+        """
+        Writes the gallery to a directory as two .npy files.
+
+        Args:
+            directory: The target directory, created if needed.
+        """
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            np.save(os.path.join(directory, self.EMBEDDINGS_FILE), self.embeddings)
+            np.save(
+                os.path.join(directory, self.IDS_FILE), np.array(self._ids, dtype=str)
+            )
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "FaceGallery":
+        """
+        Loads a gallery written by `save`.
+
+        Args:
+            directory: The gallery directory.
+            mmap: Whether to memory-map the embeddings instead of reading them, so
+                that even a large gallery is available instantly. The matrix is
+                copied into memory on the first enrollment or removal.
+
+        Returns:
+            FaceGallery: The loaded gallery.
+        """
+        embeddings = np.load(
+            os.path.join(directory, cls.EMBEDDINGS_FILE),
+            mmap_mode="r" if mmap else None,
+        )
+        ids = np.load(os.path.join(directory, cls.IDS_FILE)).tolist()
+
+        gallery = cls(dim=embeddings.shape[1], capacity=1)
+        gallery._embeddings = embeddings
+        gallery._ids = ids
+        gallery._row_index = None
+        return gallery
@@ -0,0 +1,227 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+
+class _ModelSpec:
+    __slots__ = ("factory", "warmup", "instance", "load_ms", "warmup_ms", "error")
+
+    def __init__(self, factory, warmup):
+        self.factory = factory
+        self.warmup = warmup
+        self.instance = None
+        self.load_ms = None
+        self.warmup_ms = None
+        self.error = None
+
+
+class ModelRegistry:
+    """
+    Loads each configured model once, warms it up and hands out the shared instance.
+    """
+
+    def __init__(self, warmup: bool = True) -> None:
+        """
+        Initializes the ModelRegistry.
+
+        Args:
+            warmup: Whether to run the warmup of each model right after loading it.
+        """
+        self.warmup = warmup
+        self._specs: Dict[str, _ModelSpec] = {}
+        # Reentrant, so that a factory can get the models it is built from
+        self._lock = threading.RLock()
+        self.startup_ms: Optional[float] = None
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        warmup: Optional[Callable[[Any], Any]] = None,
+    ) -> None:
+        """
+        Registers a model without loading it.
+
+        Args:
+            name: The name the model is looked up by.
+            factory: A callable building the model.
+            warmup: A callable running a dummy inference through the built model.
+        """
+        with self._lock:
+            if name in self._specs:
+                raise ValueError(f"Model '{name}' is already registered.")
+            self._specs[name] = _ModelSpec(factory, warmup)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._specs
+
+    def get(self, name: str) -> Any:
+        """
+        Returns the shared instance of a model, loading and warming it up on first use.
+
+        Args:
+            name: The name of a registered model.
+
+        Returns:
+            The model instance.
+        """
+        spec = self._specs.get(name)
+        if spec is None:
+            raise KeyError(f"Model '{name}' is not registered.")
+        if spec.instance is not None:
+            return spec.instance
+
+        with self._lock:
+            if spec.instance is None:
+                start = time.perf_counter()
+                instance = spec.factory()
+                spec.load_ms = 1000 * (time.perf_counter() - start)
+                if self.warmup and spec.warmup is not None:
+                    self._warmup(name, spec, instance)
+                spec.instance = instance
+        return spec.instance
+
+    def _warmup(self, name: str, spec: _ModelSpec, instance: Any) -> None:
+        start = time.perf_counter()
+        try:
+            spec.warmup(instance)
+        except Exception as e:
+            # A failed warmup, e.g. a remote service not up yet, is not fatal
+            spec.error = str(e)
+            print(f"Error warming up {name}: {e}")
+        spec.warmup_ms = 1000 * (time.perf_counter() - start)
+
+    def load_all(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Loads and warms up every registered model.
+
+        Returns:
+            The loading report, see `stats()`.
+        """
+        start = time.perf_counter()
+        for name in list(self._specs):
+            self.get(name)
+        self.startup_ms = 1000 * (time.perf_counter() - start)
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the load and warmup times of each model, in milliseconds."""
+        return {
+            "startup_ms": self.startup_ms,
+            "models": {
+                name: {
+                    "loaded": spec.instance is not None,
+                    "load_ms": spec.load_ms,
+                    "warmup_ms": spec.warmup_ms,
+                    "warmup_error": spec.error,
+                }
+                for name, spec in self._specs.items()
+            },
+        }
+
+    def close(self) -> None:
+        """Closes the loaded models that hold resources."""
+        for spec in self._specs.values():
+            close = getattr(spec.instance, "close", None)
+            if callable(close):
+                close()
+            spec.instance = None
+
+
+# The registered face extractor of each FACE_BACKEND setting
+FACE_EXTRACTORS = {
+    "remote": "insightface",
+    "local": "mediapipe_face",
+    "routed": "face_router",
+}
+
+
+def _dummy_frame(size: int = 640) -> np.ndarray:
+    return np.zeros((size, size, 3), dtype=np.uint8)
+
+
+def _face_warmup(model: Any) -> None:
+    model.inference_batch(crops=[_dummy_frame(112)])
+
+
+def default_registry(settings: Any) -> ModelRegistry:
+    """
+    Builds the registry of the models configured in the settings.
+
+    Args:
+        settings: The application Settings.
+
+    Returns:
+        A ModelRegistry with 'person_detect' and the face extractors of the
+        FACE_BACKEND setting registered, see `FACE_EXTRACTORS`.
+    """
+    face_backend = getattr(settings, "FACE_BACKEND", "remote")
+    if face_backend not in FACE_EXTRACTORS:
+        raise ValueError(f"Unknown face backend '{face_backend}'.")
+    registry = ModelRegistry(warmup=getattr(settings, "WARMUP_MODELS", True))
+
+    def person_detect():
+        from app.modules.human_detect.person_detection import PersonDetect
+
+        return PersonDetect(
+            model_path=settings.PERSON_MODEL_PATH,
+            threshold=settings.PERSON_THRESHOLD,
+            backend=settings.PERSON_BACKEND,
+            int8=settings.PERSON_INT8,
+            intra_op_threads=settings.ONNX_INTRA_OP_THREADS,
+            inter_op_threads=settings.ONNX_INTER_OP_THREADS,
+        )
+
+    def insightface():
+        from app.modules.face_detect.insightface import FaceInsightExtractor
+
+        return FaceInsightExtractor(
+            url=[url.strip() for url in settings.INSIGHTFACE_URL.split(",")],
+            jpeg_quality=settings.FACE_JPEG_QUALITY,
+            deadline=settings.INSIGHTFACE_DEADLINE,
+            hedge=settings.INSIGHTFACE_HEDGE,
+        )
+
+    def mediapipe_face():
+        from app.modules.face_detect.mediapipe_detector import MediaPipeFaceDetector
+
+        return MediaPipeFaceDetector(model_path=settings.FACE_MODEL_PATH)
+
+    def face_router():
+        from app.modules.face_detect.router import FaceRouter
+
+        return FaceRouter(
+            local=registry.get("mediapipe_face"), remote=registry.get("insightface")
+        )
+
+    registry.register(
+        "person_detect",
+        person_detect,
+        warmup=lambda model: model.inference(frame=_dummy_frame(model.imgsz)),
+    )
+    if face_backend in ("remote", "routed"):
+        registry.register("insightface", insightface, warmup=_face_warmup)
+    if face_backend in ("local", "routed"):
+        registry.register("mediapipe_face", mediapipe_face, warmup=_face_warmup)
+    if face_backend == "routed":
+        registry.register("face_router", face_router)
+    return registry
+
+
+def face_extractor(registry: ModelRegistry, settings: Any) -> Any:
+    """
+    Returns the configured face extractor, fed with the head region of each person.
+
+    Args:
+        registry: The registry built by `default_registry`.
+        settings: The application Settings.
+    """
+    from app.modules.face_detect.roi import FaceRoiExtractor
+
+    return FaceRoiExtractor(
+        registry.get(FACE_EXTRACTORS[settings.FACE_BACKEND]),
+        head_ratio=settings.FACE_ROI_HEAD_RATIO,
+        max_side=settings.FACE_ROI_MAX_SIDE,
+    )
@@ -1,5 +1,6 @@
 from typing import List, Any
 
+import numpy as np
 from boxmot import OcSort
 from app.interface import ServiceInterface
 
@@ -29,3 +30,62 @@ class Tracking(ServiceInterface):
         """
         result = self.tracker.update(detections, frame)
         return result
+
+    def active_ids(self) -> List[int]:
+        """Returns the IDs, as reported by `inference`, of the tracks still alive."""
+        return [track.id + 1 for track in getattr(self.tracker, "active_tracks", [])]
+
+    def update(self, detections: Any, frame: Any, max_age: int = 1) -> np.ndarray:
+        """
+        Updates the tracker with the detections of a frame, reporting every active
+        track instead of the confirmed ones only.
+
+        OcSort only reports the tracks matched in `min_hits` consecutive frames, and
+        every `predict` call resets that streak. With a detection stride, `inference`
+        would then drop every track on the detector-backed frames.
+
+        Args:
+            detections: A list of detected objects.
+            frame: The current frame.
+            max_age: The maximum number of frames since a track was last matched to a
+                detection for it to be reported.
+
+        Returns:
+            The tracks, in the same format as `inference`. The tracks not matched in
+            this frame have -1 as the detection index.
+        """
+        self.tracker.update(detections, frame)
+        return self._active(max_age)
+
+    def predict(self, frame: Any, max_age: int = 1) -> np.ndarray:
+        """
+        Advances the motion model of every track by one frame without detections.
+
+        Args:
+            frame: The current frame.
+            max_age: The maximum number of frames since a track was last matched to a
+                detection for it to be reported.
+
+        Returns:
+            The predicted tracks, in the same format as `inference`, with -1 as the
+            detection index.
+        """
+        self.tracker.update(np.empty((0, 6), dtype=np.float32), frame)
+        return self._active(max_age)
+
+    def _active(self, max_age: int) -> np.ndarray:
+        tracks = []
+        for track in getattr(self.tracker, "active_tracks", []):
+            if track.time_since_update > max_age:
+                continue
+            if track.time_since_update == 0:
+                # matched in this frame: the detected box, as `inference` reports it
+                box, det_ind = track.last_observation, track.det_ind
+            else:
+                box, det_ind = track.get_state(), -1
+            x1, y1, x2, y2 = np.asarray(box).reshape(-1)[:4]
+            tracks.append(
+                [x1, y1, x2, y2, track.id + 1, track.conf, track.cls, det_ind]
+            )
+
+        return np.asarray(tracks, dtype=np.float32).reshape(-1, 8)
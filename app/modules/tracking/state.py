@@ -0,0 +1,246 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.common.utils.image import crop_origins
+
+
+class TrackState:
+    """A read-only view of one track of a TrackStateStore."""
+
+    __slots__ = ("_store", "_slot")
+
+    def __init__(self, store: "TrackStateStore", slot: int) -> None:
+        self._store = store
+        self._slot = slot
+
+    @property
+    def track_id(self) -> int:
+        return int(self._store.ids[self._slot])
+
+    @property
+    def bbox(self) -> np.ndarray:
+        return self._store.boxes[self._slot]
+
+    @property
+    def face_bbox(self) -> Optional[np.ndarray]:
+        return self._store.face_boxes[self._slot] if self.has_face else None
+
+    @property
+    def landmarks(self) -> Optional[np.ndarray]:
+        return self._store.landmarks[self._slot] if self.has_face else None
+
+    @property
+    def face_prob(self) -> float:
+        return float(self._store.face_probs[self._slot])
+
+    @property
+    def best_score(self) -> float:
+        return float(self._store.best_scores[self._slot])
+
+    @property
+    def embedding(self) -> Optional[np.ndarray]:
+        store = self._store
+        if not store.embedding_dim or not store.has_embedding[self._slot]:
+            return None
+        return store.embeddings[self._slot]
+
+    @property
+    def has_face(self) -> bool:
+        return bool(self._store.has_face[self._slot])
+
+    @property
+    def first_seen(self) -> int:
+        return int(self._store.first_seen[self._slot])
+
+    @property
+    def last_seen(self) -> int:
+        return int(self._store.last_seen[self._slot])
+
+
+class TrackStateStore:
+    """
+    Keeps the latest state of the tracks of one stream in preallocated arrays, so
+    that its memory stays fixed however long the stream runs.
+
+    Each slot holds the last person box, the last face box and landmarks in frame
+    coordinates, the best face probability and the embedding of that best face, and
+    the first and last frames the track was seen in.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 256,
+        num_landmarks: int = 5,
+        embedding_dim: int = 512,
+        max_age: int = 30,
+    ) -> None:
+        """
+        Initializes the TrackStateStore.
+
+        Args:
+            capacity: The maximum number of tracks kept. When full, the least
+                recently seen track is replaced.
+            num_landmarks: The number of landmarks kept per face.
+            embedding_dim: The size of the embeddings kept, 0 not to keep them.
+            max_age: The number of frames after which an unseen track expires.
+                Defaults to 30, the max_age of OcSort.
+        """
+        self.capacity = capacity
+        self.num_landmarks = num_landmarks
+        self.embedding_dim = embedding_dim
+        self.max_age = max_age
+
+        self.ids = np.full(capacity, -1, dtype=np.int64)
+        self.boxes = np.zeros((capacity, 4), dtype=np.float32)
+        self.face_boxes = np.zeros((capacity, 4), dtype=np.float32)
+        self.landmarks = np.zeros((capacity, num_landmarks, 2), dtype=np.float32)
+        self.face_probs = np.zeros(capacity, dtype=np.float32)
+        self.best_scores = np.zeros(capacity, dtype=np.float32)
+        self.embeddings = np.zeros((capacity, embedding_dim), dtype=np.float32)
+        self.has_face = np.zeros(capacity, dtype=bool)
+        self.has_embedding = np.zeros(capacity, dtype=bool)
+        self.first_seen = np.zeros(capacity, dtype=np.int64)
+        self.last_seen = np.zeros(capacity, dtype=np.int64)
+
+        self._slots: Dict[int, int] = {}
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self.evictions = 0
+
+    @classmethod
+    def from_budget(cls, max_bytes: int, **kwargs) -> "TrackStateStore":
+        """Builds the store with the largest capacity fitting in `max_bytes`."""
+        probe = cls(capacity=1, **kwargs)
+        return cls(capacity=max(1, max_bytes // probe.nbytes), **kwargs)
+
+    @property
+    def nbytes(self) -> int:
+        """The memory held by the arrays of the store."""
+        return sum(
+            array.nbytes
+            for array in (
+                self.ids,
+                self.boxes,
+                self.face_boxes,
+                self.landmarks,
+                self.face_probs,
+                self.best_scores,
+                self.embeddings,
+                self.has_face,
+                self.has_embedding,
+                self.first_seen,
+                self.last_seen,
+            )
+        )
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, track_id: Any) -> bool:
+        return int(track_id) in self._slots
+
+    def __iter__(self):
+        return (TrackState(self, slot) for slot in list(self._slots.values()))
+
+    def get(self, track_id: Any) -> Optional[TrackState]:
+        slot = self._slots.get(int(track_id))
+        return TrackState(self, slot) if slot is not None else None
+
+    def _allocate(self, track_id: int, frame_idx: int) -> int:
+        if not self._free:
+            used = np.fromiter(self._slots.values(), dtype=np.int64)
+            self._release(int(used[np.argmin(self.last_seen[used])]))
+            self.evictions += 1
+        slot = self._free.pop()
+        self._slots[track_id] = slot
+        self.ids[slot] = track_id
+        self.first_seen[slot] = frame_idx
+        self.has_face[slot] = False
+        self.has_embedding[slot] = False
+        self.face_probs[slot] = 0
+        self.best_scores[slot] = 0
+        return slot
+
+    def _release(self, slot: int) -> None:
+        del self._slots[int(self.ids[slot])]
+        self.ids[slot] = -1
+        self._free.append(slot)
+
+    def update(
+        self,
+        tracks: Any,
+        frame_idx: int,
+        faces: Optional[List[list]] = None,
+        active_ids: Optional[Iterable[int]] = None,
+    ) -> None:
+        """
+        Records the tracker output of a frame and expires the stale tracks.
+
+        Args:
+            tracks: The tracker output => [[x1, y1, x2, y2, track_idx, conf, cls_idx, 0]]
+            frame_idx: The index of the frame.
+            faces: The face lists aligned with `tracks`, in the person crop coordinates.
+            active_ids: The IDs of the tracks still alive in the tracker, see
+                `Tracking.active_ids`. The other tracks are expired immediately.
+        """
+        faces = faces if faces is not None else [[] for _ in range(len(tracks))]
+
+        for track, track_faces in zip(tracks, faces):
+            track = np.asarray(track, dtype=np.float32)
+            track_id = int(track[4])
+            slot = self._slots.get(track_id)
+            if slot is None:
+                slot = self._allocate(track_id, frame_idx)
+            self.boxes[slot] = track[:4]
+            self.last_seen[slot] = frame_idx
+            if track_faces:
+                self._update_face(slot, track, track_faces)
+
+        self.expire(frame_idx, active_ids)
+
+    def _update_face(self, slot: int, track: np.ndarray, faces: list) -> None:
+        face = max(faces, key=lambda face: float(face.get("prob", 0.0)))
+        if face.get("bbox") is None:
+            return
+        # the person crop starts at the track box clipped to the frame
+        offset = crop_origins(track)
+        prob = float(face.get("prob", 0.0))
+        bbox = np.asarray(face["bbox"], dtype=np.float32)[:4]
+        self.face_boxes[slot] = bbox + np.tile(offset, 2)
+        self.landmarks[slot] = 0
+        if face.get("landmarks") is not None and len(face["landmarks"]):
+            points = np.asarray(face["landmarks"], dtype=np.float32)
+            points = points[: self.num_landmarks]
+            self.landmarks[slot, : len(points)] = points + offset
+        self.face_probs[slot] = prob
+        self.has_face[slot] = True
+
+        if prob > self.best_scores[slot]:
+            self.best_scores[slot] = prob
+            vec = face.get("vec")
+            if self.embedding_dim and vec is not None and len(vec):
+                vec = np.asarray(vec, dtype=np.float32)[: self.embedding_dim]
+                self.embeddings[slot, : len(vec)] = vec
+                self.has_embedding[slot] = True
+
+    def expire(self, frame_idx: int, active_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Removes the tracks unseen for more than `max_age` frames, or no longer active.
+
+        Returns:
+            The number of expired tracks.
+        """
+        active = set(active_ids) if active_ids is not None else None
+        expired = [
+            slot
+            for track_id, slot in self._slots.items()
+            if frame_idx - self.last_seen[slot] > self.max_age
+            or (active is not None and track_id not in active)
+        ]
+        for slot in expired:
+            self._release(slot)
+        return len(expired)
+
+    def clear(self) -> None:
+        for slot in list(self._slots.values()):
+            self._release(slot)
@@ -0,0 +1,110 @@
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.interface import ServiceInterface
+
+
+class StridedTracking(ServiceInterface):
+    """
+    A detection and tracking service that only runs the person detector every few
+    frames and serves the frames in between from the tracker's motion model.
+    """
+
+    def __init__(
+        self,
+        detector: Any,
+        tracker: Any,
+        stride: int = 1,
+        adaptive: bool = False,
+        motion_threshold: float = 0.1,
+        name: str = "strided_tracking",
+    ) -> None:
+        """
+        Initializes the StridedTracking service.
+
+        Args:
+            detector: The person detection service.
+            tracker: The Tracking service.
+            stride: Run the detector every `stride` frames. 1 detects every frame.
+            adaptive: Whether to also run the detector as soon as the number of tracks
+                changes or the tracks move fast, `stride` then being the upper bound.
+            motion_threshold: In adaptive mode, the mean displacement of the predicted
+                boxes since the last detection, relative to their height, above which
+                the detector runs.
+            name: The name of the service. Defaults to 'strided_tracking'.
+        """
+        super().__init__(name=name)
+        self.detector = detector
+        self.tracker = tracker
+        self.stride = max(1, stride)
+        self.adaptive = adaptive
+        self.motion_threshold = motion_threshold
+
+        self.detected_frames = 0
+        self.predicted_frames = 0
+        self._since_detection = 0
+        self._last_tracks: Optional[np.ndarray] = None
+
+    def stats(self) -> Dict[str, int]:
+        """Returns how many frames were detector-backed and how many predicted."""
+        return {
+            "detected_frames": self.detected_frames,
+            "predicted_frames": self.predicted_frames,
+        }
+
+    def _should_detect(self) -> bool:
+        return self._last_tracks is None or self._since_detection >= self.stride
+
+    def _changed(self, tracks: np.ndarray) -> bool:
+        """Checks whether predicted tracks drifted from the last detected ones."""
+        last = self._last_tracks
+        if len(tracks) != len(last):
+            return True
+        if len(tracks) == 0:
+            return False
+
+        last_by_id = {int(track[4]): track for track in last}
+        shifts = []
+        for track in tracks:
+            previous = last_by_id.get(int(track[4]))
+            if previous is None:
+                return True
+            height = max(previous[3] - previous[1], 1.0)
+            center = (track[:2] + track[2:4]) / 2
+            previous_center = (previous[:2] + previous[2:4]) / 2
+            shifts.append(np.linalg.norm(center - previous_center) / height)
+        return float(np.mean(shifts)) > self.motion_threshold
+
+    def inference(self, frame: Any) -> np.ndarray:
+        """
+        Detects and tracks the people of a frame.
+
+        Args:
+            frame: The frame to process.
+
+        Returns:
+            The tracked objects => [[x1, y1, x2, y2, track_idx, conf, cls_idx, det_ind]]
+        """
+        if not self._should_detect():
+            tracks = self.tracker.predict(frame=frame, max_age=self.stride)
+            self.predicted_frames += 1
+            self._since_detection += 1
+            if self.adaptive and self._changed(tracks):
+                # The tracker is already advanced to this frame, detect on the next one
+                self._since_detection = self.stride
+            return tracks
+
+        detections = self.detector.inference(frame=frame)
+        if len(detections) == 0:
+            detections = np.empty((0, 6), dtype=np.float32)
+        # predict() resets the hit streaks, so the confirmed-only output of
+        # `inference` would be empty: report every active track instead
+        tracks = self.tracker.update(
+            detections=detections, frame=frame, max_age=self.stride
+        )
+
+        self._last_tracks = np.asarray(tracks, dtype=np.float32).reshape(-1, 8)
+        self._since_detection = 1
+        self.detected_frames += 1
+        return tracks
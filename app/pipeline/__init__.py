@@ -0,0 +1,25 @@
+from app.pipeline.controller import QualityController, QualityLevel
+from app.pipeline.engine import Pipeline, Stage
+from app.pipeline.queues import BLOCK, DROP_OLDEST, KEEP_LATEST, StageQueue
+from app.pipeline.shm import FrameRing, run_multiprocess
+from app.pipeline.streams import DetectionBatcher, FaceBatcher, StreamManager
+from app.pipeline.video import FramePacket, build_video_pipeline, video_source
+
+__all__ = [
+    "BLOCK",
+    "DROP_OLDEST",
+    "DetectionBatcher",
+    "FaceBatcher",
+    "KEEP_LATEST",
+    "FramePacket",
+    "FrameRing",
+    "Pipeline",
+    "QualityController",
+    "QualityLevel",
+    "Stage",
+    "StageQueue",
+    "StreamManager",
+    "build_video_pipeline",
+    "run_multiprocess",
+    "video_source",
+]
@@ -0,0 +1,274 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.common.metrics import REGISTRY
+
+
+@dataclass(frozen=True)
+class QualityLevel:
+    """The knob values of one step of the degradation ladder."""
+
+    imgsz: int
+    threshold: float
+    max_faces: Optional[int]  # face lookups per frame, None for every track
+    crop_max_side: int  # the side face crops are downsized to, 0 for full size
+
+
+def default_levels(
+    imgsz: int = 640, threshold: float = 0.75, crop_max_side: int = 320
+) -> List[QualityLevel]:
+    """
+    Builds a ladder from the configured knob values, the first level, down to the
+    cheapest one: smaller detector input, higher threshold (fewer tracks), fewer
+    face lookups per frame and smaller face crops. Full size crops (0) are capped
+    from 320 pixels on the lower levels.
+    """
+    configured = QualityLevel(imgsz, threshold, None, crop_max_side)
+    crop_base = crop_max_side or 320
+    steps = (
+        (1.0, 0.0, 8, 0.8),
+        (0.8, 0.05, 6, 0.7),
+        (0.65, 0.05, 4, 0.6),
+        (0.5, 0.1, 2, 0.5),
+    )
+    return [configured] + [
+        QualityLevel(
+            imgsz=max(32, int(round(imgsz * size / 32)) * 32),
+            threshold=min(0.95, threshold + delta),
+            max_faces=max_faces,
+            crop_max_side=int(crop_base * crop),
+        )
+        for size, delta, max_faces, crop in steps
+    ]
+
+
+class QualityController:
+    """
+    Keeps the frame latency of a pipeline under a target by moving along a ladder
+    of quality levels at runtime.
+
+    Every `interval` seconds the controller compares the p95 latency of the frames
+    that reached the sink, and the queue depths and drops of the stages, with the
+    target. It degrades by one level when the pipeline is overloaded, and recovers by
+    one level once the latency stayed well under the target for `recover_after`
+    intervals. Every decision is exported to the metrics registry.
+    """
+
+    def __init__(
+        self,
+        target_latency: float,
+        detector: Any = None,
+        face_roi: Any = None,
+        levels: Optional[Sequence[QualityLevel]] = None,
+        interval: float = 1.0,
+        recover_ratio: float = 0.6,
+        recover_after: int = 3,
+        queue_high_water: float = 0.8,
+        name: str = "quality",
+    ) -> None:
+        """
+        Initializes the QualityController.
+
+        Args:
+            target_latency: The target frame latency in seconds, from capture to sink.
+            detector: The person detector whose `imgsz` and `threshold` are adjusted,
+                e.g. PersonDetect. Leave it out when it is shared by several
+                pipelines: only the face lookups per frame are then limited.
+            face_roi: The FaceRoiExtractor whose `max_side` is adjusted.
+            levels: The quality ladder, best first. Defaults to `default_levels` built
+                from the current values of the detector and the face ROI.
+            interval: The seconds between two decisions.
+            recover_ratio: The fraction of the target under which the latency must
+                stay before recovering a level.
+            recover_after: The consecutive calm intervals needed to recover a level.
+            queue_high_water: The queue fill ratio above which a stage is overloaded.
+            name: The name of the controller, used as the metrics label.
+        """
+        self.target_latency = target_latency
+        self.detector = detector
+        self.face_roi = face_roi
+        self.levels = list(
+            levels
+            or default_levels(
+                imgsz=getattr(detector, "imgsz", 640),
+                threshold=getattr(detector, "threshold", 0.75),
+                crop_max_side=getattr(face_roi, "max_side", 320),
+            )
+        )
+        self.interval = interval
+        self.recover_ratio = recover_ratio
+        self.recover_after = recover_after
+        self.queue_high_water = queue_high_water
+        self.name = name
+
+        self.level = 0
+        self.degrades = 0
+        self.recovers = 0
+        self.last_latency = 0.0
+        self.bottleneck: Optional[str] = None
+        self._pipeline: Any = None
+        self._capacities: Dict[str, int] = {}
+        self._dropped: Dict[str, int] = {}
+        self._work: Dict[str, tuple] = {}  # (processed, busy ms) at the last decision
+        self._latencies: List[float] = []
+        self._calm = 0
+        self._next_decision = time.monotonic() + interval
+        self._lock = threading.Lock()
+        self.apply(self.levels[0])
+
+    @property
+    def max_faces(self) -> Optional[int]:
+        """The number of face lookups allowed per frame, None for no limit."""
+        return self.levels[self.level].max_faces
+
+    def watch(self, pipeline: Any) -> None:
+        """Sets the pipeline whose queues are watched."""
+        self._pipeline = pipeline
+        self._capacities = {stage.name: stage.queue_size for stage in pipeline.stages}
+
+    def observe(self, packet: Any) -> None:
+        """
+        Records the latency of a processed frame and decides when an interval passed.
+
+        Args:
+            packet: The FramePacket reaching the sink, with its capture `timestamp`.
+        """
+        latency = time.time() - packet.timestamp
+        now = time.monotonic()
+        with self._lock:
+            self._latencies.append(latency)
+            if now < self._next_decision:
+                return
+            self._next_decision = now + self.interval
+            latencies, self._latencies = self._latencies, []
+        stats = self._pipeline.stats() if self._pipeline is not None else {}
+        self.update(latencies, stats.get("stages", {}))
+
+    def _overloaded_stages(self, stages: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Returns the stages whose queue is nearly full or dropped frames."""
+        overloaded = []
+        for name, stage in stages.items():
+            capacity = self._capacities.get(name)
+            dropped = stage.get("dropped", 0) - self._dropped.get(name, 0)
+            self._dropped[name] = stage.get("dropped", 0)
+            full = capacity and stage["queue_depth"] >= self.queue_high_water * capacity
+            if full or dropped > 0:
+                overloaded.append(name)
+        return overloaded
+
+    def _interval_latencies(
+        self, stages: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, float]:
+        """
+        Returns the mean latency in ms of each stage over the last interval, the
+        pipeline stats only holding the mean since the start.
+        """
+        latencies = {}
+        for name, stage in stages.items():
+            processed = stage["processed"]
+            busy = stage["latency_ms"] * processed
+            last_processed, last_busy = self._work.get(name, (0, 0.0))
+            self._work[name] = (processed, busy)
+            done = processed - last_processed
+            latencies[name] = (busy - last_busy) / done if done > 0 else 0.0
+        return latencies
+
+    def update(
+        self, latencies: Sequence[float], stages: Dict[str, Dict[str, Any]]
+    ) -> int:
+        """
+        Decides the quality level from the latencies of the last interval.
+
+        Args:
+            latencies: The frame latencies in seconds observed since the last decision.
+            stages: The per-stage stats of the pipeline, see `Pipeline.stats`.
+
+        Returns:
+            The new quality level, 0 being the best.
+        """
+        latency = float(np.percentile(latencies, 95)) if len(latencies) else 0.0
+        overloaded = self._overloaded_stages(stages)
+        stage_latencies = self._interval_latencies(stages)
+        self.last_latency = latency
+        self.bottleneck = max(stage_latencies, key=stage_latencies.get, default=None)
+
+        level = self.level
+        if latency > self.target_latency or overloaded:
+            self._calm = 0
+            level = min(level + 1, len(self.levels) - 1)
+        elif latency < self.recover_ratio * self.target_latency:
+            self._calm += 1
+            if self._calm >= self.recover_after:
+                self._calm = 0
+                level = max(level - 1, 0)
+        else:
+            self._calm = 0
+
+        if level != self.level:
+            direction = "degrade" if level > self.level else "recover"
+            self.degrades += direction == "degrade"
+            self.recovers += direction == "recover"
+            REGISTRY.increment(
+                "quality_changes_total", direction=direction, controller=self.name
+            )
+            self.level = level
+            self.apply(self.levels[level])
+        self._export(stages, stage_latencies)
+        return self.level
+
+    def apply(self, level: QualityLevel) -> None:
+        """Sets the knobs of the detector and the face ROI to a quality level."""
+        if self.detector is not None:
+            self.detector.imgsz = level.imgsz
+            self.detector.threshold = level.threshold
+        if self.face_roi is not None:
+            self.face_roi.max_side = level.crop_max_side
+
+    def _export(
+        self, stages: Dict[str, Dict[str, Any]], stage_latencies: Dict[str, float]
+    ) -> None:
+        level = self.levels[self.level]
+        labels = {"controller": self.name}
+        REGISTRY.set_gauge("quality_level", self.level, **labels)
+        REGISTRY.set_gauge("quality_frame_latency_seconds", self.last_latency, **labels)
+        REGISTRY.set_gauge(
+            "quality_max_faces",
+            level.max_faces if level.max_faces is not None else -1,
+            **labels,
+        )
+        if self.detector is not None:
+            REGISTRY.set_gauge("quality_imgsz", level.imgsz, **labels)
+            REGISTRY.set_gauge("quality_threshold", level.threshold, **labels)
+        if self.face_roi is not None:
+            REGISTRY.set_gauge("quality_crop_max_side", level.crop_max_side, **labels)
+        for name, stage in stages.items():
+            REGISTRY.set_gauge(
+                "quality_stage_latency_seconds",
+                stage_latencies[name] / 1000,
+                stage=name,
+                **labels,
+            )
+            REGISTRY.set_gauge(
+                "quality_stage_queue_depth", stage["queue_depth"], stage=name, **labels
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the current level, its knobs and the decisions taken so far."""
+        level = self.levels[self.level]
+        stats = {
+            "level": self.level,
+            "max_faces": level.max_faces,
+            "frame_latency_ms": 1000 * self.last_latency,
+            "bottleneck": self.bottleneck,
+            "degrades": self.degrades,
+            "recovers": self.recovers,
+        }
+        if self.detector is not None:
+            stats.update(imgsz=level.imgsz, threshold=level.threshold)
+        if self.face_roi is not None:
+            stats["crop_max_side"] = level.crop_max_side
+        return stats
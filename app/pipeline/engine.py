@@ -0,0 +1,298 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.common.metrics import trace
+from app.pipeline.queues import BLOCK, SENTINEL, StageQueue
+
+
+class Stage:
+    """
+    A pipeline step running `fn` on every item it receives.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any], Any],
+        workers: int = 1,
+        queue_size: int = 10,
+        policy: str = BLOCK,
+        ordered: bool = True,
+    ) -> None:
+        """
+        Initializes the Stage.
+
+        Args:
+            name: The name of the stage.
+            fn: The function applied to each item. Returning None drops the item.
+            workers: The number of worker threads running `fn` concurrently.
+            queue_size: The capacity of the input queue of the stage.
+            policy: The overflow policy of the input queue (see StageQueue).
+            ordered: Whether outputs are forwarded in input order when workers > 1.
+        """
+        if workers < 1:
+            raise ValueError("A stage needs at least one worker.")
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+        self.policy = policy
+        self.ordered = ordered
+
+
+class _StageRuntime:
+    def __init__(self, stage: Stage) -> None:
+        self.stage = stage
+        self.queue = StageQueue(maxsize=stage.queue_size, policy=stage.policy)
+        self.lock = threading.Lock()
+        self.alive = stage.workers
+        self.pending: Dict[int, Any] = {}
+        self.next_ticket = 0
+        self.processed = 0
+        self.errors = 0
+        self.busy_time = 0.0
+
+
+class Pipeline:
+    """
+    Runs a source and a chain of stages, each stage on its own worker threads,
+    connected by bounded queues.
+
+    The source is iterated on a dedicated thread. When it is exhausted, or when the
+    pipeline is stopped, end-of-stream sentinels flow through the stages so that every
+    worker finishes its current item and exits; no thread is left blocked.
+    """
+
+    def __init__(
+        self,
+        source: Iterable,
+        stages: List[Stage],
+        name: str = "pipeline",
+        reporters: Optional[Dict[str, Callable[[], Dict[str, Any]]]] = None,
+        trace: bool = False,
+        on_finish: Optional[Callable[[], Any]] = None,
+    ):
+        """
+        Initializes the Pipeline.
+
+        Args:
+            source: The iterable producing the items, e.g. the frames of a video.
+            stages: The stages applied in order to each item.
+            name: The name of the pipeline, used for the thread names.
+            reporters: Extra stats providers, e.g. of the services used by the
+                stages, merged into `stats()` under their key.
+            trace: Whether to attribute the time of each item to the stages and
+                services that processed it, in the `trace` dict of the item.
+            on_finish: Called from the last worker thread once every item went
+                through, whether the source was exhausted or the pipeline stopped.
+        """
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage.")
+        self.name = name
+        self.source = source
+        self.stages = stages
+        self.reporters = reporters or {}
+        self.trace = trace
+        self.on_finish = on_finish
+        self._runtimes = [_StageRuntime(stage) for stage in stages]
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._produced = 0
+        self._start_time: Optional[float] = None
+        self._end_time: Optional[float] = None
+
+    # ===== LIFECYCLE =====
+    def start(self) -> "Pipeline":
+        """Starts the source and stage threads."""
+        if self._threads:
+            raise RuntimeError("The pipeline has already been started.")
+        self._start_time = time.monotonic()
+        for idx, runtime in enumerate(self._runtimes):
+            for worker in range(runtime.stage.workers):
+                self._threads.append(
+                    threading.Thread(
+                        target=self._work,
+                        args=(idx,),
+                        name=f"{self.name}-{runtime.stage.name}-{worker}",
+                        daemon=True,
+                    )
+                )
+        self._threads.append(
+            threading.Thread(
+                target=self._produce, name=f"{self.name}-source", daemon=True
+            )
+        )
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Requests the pipeline to stop. The source stops producing and the items
+        still queued are discarded instead of processed.
+        """
+        self._stop_event.set()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits for every thread to finish.
+
+        Args:
+            timeout: The maximum number of seconds to wait. Waits forever if None.
+
+        Returns:
+            True if the pipeline has finished.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            remaining = (
+                None if deadline is None else max(0, deadline - time.monotonic())
+            )
+            thread.join(remaining)
+        return not self.is_running()
+
+    def run(self) -> Dict[str, Any]:
+        """Runs the pipeline until the source is exhausted and returns its stats."""
+        self.start()
+        try:
+            self.join()
+        except KeyboardInterrupt:
+            self.stop()
+            self.join()
+        return self.stats()
+
+    def is_running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop_event.is_set()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+        self.join()
+
+    # ===== WORKERS =====
+    def _produce(self) -> None:
+        first = self._runtimes[0]
+        try:
+            for item in self.source:
+                if self._stop_event.is_set():
+                    break
+                first.queue.put(item)
+                self._produced += 1
+        except Exception as e:
+            print(f"Error in source of {self.name}: {e}")
+        finally:
+            close = getattr(self.source, "close", None)
+            if close is not None:
+                close()
+            for _ in range(first.stage.workers):
+                first.queue.put_sentinel()
+
+    def _work(self, idx: int) -> None:
+        runtime = self._runtimes[idx]
+        stage = runtime.stage
+        while True:
+            ticket, item = runtime.queue.get()
+            if item is SENTINEL:
+                break
+
+            result = None
+            if not self._stop_event.is_set():
+                spans = self._spans(item)
+                start = time.perf_counter()
+                try:
+                    with trace(spans):
+                        result = stage.fn(item)
+                except Exception as e:
+                    print(f"Error in stage {stage.name}: {e}")
+                    runtime.errors += 1
+                elapsed = time.perf_counter() - start
+                if spans is not None:
+                    spans[f"stage.{stage.name}"] = elapsed
+                with runtime.lock:
+                    runtime.processed += 1
+                    runtime.busy_time += elapsed
+
+            self._emit(idx, ticket, result)
+
+        with runtime.lock:
+            runtime.alive -= 1
+            last_worker = runtime.alive == 0
+        if last_worker:
+            if idx + 1 < len(self._runtimes):
+                downstream = self._runtimes[idx + 1]
+                for _ in range(downstream.stage.workers):
+                    downstream.queue.put_sentinel()
+            else:
+                self._end_time = time.monotonic()
+                if self.on_finish is not None:
+                    try:
+                        self.on_finish()
+                    except Exception as e:
+                        print(f"Error in on_finish of {self.name}: {e}")
+
+    def _spans(self, item: Any) -> Optional[Dict[str, float]]:
+        if not self.trace or not hasattr(item, "trace"):
+            return None
+        if item.trace is None:
+            item.trace = {}
+        return item.trace
+
+    def _emit(self, idx: int, ticket: int, result: Any) -> None:
+        runtime = self._runtimes[idx]
+        downstream = self._runtimes[idx + 1] if idx + 1 < len(self._runtimes) else None
+        if downstream is None:
+            return
+
+        if runtime.stage.workers == 1 or not runtime.stage.ordered:
+            if result is not None:
+                downstream.queue.put(result)
+            return
+
+        # Restore the input order before forwarding the outputs of several workers
+        with runtime.lock:
+            runtime.pending[ticket] = result
+            while runtime.next_ticket in runtime.pending:
+                ready = runtime.pending.pop(runtime.next_ticket)
+                runtime.next_ticket += 1
+                if ready is not None:
+                    downstream.queue.put(ready)
+
+    # ===== STATS =====
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the throughput and queue state of the pipeline.
+
+        Returns:
+            A dict with the elapsed time, the number of produced items and, for each
+            stage, its processed/error/drop counts, queue depth, mean latency and fps.
+        """
+        end = self._end_time or time.monotonic()
+        elapsed = end - self._start_time if self._start_time else 0.0
+        stages = {}
+        for runtime in self._runtimes:
+            processed = runtime.processed
+            stages[runtime.stage.name] = {
+                "processed": processed,
+                "errors": runtime.errors,
+                "dropped": runtime.queue.dropped,
+                "queue_depth": runtime.queue.qsize(),
+                "latency_ms": 1000 * runtime.busy_time / processed if processed else 0,
+                "fps": processed / elapsed if elapsed else 0.0,
+            }
+        stats = {
+            "name": self.name,
+            "running": self.is_running(),
+            "elapsed": elapsed,
+            "produced": self._produced,
+            "stages": stages,
+        }
+        for key, reporter in self.reporters.items():
+            stats[key] = reporter()
+        return stats
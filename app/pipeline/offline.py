@@ -0,0 +1,272 @@
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import cv2
+
+from app.common.utils.image import (
+    draw_bounding_box,
+    draw_landmarks,
+    face_to_frame,
+    xyxy_to_xywh,
+)
+from app.pipeline.engine import Pipeline
+from app.pipeline.sessions import serialize_packet
+from app.pipeline.streams import DetectionBatcher
+from app.pipeline.video import FramePacket, build_video_pipeline, video_source
+
+
+# ===== WRITERS =====
+class JsonlWriter:
+    """Writes one JSON line per frame."""
+
+    def __init__(self, path: str) -> None:
+        self.file = open(path, "w")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.file.write(json.dumps(record) + "\n")
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetWriter:
+    """
+    Writes one Parquet row per track, flushed every `row_group_size` rows. The faces
+    of a track are stored as a JSON string.
+    """
+
+    def __init__(self, path: str, row_group_size: int = 10000) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                "Writing Parquet needs pyarrow: pip install pyarrow"
+            ) from e
+
+        self._pa = pa
+        self.schema = pa.schema(
+            [
+                ("frame", pa.int64()),
+                ("timestamp", pa.float64()),
+                ("detected", pa.bool_()),
+                ("track_id", pa.int64()),
+                ("x1", pa.float32()),
+                ("y1", pa.float32()),
+                ("x2", pa.float32()),
+                ("y2", pa.float32()),
+                ("conf", pa.float32()),
+                ("faces", pa.string()),
+            ]
+        )
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.row_group_size = row_group_size
+        self._rows: List[Dict[str, Any]] = []
+
+    def write(self, record: Dict[str, Any]) -> None:
+        for track in record["tracks"]:
+            x1, y1, x2, y2 = track["bbox"]
+            self._rows.append(
+                {
+                    "frame": record["frame"],
+                    "timestamp": record["timestamp"],
+                    "detected": record["detected"],
+                    "track_id": track["track_id"],
+                    "x1": x1,
+                    "y1": y1,
+                    "x2": x2,
+                    "y2": y2,
+                    "conf": track["conf"],
+                    "faces": json.dumps(track["faces"]),
+                }
+            )
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._rows:
+            table = self._pa.Table.from_pylist(self._rows, schema=self.schema)
+            self.writer.write_table(table)
+            self._rows = []
+
+    def close(self) -> None:
+        self._flush()
+        self.writer.close()
+
+
+def open_writer(path: str) -> Any:
+    """Opens the results writer matching the extension of `path`."""
+    if path.endswith(".parquet"):
+        return ParquetWriter(path)
+    if path.endswith((".jsonl", ".json")):
+        return JsonlWriter(path)
+    raise ValueError(f"Unsupported output '{path}', use .jsonl or .parquet.")
+
+
+def annotate(packet: FramePacket) -> Any:
+    """Draws the person tracks and their faces on the frame of a packet."""
+    frame = packet.frame
+    tracks = packet.tracks if packet.tracks is not None else []
+    faces = packet.faces or [[] for _ in range(len(tracks))]
+    for track, track_faces in zip(tracks, faces):
+        frame = draw_bounding_box(
+            frame, xyxy_to_xywh(track[:4]), caption=f"Track ID: {int(track[4])}"
+        )
+        for face in track_faces:
+            bbox, landmarks = face_to_frame(face, track)
+            if bbox is None:
+                continue
+            frame = draw_bounding_box(frame, xyxy_to_xywh(bbox), bbox_color=(0, 0, 255))
+            if landmarks:
+                frame = draw_landmarks(frame, landmarks)
+    return frame
+
+
+# ===== PROGRESS =====
+class Progress:
+    """Prints the processed frames and the throughput every `interval` seconds."""
+
+    def __init__(
+        self, total: int = 0, source_fps: float = 0.0, interval: float = 2.0
+    ) -> None:
+        self.total = total
+        self.source_fps = source_fps
+        self.interval = interval
+        self.frames = 0
+        self.start = time.perf_counter()
+        self._last = self.start
+
+    @property
+    def fps(self) -> float:
+        elapsed = time.perf_counter() - self.start
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def update(self) -> None:
+        self.frames += 1
+        now = time.perf_counter()
+        if self.interval and now - self._last >= self.interval:
+            self._last = now
+            self.print()
+
+    def print(self) -> None:
+        done = f"{self.frames}/{self.total}" if self.total else f"{self.frames}"
+        speed = (
+            f" ({self.fps / self.source_fps:.1f}x real time)" if self.source_fps else ""
+        )
+        print(f"{done} frames, {self.fps:.1f} fps{speed}", file=sys.stderr)
+
+
+def video_info(video_path: str) -> Dict[str, float]:
+    """Returns the frame count, frame rate and frame size of a video file."""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        return {
+            "frames": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            "fps": float(cap.get(cv2.CAP_PROP_FPS)),
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        cap.release()
+
+
+# ===== PROCESSING =====
+def process_video(
+    video_path: str,
+    detector: Any,
+    tracker: Any,
+    extractor: Any,
+    output: str,
+    video_output: Optional[str] = None,
+    detect_batch_size: Optional[int] = None,
+    face_workers: int = 4,
+    queue_size: int = 32,
+    detect_stride: int = 1,
+    embeddings: bool = False,
+    progress_interval: float = 2.0,
+) -> Dict[str, Any]:
+    """
+    Processes a video file as fast as possible, without display.
+
+    Frames are decoded on the pipeline source thread. Consecutive frames are
+    detected in batches, and the faces of several frames are extracted
+    concurrently. Every queue blocks, so no frame is dropped.
+
+    Args:
+        video_path: The path of the video file.
+        detector: The person detection service.
+        tracker: The tracking service.
+        extractor: The face extraction service. With a per-track extractor such as
+            CachedFaceExtractor, which is not thread-safe, faces are extracted by
+            one worker.
+        output: The .jsonl or .parquet file receiving the per-frame results.
+        video_output: An optional .mp4 file receiving the annotated frames.
+        detect_batch_size: The number of frames per detector call. Defaults to the
+            `batch_size` of the detector, or 8.
+        face_workers: The number of concurrent face extraction workers.
+        queue_size: The capacity of every stage queue.
+        detect_stride: Run the detector every `detect_stride` frames. Batched
+            detection is only used with a stride of 1.
+        embeddings: Whether to write the face embeddings.
+        progress_interval: The seconds between progress lines, 0 to disable.
+
+    Returns:
+        The pipeline stats with the number of frames, the achieved fps and the
+        speed relative to real time.
+    """
+    info = video_info(video_path)
+    progress = Progress(info["frames"], info["fps"], progress_interval)
+    writer = open_writer(output)
+    video_writer = None
+    if video_output:
+        video_writer = cv2.VideoWriter(
+            video_output,
+            cv2.VideoWriter_fourcc(*"mp4v"),
+            info["fps"] or 25.0,
+            (info["width"], info["height"]),
+        )
+
+    batch_size = detect_batch_size or getattr(detector, "batch_size", 8)
+    batcher = None
+    if detect_stride == 1 and batch_size > 1:
+        batcher = DetectionBatcher(detector, max_batch_size=batch_size)
+    if getattr(extractor, "per_track", False):
+        face_workers = 1
+
+    def sink(packet: FramePacket) -> None:
+        writer.write(serialize_packet(packet, embeddings=embeddings))
+        if video_writer is not None:
+            video_writer.write(annotate(packet))
+        progress.update()
+
+    pipeline: Pipeline = build_video_pipeline(
+        source=video_source(video_path),
+        detector=batcher or detector,
+        tracker=tracker,
+        extractor=extractor,
+        sink=sink,
+        queue_size=queue_size,
+        detect_workers=batch_size if batcher else 1,
+        face_workers=face_workers,
+        detect_stride=detect_stride,
+        name="offline",
+    )
+    try:
+        stats = pipeline.run()
+    finally:
+        if batcher is not None:
+            batcher.close()
+        writer.close()
+        if video_writer is not None:
+            video_writer.release()
+
+    if progress_interval:
+        progress.print()
+    stats.update(
+        frames=progress.frames,
+        fps=progress.fps,
+        realtime_factor=progress.fps / info["fps"] if info["fps"] else None,
+    )
+    return stats
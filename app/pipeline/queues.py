@@ -0,0 +1,102 @@
+import threading
+from collections import deque
+from typing import Any, Optional, Tuple
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+KEEP_LATEST = "keep_latest"
+POLICIES = (BLOCK, DROP_OLDEST, KEEP_LATEST)
+
+# Marks the end of a stream. It is never dropped and never counts towards the size.
+SENTINEL = object()
+
+
+class StageQueue:
+    """
+    A bounded queue between two pipeline stages with an explicit overflow policy.
+
+    - block: `put` waits until there is room.
+    - drop_oldest: `put` evicts the oldest pending item when full.
+    - keep_latest: `put` evicts every pending item so consumers only see the newest.
+
+    Every dequeued item is given a ticket, increasing without gaps, which lets
+    multi-worker stages restore the input order of their outputs.
+    """
+
+    def __init__(self, maxsize: int = 10, policy: str = BLOCK) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy '{policy}', expected {POLICIES}.")
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.dropped = 0
+
+        self._items = deque()
+        self._size = 0
+        self._ticket = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+    def qsize(self) -> int:
+        with self._lock:
+            return self._size
+
+    def _drop_one(self) -> None:
+        for idx, item in enumerate(self._items):
+            if item is not SENTINEL:
+                del self._items[idx]
+                self._size -= 1
+                self.dropped += 1
+                return
+
+    def put(self, item: Any) -> None:
+        """
+        Adds an item to the queue, applying the overflow policy when full.
+
+        Args:
+            item: The item to enqueue.
+        """
+        with self._not_full:
+            if self.policy == KEEP_LATEST:
+                while self._size:
+                    self._drop_one()
+            elif self._size >= self.maxsize:
+                if self.policy == DROP_OLDEST:
+                    self._drop_one()
+                else:
+                    while self._size >= self.maxsize:
+                        self._not_full.wait()
+            self._items.append(item)
+            self._size += 1
+            self._not_empty.notify()
+
+    def put_sentinel(self) -> None:
+        """Adds an end-of-stream marker, bypassing the capacity and the policy."""
+        with self._lock:
+            self._items.append(SENTINEL)
+            self._not_empty.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Tuple[int, Any]:
+        """
+        Removes the next item from the queue, waiting for one if needed.
+
+        Args:
+            timeout: The maximum number of seconds to wait. Waits forever if None.
+
+        Returns:
+            A (ticket, item) tuple; the item is SENTINEL at the end of the stream.
+
+        Raises:
+            TimeoutError: If no item arrived before the timeout.
+        """
+        with self._not_empty:
+            if not self._not_empty.wait_for(lambda: self._items, timeout=timeout):
+                raise TimeoutError("No item available.")
+            item = self._items.popleft()
+            if item is SENTINEL:
+                return -1, item
+            self._size -= 1
+            ticket = self._ticket
+            self._ticket += 1
+            self._not_full.notify()
+            return ticket, item
@@ -0,0 +1,245 @@
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.pipeline.streams import StreamManager
+from app.pipeline.video import FramePacket
+
+
+def _to_builtin(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def serialize_packet(packet: FramePacket, embeddings: bool = False) -> Dict[str, Any]:
+    """
+    Converts the results of a processed frame to a JSON-serializable dict.
+
+    Embeddings are left out by default to keep the messages small.
+
+    Args:
+        packet: The processed frame.
+        embeddings: Whether to include the face embeddings (`vec`).
+
+    Returns:
+        A dict with the frame index, timestamp and, for each track, its ID, box,
+        confidence and faces (in the person crop coordinates).
+    """
+    tracks = packet.tracks if packet.tracks is not None else []
+    faces = packet.faces or [[] for _ in range(len(tracks))]
+    message = {
+        "frame": packet.index,
+        "timestamp": packet.timestamp,
+        "detected": packet.detected,
+        "tracks": [
+            {
+                "track_id": int(track[4]),
+                "bbox": [float(v) for v in track[:4]],
+                "conf": float(track[5]),
+                "faces": [
+                    {
+                        key: _to_builtin(value)
+                        for key, value in face.items()
+                        if embeddings or key != "vec"
+                    }
+                    for face in track_faces
+                ],
+            }
+            for track, track_faces in zip(tracks, faces)
+        ],
+    }
+    if packet.trace is not None:
+        message["trace_ms"] = {key: 1000 * value for key, value in packet.trace.items()}
+    return message
+
+
+class SessionManager:
+    """
+    Runs named background processing sessions and fans their per-frame results out
+    to asyncio subscribers.
+
+    Sessions are streams of a StreamManager, so the detector and the face extractor
+    are loaded once and shared. Results are produced on worker threads and handed to
+    each subscriber's event loop without blocking it; a slow subscriber loses its
+    oldest messages instead of slowing the session down.
+    """
+
+    def __init__(
+        self,
+        stream_manager_factory: Callable[[Callable[[str, FramePacket], Any]], Any],
+        subscriber_queue_size: int = 32,
+    ) -> None:
+        """
+        Initializes the SessionManager.
+
+        Args:
+            stream_manager_factory: Builds the StreamManager given the sink to use.
+            subscriber_queue_size: The number of messages buffered per subscriber.
+        """
+        self.streams: StreamManager = stream_manager_factory(self._publish)
+        self.streams.on_finish = self._finished
+        self.subscriber_queue_size = subscriber_queue_size
+        self._sources: Dict[str, Any] = {}
+        self._subscribers: Dict[
+            str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]
+        ] = {}
+        self._lock = threading.Lock()
+
+    # ===== SESSIONS =====
+    def start(self, name: str, source: Any) -> Dict[str, Any]:
+        """
+        Starts a session processing a video file, RTSP URL or camera index.
+
+        Args:
+            name: The unique name of the session.
+            source: The video source.
+
+        Returns:
+            The status of the session.
+
+        Raises:
+            ValueError: If a session with this name is running.
+        """
+        label = source if isinstance(source, (str, int)) else type(source).__name__
+        # registered first, so that listing the sessions never misses the source
+        with self._lock:
+            if name in self._sources:
+                raise ValueError(f"Session '{name}' already exists.")
+            self._sources[name] = label
+        try:
+            self.streams.add_stream(name, source)
+        except Exception:
+            with self._lock:
+                self._sources.pop(name, None)
+            raise
+        try:
+            return self.status(name)
+        except KeyError:  # the source already ended
+            return {"name": name, "source": label, "running": False}
+
+    def stop(self, name: str, timeout: Optional[float] = 10.0) -> Dict[str, Any]:
+        """
+        Stops a session and closes the streams of its subscribers.
+
+        Args:
+            name: The name of the session.
+            timeout: The maximum number of seconds to wait for the session to stop.
+
+        Returns:
+            The last status of the session.
+        """
+        status = self.status(name)
+        try:
+            self.streams.remove_stream(name, timeout)
+        except KeyError:
+            pass  # it ended by itself meanwhile
+        self._finished(name)
+        status["running"] = False
+        return status
+
+    def _finished(self, name: str) -> None:
+        """Releases the name of a session and ends the streams of its subscribers."""
+        with self._lock:
+            self._sources.pop(name, None)
+            subscribers = self._subscribers.pop(name, set())
+        for loop, queue in subscribers:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._push, queue, None)
+
+    def status(self, name: str) -> Dict[str, Any]:
+        """
+        Returns the state of a session.
+
+        Args:
+            name: The name of the session.
+
+        Returns:
+            A dict with the source, whether it is running, its frame rate and the
+            depth of each stage queue.
+
+        Raises:
+            KeyError: If the session does not exist.
+        """
+        with self._lock:
+            if name not in self._sources:
+                raise KeyError(name)
+            source = self._sources[name]
+        stats = self.streams.stats()["streams"].get(name)
+        if stats is None:  # starting, or just ended
+            raise KeyError(name)
+        stages = stats["stages"]
+        return {
+            "name": name,
+            "source": source,
+            "running": stats["running"],
+            "frames": stats["produced"],
+            "fps": list(stages.values())[-1]["fps"],
+            "queue_depths": {
+                stage: values["queue_depth"] for stage, values in stages.items()
+            },
+        }
+
+    def sessions(self) -> List[Dict[str, Any]]:
+        sessions = []
+        for name in self.streams.streams():
+            try:
+                sessions.append(self.status(name))
+            except KeyError:
+                continue  # ended meanwhile
+        return sessions
+
+    def close(self) -> None:
+        """Stops every session and releases the shared resources."""
+        for name in self.streams.streams():
+            self.stop(name)
+        self.streams.close()
+
+    # ===== SUBSCRIPTIONS =====
+    def subscribe(self, name: str) -> asyncio.Queue:
+        """
+        Subscribes the running event loop to the results of a session.
+
+        Args:
+            name: The name of the session.
+
+        Returns:
+            asyncio.Queue: Receives one dict per processed frame, then None once the
+            session is stopped or its source ended.
+        """
+        queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
+        with self._lock:
+            # checked under the lock, so that the end of the session is not missed
+            if name not in self._sources:
+                raise KeyError(name)
+            self._subscribers.setdefault(name, set()).add(
+                (asyncio.get_running_loop(), queue)
+            )
+        return queue
+
+    def unsubscribe(self, name: str, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(name, set())
+            for subscriber in list(subscribers):
+                if subscriber[1] is queue:
+                    subscribers.discard(subscriber)
+
+    @staticmethod
+    def _push(queue: asyncio.Queue, message: Any) -> None:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    def _publish(self, name: str, packet: FramePacket) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(name, ()))
+        if not subscribers:
+            return
+        message = serialize_packet(packet)
+        for loop, queue in subscribers:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._push, queue, message)
@@ -0,0 +1,297 @@
+import multiprocessing as mp
+import queue
+from multiprocessing import connection, shared_memory
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+
+class FrameRing:
+    """
+    A fixed-size ring of preallocated frame slots in shared memory.
+
+    Frames are written once into a free slot by the producer; only the slot index
+    and a small metadata dict travel through the queues, so frames are never
+    pickled or copied between processes. A slot goes back to the free list once
+    its consumer releases it, which also throttles the producer when every slot
+    is in use.
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        shape: Tuple[int, ...],
+        dtype: Any = np.uint8,
+        ctx: Optional[Any] = None,
+    ) -> None:
+        """
+        Initializes the FrameRing and allocates its shared memory.
+
+        Args:
+            slots: The number of frame slots.
+            shape: The shape of one frame, e.g. (height, width, 3).
+            dtype: The dtype of the frames. Defaults to uint8.
+            ctx: The multiprocessing context. Defaults to the 'spawn' context.
+        """
+        ctx = ctx or mp.get_context("spawn")
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+
+        size = slots * int(np.prod(self.shape)) * self.dtype.itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._owner = True
+        self._frames = self._view()
+
+        self.free = ctx.Queue()
+        self.ready = ctx.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+
+    def _view(self) -> np.ndarray:
+        return np.ndarray(
+            (self.slots, *self.shape), dtype=self.dtype, buffer=self._shm.buf
+        )
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {
+            "name": self._shm.name,
+            "slots": self.slots,
+            "shape": self.shape,
+            "dtype": self.dtype.str,
+            "free": self.free,
+            "ready": self.ready,
+        }
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.slots = state["slots"]
+        self.shape = state["shape"]
+        self.dtype = np.dtype(state["dtype"])
+        self.free = state["free"]
+        self.ready = state["ready"]
+        # Child processes share the resource tracker of their parent, which stays
+        # the only one allowed to unlink the segment
+        self._shm = shared_memory.SharedMemory(name=state["name"])
+        self._owner = False
+        self._frames = self._view()
+
+    # ===== PRODUCER =====
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        """Waits for a free slot and returns its index."""
+        return self.free.get(timeout=timeout)
+
+    def frame(self, slot: int) -> np.ndarray:
+        """Returns the writable view of a slot."""
+        return self._frames[slot]
+
+    def publish(self, slot: int, meta: Optional[Dict[str, Any]] = None) -> None:
+        """Hands a written slot over to the consumers."""
+        self.ready.put((slot, meta or {}))
+
+    def put(
+        self,
+        frame: np.ndarray,
+        meta: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> int:
+        """
+        Copies a frame into a free slot and publishes it.
+
+        Args:
+            frame: The frame, matching the shape of the ring.
+            meta: The metadata sent along, e.g. the frame index.
+            timeout: The maximum number of seconds to wait for a free slot.
+
+        Returns:
+            The index of the slot used.
+        """
+        slot = self.acquire(timeout=timeout)
+        np.copyto(self._frames[slot], frame)
+        self.publish(slot, meta)
+        return slot
+
+    def close_writer(self, consumers: int = 1) -> None:
+        """Tells every consumer that no more frames will be published."""
+        for _ in range(consumers):
+            self.ready.put(None)
+
+    # ===== CONSUMER =====
+    def get(
+        self, timeout: Optional[float] = None
+    ) -> Optional[Tuple[int, np.ndarray, Dict[str, Any]]]:
+        """
+        Waits for the next published frame.
+
+        Args:
+            timeout: The maximum number of seconds to wait.
+
+        Returns:
+            A (slot, frame, meta) tuple, the frame being a view into shared memory
+            valid until the slot is released, or None at the end of the stream.
+        """
+        item = self.ready.get(timeout=timeout)
+        if item is None:
+            return None
+        slot, meta = item
+        return slot, self._frames[slot], meta
+
+    def release(self, slot: int) -> None:
+        """Returns a slot to the free list once its frame is no longer used."""
+        self.free.put(slot)
+
+    def frames(self) -> Iterator[Tuple[np.ndarray, Dict[str, Any]]]:
+        """
+        Iterates over the published frames until the end of the stream.
+
+        Each slot is released when the next frame is requested, so a frame must be
+        copied if it is needed beyond the current iteration.
+
+        Yields:
+            A (frame, meta) tuple.
+        """
+        while True:
+            item = self.get()
+            if item is None:
+                return
+            slot, frame, meta = item
+            try:
+                yield frame, meta
+            finally:
+                self.release(slot)
+
+    # ===== LIFECYCLE =====
+    def close(self) -> None:
+        """Detaches this process from the shared memory."""
+        self._frames = None
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Frees the shared memory. Only the creating process should call it."""
+        if self._owner:
+            self._shm.unlink()
+
+
+def capture_to_ring(
+    video_path: Union[str, int],
+    ring: FrameRing,
+    consumers: int = 1,
+    stop: Optional[Any] = None,
+    poll: float = 0.5,
+) -> None:
+    """
+    Decodes a video straight into the slots of a FrameRing.
+
+    Args:
+        video_path: The path or URL of the video, or a camera index.
+        ring: The ring receiving the frames.
+        consumers: The number of consumer processes to notify at the end.
+        stop: An optional event aborting the capture once set, e.g. when a consumer
+            died and its slots will never be released.
+        poll: The seconds between two checks of `stop` while every slot is in use.
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        index = 0
+        while cap.isOpened():
+            slot = _acquire(ring, stop, poll)
+            if slot is None:
+                break
+            view = ring.frame(slot)
+            success, frame = cap.read(view)
+            if not success:
+                ring.release(slot)
+                break
+            if frame is not view:
+                np.copyto(view, frame)
+            ring.publish(slot, {"index": index})
+            index += 1
+    finally:
+        cap.release()
+        ring.close_writer(consumers)
+        ring.close()
+
+
+def _acquire(ring: FrameRing, stop: Optional[Any], poll: float) -> Optional[int]:
+    """Waits for a free slot, or returns None once `stop` is set."""
+    while stop is None or not stop.is_set():
+        try:
+            return ring.acquire(timeout=poll)
+        except queue.Empty:
+            continue
+    return None
+
+
+def probe_video(video_path: Union[str, int]) -> Tuple[int, int, int]:
+    """Returns the (height, width, 3) frame shape of a video."""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        success, frame = cap.read()
+        if not success:
+            raise ValueError(f"Failed to read a frame from {video_path}.")
+        return frame.shape
+    finally:
+        cap.release()
+
+
+def run_multiprocess(
+    video_path: Union[str, int],
+    worker: Callable[[FrameRing, int], Any],
+    workers: int = 1,
+    slots: int = 8,
+    ctx: Optional[Any] = None,
+) -> None:
+    """
+    Decodes a video in a capture process and processes its frames in worker
+    processes, the frames being shared through a FrameRing.
+
+    A stateful consumer such as a tracker needs every frame in order, so a stream
+    should be handled by a single worker. Several workers take the frames from one
+    shared queue, each frame going to whichever worker asks first, in no particular
+    order or share, so they only suit stateless processing.
+
+    Args:
+        video_path: The path or URL of the video, or a camera index.
+        worker: A picklable function called as `worker(ring, worker_idx)` in each
+            worker process, typically iterating over `ring.frames()`.
+        workers: The number of worker processes.
+        slots: The number of frame slots of the ring.
+        ctx: The multiprocessing context. Defaults to the 'spawn' context.
+
+    Raises:
+        RuntimeError: If a process failed. The capture stops as soon as a worker
+            exits, so the remaining workers drain the ring and return.
+    """
+    ctx = ctx or mp.get_context("spawn")
+    ring = FrameRing(slots=slots, shape=probe_video(video_path), ctx=ctx)
+    stop = ctx.Event()
+    capture = ctx.Process(
+        target=capture_to_ring,
+        args=(video_path, ring, workers, stop),
+        name="capture",
+    )
+    consumers = [
+        ctx.Process(target=worker, args=(ring, idx), name=f"worker-{idx}")
+        for idx in range(workers)
+    ]
+    processes = [capture, *consumers]
+    try:
+        for process in processes:
+            process.start()
+        # a worker exiting before the end of the capture never releases its slots,
+        # which would block the capture forever once the ring is full
+        connection.wait([process.sentinel for process in processes])
+        if capture.is_alive():
+            stop.set()
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        ring.close()
+        ring.unlink()
+
+    failed = [process.name for process in processes if process.exitcode]
+    if failed:
+        raise RuntimeError(f"The processes {', '.join(failed)} failed.")
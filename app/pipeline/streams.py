@@ -0,0 +1,457 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.modules.face_detect.cache import CachedFaceExtractor
+from app.modules.face_detect.quality import BestFrameSelector
+from app.pipeline.controller import QualityController
+from app.pipeline.engine import Pipeline
+from app.pipeline.queues import KEEP_LATEST
+from app.pipeline.video import FramePacket, build_video_pipeline
+
+
+class DetectionBatcher:
+    """
+    Shares one person detector between several threads by grouping the frames they
+    submit into batched detector calls.
+    """
+
+    def __init__(
+        self,
+        detector: Any,
+        max_batch_size: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        name: str = "detection_batcher",
+    ) -> None:
+        """
+        Initializes the DetectionBatcher.
+
+        Args:
+            detector: The person detector. `inference_batch` is used when available.
+            max_batch_size: The maximum number of frames per detector call. Defaults
+                to the `batch_size` of the detector, or 8.
+            max_wait: The maximum number of seconds a frame waits for a batch to fill.
+                Defaults to the `max_wait` of the detector, or 0.01.
+            name: The name of the batching thread.
+        """
+        self.detector = detector
+        self.max_batch_size = max_batch_size or getattr(detector, "batch_size", 8)
+        self.max_wait = (
+            max_wait if max_wait is not None else getattr(detector, "max_wait", 0.01)
+        )
+        self.batches = 0
+        self.frames = 0
+
+        self._pending: List[tuple] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, frame: Any) -> Future:
+        """
+        Queues a frame for detection.
+
+        Args:
+            frame: The frame to process.
+
+        Returns:
+            Future: Resolves to the detections of the frame.
+        """
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("The detection batcher is closed.")
+            self._pending.append((frame, future))
+            self._cond.notify()
+        return future
+
+    def inference(self, frame: Any) -> Any:
+        """Detects people in a frame, batched with the frames of other callers."""
+        return self.submit(frame).result()
+
+    def close(self) -> None:
+        """Processes the frames still pending and stops the batching thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.frames / self.batches if self.batches else 0.0
+
+    def _next_batch(self) -> List[tuple]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or self._closed)
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+            return batch
+
+    def _detect(self, frames: List[Any]) -> List[Any]:
+        if hasattr(self.detector, "inference_batch"):
+            return self.detector.inference_batch(frames=frames)
+        return [self.detector.inference(frame=frame) for frame in frames]
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if self._closed:
+                    return
+                continue
+
+            frames = [frame for frame, _ in batch]
+            try:
+                results = self._detect(frames)
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"The detector returned {len(results)} results "
+                        f"for {len(batch)} frames."
+                    )
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.frames += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+class _FaceRequest:
+    """The crops of one caller, resolved once all of them are extracted."""
+
+    __slots__ = ("results", "remaining", "future")
+
+    def __init__(self, size: int) -> None:
+        self.results: List[list] = [[] for _ in range(size)]
+        self.remaining = size
+        self.future = Future()
+
+
+class FaceBatcher:
+    """
+    Shares one face extractor between every stream and thread by coalescing the
+    crops they submit into batched calls, with a bounded number of calls in flight.
+    """
+
+    def __init__(
+        self,
+        extractor: Any,
+        max_batch_size: Optional[int] = None,
+        max_wait: float = 0.005,
+        max_concurrency: int = 4,
+        name: str = "face_batcher",
+    ) -> None:
+        """
+        Initializes the FaceBatcher.
+
+        Args:
+            extractor: The face extractor providing `inference_batch`, e.g.
+                FaceInsightExtractor. It must be thread-safe.
+            max_batch_size: The maximum number of crops per extractor call. Defaults
+                to the `max_batch_size` of the extractor, or 16.
+            max_wait: The maximum number of seconds a crop waits for a batch to fill.
+            max_concurrency: The maximum number of extractor calls in flight. While
+                they are all busy, the incoming crops keep accumulating.
+            name: The name of the batching thread.
+        """
+        self.extractor = extractor
+        self.max_batch_size = max_batch_size or getattr(extractor, "max_batch_size", 16)
+        self.max_wait = max_wait
+        self.max_concurrency = max_concurrency
+        self.batches = 0
+        self.crops = 0
+
+        self._pending: List[tuple] = []  # (crop, request, index)
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix=f"{name}-worker"
+        )
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, crops: List[Any]) -> Future:
+        """
+        Queues crops for face extraction.
+
+        Args:
+            crops: The image crops to process. They may be spread over several
+                batches, shared with the crops of other callers.
+
+        Returns:
+            Future: Resolves to a list of face lists aligned with `crops`.
+        """
+        request = _FaceRequest(len(crops))
+        if not crops:
+            request.future.set_result([])
+            return request.future
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("The face batcher is closed.")
+            self._pending.extend((crop, request, idx) for idx, crop in enumerate(crops))
+            self._cond.notify()
+        return request.future
+
+    def inference_batch(self, crops: List[Any]) -> List[list]:
+        """Extracts the faces of several crops, batched with the crops of others."""
+        return self.submit(crops).result()
+
+    def inference(self, frame: Any) -> list:
+        return self.submit([frame]).result()[0]
+
+    def close(self) -> None:
+        """Processes the crops still pending and stops the batching thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.crops / self.batches if self.batches else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            "batches": self.batches,
+            "crops": self.crops,
+            "mean_batch_size": self.mean_batch_size,
+            "pending": pending,
+        }
+
+    def _next_batch(self) -> List[tuple]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or self._closed)
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+            return batch
+
+    def _extract(self, batch: List[tuple]) -> None:
+        try:
+            results = self.extractor.inference_batch([crop for crop, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(
+                    f"The face extractor returned {len(results)} results "
+                    f"for {len(batch)} crops."
+                )
+        except Exception as e:
+            with self._lock:
+                for _, request, _ in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        with self._lock:
+            self.batches += 1
+            self.crops += len(batch)
+            for (_, request, idx), faces in zip(batch, results):
+                request.results[idx] = faces
+                request.remaining -= 1
+                if not request.remaining and not request.future.done():
+                    request.future.set_result(request.results)
+
+    def _run(self) -> None:
+        while True:
+            # wait for a free call before cutting the next batch
+            self._slots.acquire()
+            batch = self._next_batch()
+            if not batch:
+                self._slots.release()
+                if self._closed:
+                    return
+                continue
+            self._executor.submit(self._extract, batch)
+
+
+class StreamManager:
+    """
+    Runs several video sources concurrently. Each stream owns its tracker and its
+    pipeline, while the person detector and the face extractor are shared, with the
+    detections of all streams batched together.
+    """
+
+    def __init__(
+        self,
+        detector: Any,
+        tracker_factory: Callable[[], Any],
+        extractor: Any,
+        sink: Callable[[str, FramePacket], Any],
+        max_batch_size: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        face_cache: bool = True,
+        face_selection_window: int = 0,
+        queue_size: int = 4,
+        capture_policy: str = KEEP_LATEST,
+        detect_stride: int = 1,
+        adaptive_stride: bool = False,
+        target_latency: float = 0.0,
+        on_finish: Optional[Callable[[str], Any]] = None,
+    ) -> None:
+        """
+        Initializes the StreamManager.
+
+        Args:
+            detector: The shared person detector.
+            tracker_factory: Builds a new tracker for each stream, e.g. `Tracking`.
+            extractor: The shared face extractor, e.g. a FaceBatcher shared by the
+                streams of every session. It is not closed by the manager.
+            sink: Called with the stream ID and each processed packet.
+            max_batch_size: The maximum number of frames per detector call.
+            max_wait: The maximum number of seconds a frame waits for a batch to fill.
+            face_cache: Whether each stream caches face results per track.
+            face_selection_window: When above 0, each stream only submits the best
+                crop of each track every `face_selection_window` frames (see
+                BestFrameSelector), instead of caching.
+            queue_size: The capacity of the stage queues of each stream.
+            capture_policy: The policy of the detection queue of each stream.
+            detect_stride: Run the detector every `detect_stride` frames per stream.
+            adaptive_stride: Whether to run the detector early when tracks change.
+            target_latency: When above 0, the frame latency in seconds each stream
+                keeps under by limiting its face lookups per frame (see
+                QualityController). The shared detector is left untouched.
+            on_finish: Called with the stream ID when a stream ends by itself, e.g.
+                at the end of a video file. The stream is then already forgotten.
+        """
+        self.batcher = DetectionBatcher(
+            detector, max_batch_size=max_batch_size, max_wait=max_wait
+        )
+        self.tracker_factory = tracker_factory
+        self.extractor = extractor
+        self.sink = sink
+        self.face_cache = face_cache
+        self.face_selection_window = face_selection_window
+        self.queue_size = queue_size
+        self.capture_policy = capture_policy
+        self.detect_stride = detect_stride
+        self.adaptive_stride = adaptive_stride
+        self.target_latency = target_latency
+        self.on_finish = on_finish
+
+        self._streams: Dict[str, Pipeline] = {}
+        self._lock = threading.Lock()
+
+    def add_stream(self, stream_id: str, source: Any) -> Pipeline:
+        """
+        Starts processing a new source.
+
+        Args:
+            stream_id: The unique ID of the stream.
+            source: A video path, RTSP URL or camera index, or an iterable of packets.
+
+        Returns:
+            Pipeline: The started pipeline of the stream.
+        """
+        with self._lock:
+            if stream_id in self._streams:
+                raise ValueError(f"Stream '{stream_id}' already exists.")
+            extractor = self.extractor
+            if self.face_selection_window > 0:
+                extractor = BestFrameSelector(
+                    self.extractor, window=self.face_selection_window
+                )
+            elif self.face_cache:
+                extractor = CachedFaceExtractor(self.extractor)
+            pipeline = build_video_pipeline(
+                source=source,
+                detector=self.batcher,
+                tracker=self.tracker_factory(),
+                extractor=extractor,
+                sink=lambda packet: self.sink(stream_id, packet),
+                queue_size=self.queue_size,
+                capture_policy=self.capture_policy,
+                detect_stride=self.detect_stride,
+                adaptive_stride=self.adaptive_stride,
+                controller=(
+                    QualityController(self.target_latency, name=f"stream-{stream_id}")
+                    if self.target_latency > 0
+                    else None
+                ),
+                on_finish=lambda: self._finished(stream_id, pipeline),
+                name=f"stream-{stream_id}",
+            )
+            self._streams[stream_id] = pipeline
+        return pipeline.start()
+
+    def _finished(self, stream_id: str, pipeline: Pipeline) -> None:
+        with self._lock:
+            # a removed stream, or a new stream reusing the ID, is left alone
+            if self._streams.get(stream_id) is not pipeline:
+                return
+            del self._streams[stream_id]
+        if self.on_finish is not None:
+            self.on_finish(stream_id)
+
+    def remove_stream(self, stream_id: str, timeout: Optional[float] = None) -> None:
+        """
+        Stops a stream and forgets its state.
+
+        Args:
+            stream_id: The ID of the stream.
+            timeout: The maximum number of seconds to wait for the stream to stop.
+        """
+        with self._lock:
+            pipeline = self._streams.pop(stream_id)
+        pipeline.stop()
+        pipeline.join(timeout)
+
+    def streams(self) -> List[str]:
+        with self._lock:
+            return list(self._streams)
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Waits for every stream to finish."""
+        with self._lock:
+            pipelines = list(self._streams.values())
+        for pipeline in pipelines:
+            pipeline.join(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stops every stream and the detection batcher."""
+        for stream_id in self.streams():
+            self.remove_stream(stream_id, timeout)
+        self.batcher.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the stats of every stream and of the shared batchers."""
+        with self._lock:
+            streams = {sid: pipeline.stats() for sid, pipeline in self._streams.items()}
+        stats = {
+            "streams": streams,
+            "detection": {
+                "batches": self.batcher.batches,
+                "frames": self.batcher.frames,
+                "mean_batch_size": self.batcher.mean_batch_size,
+            },
+        }
+        if isinstance(self.extractor, FaceBatcher):
+            stats["faces"] = self.extractor.stats()
+        return stats
@@ -0,0 +1,251 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+import cv2
+import numpy as np
+
+from app.common.utils.image import crop_images, largest_boxes
+from app.modules.tracking.stride import StridedTracking
+from app.pipeline.engine import Pipeline, Stage
+from app.pipeline.queues import BLOCK
+
+
+@dataclass
+class FramePacket:
+    """A video frame and the results attached to it by the pipeline stages."""
+
+    index: int
+    frame: Any
+    timestamp: float = field(default_factory=time.time)
+    detections: Any = None
+    tracks: Any = None
+    faces: Optional[List[list]] = None
+    detected: bool = True
+    trace: Optional[Dict[str, float]] = None
+
+
+def video_source(video_path: Union[str, int] = 0) -> Iterator[FramePacket]:
+    """
+    Reads the frames of a video file, stream URL or camera.
+
+    Args:
+        video_path: The path or URL of the video. Defaults to the webcam.
+
+    Yields:
+        FramePacket: The decoded frames, in order.
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        index = 0
+        while cap.isOpened():
+            success, frame = cap.read()
+            if not success:
+                break
+            yield FramePacket(index=index, frame=frame)
+            index += 1
+    finally:
+        cap.release()
+
+
+def detect_step(detector: Any) -> Callable[[FramePacket], FramePacket]:
+    """Builds the stage function running person detection on a packet."""
+
+    def step(packet: FramePacket) -> FramePacket:
+        packet.detections = detector.inference(frame=packet.frame)
+        return packet
+
+    return step
+
+
+def track_step(tracker: Any) -> Callable[[FramePacket], FramePacket]:
+    """Builds the stage function updating the tracker with a packet's detections."""
+
+    def step(packet: FramePacket) -> FramePacket:
+        packet.tracks = tracker.inference(
+            detections=packet.detections, frame=packet.frame
+        )
+        return packet
+
+    return step
+
+
+def detect_track_step(
+    tracking: StridedTracking,
+) -> Callable[[FramePacket], FramePacket]:
+    """Builds the stage function detecting and tracking with a detection stride."""
+
+    def step(packet: FramePacket) -> FramePacket:
+        detected_frames = tracking.detected_frames
+        packet.tracks = tracking.inference(frame=packet.frame)
+        packet.detected = tracking.detected_frames > detected_frames
+        return packet
+
+    return step
+
+
+def face_step(
+    extractor: Any, max_faces: Optional[Callable[[], Optional[int]]] = None
+) -> Callable[[FramePacket], FramePacket]:
+    """
+    Builds the stage function extracting the faces of every tracked person.
+
+    The extractor either keeps per-track state (`per_track`, e.g. CachedFaceExtractor
+    or BestFrameSelector) and takes the frame and the tracks, or provides
+    `inference_batch` over person crops.
+
+    `max_faces` returns the number of face lookups allowed for the current frame, e.g.
+    from a QualityController. A per-track extractor receives it as `max_lookups`, so
+    that only its actual lookups are limited and its cached results still served.
+    Otherwise only the largest tracks are looked up, the others get no faces.
+    """
+
+    def step(packet: FramePacket) -> FramePacket:
+        tracks = packet.tracks if packet.tracks is not None else []
+        limit = max_faces() if max_faces is not None else None
+        if len(tracks) == 0:
+            packet.faces = []
+        elif getattr(extractor, "per_track", False):
+            packet.faces = extractor.inference(
+                frame=packet.frame, tracks=tracks, max_lookups=limit
+            )
+        elif limit is not None and len(tracks) > limit:
+            keep = largest_boxes(tracks, limit)
+            crops, _ = crop_images(image=packet.frame, boxes=np.asarray(tracks)[keep])
+            packet.faces = [[] for _ in range(len(tracks))]
+            for idx, track_faces in zip(keep, extractor.inference_batch(crops=crops)):
+                packet.faces[idx] = track_faces
+        else:
+            crops, _ = crop_images(image=packet.frame, boxes=tracks)
+            packet.faces = extractor.inference_batch(crops=crops)
+        return packet
+
+    return step
+
+
+def observed_sink(
+    sink: Callable[[FramePacket], Any], controller: Any
+) -> Callable[[FramePacket], Any]:
+    """Builds the sink stage function reporting every packet to a controller."""
+
+    def step(packet: FramePacket) -> Any:
+        controller.observe(packet)
+        return sink(packet)
+
+    return step
+
+
+def build_video_pipeline(
+    source: Any,
+    detector: Any,
+    tracker: Any,
+    extractor: Any,
+    sink: Callable[[FramePacket], Any],
+    queue_size: int = 10,
+    capture_policy: str = BLOCK,
+    sink_policy: str = BLOCK,
+    detect_workers: int = 1,
+    face_workers: int = 1,
+    detect_stride: int = 1,
+    adaptive_stride: bool = False,
+    motion_threshold: float = 0.1,
+    trace: bool = False,
+    controller: Any = None,
+    on_finish: Optional[Callable[[], Any]] = None,
+    name: str = "video",
+) -> Pipeline:
+    """
+    Builds the capture -> detect -> track -> face -> sink pipeline.
+
+    Args:
+        source: A video path, URL or camera index, or an iterable of FramePackets.
+        detector: The person detection service.
+        tracker: The tracking service. Its stage always runs on one worker, in order.
+        extractor: The face extraction service.
+        sink: The function consuming the processed packets.
+        queue_size: The capacity of every stage queue.
+        capture_policy: The policy of the detection queue. Use 'keep_latest' or
+            'drop_oldest' for live sources that must not lag behind.
+        sink_policy: The policy of the sink queue.
+        detect_workers: The number of concurrent detection workers. Combined with a
+            DetectionBatcher, consecutive frames of the stream are detected in one
+            batch; the tracker still receives them in order.
+        face_workers: The number of concurrent face extraction workers. Keep it to 1
+            with a CachedFaceExtractor, which is not thread-safe.
+        detect_stride: Run the detector every `detect_stride` frames and predict the
+            tracks in between (see StridedTracking). Detection and tracking then
+            share one stage.
+        adaptive_stride: Whether to run the detector early when the tracks change.
+        motion_threshold: The relative motion triggering an early detection.
+        trace: Whether to record the seconds spent per stage and service in the
+            `trace` dict of every packet.
+        controller: An optional QualityController keeping the frame latency under
+            its target. It sees every packet reaching the sink and limits the face
+            lookups per frame.
+        on_finish: Called once the pipeline has finished, see Pipeline.
+        name: The name of the pipeline.
+
+    Returns:
+        Pipeline: The pipeline, not started yet.
+    """
+    if isinstance(source, (str, int)):
+        source = video_source(source)
+
+    reporters = {}
+    if detect_stride > 1 or adaptive_stride:
+        tracking = StridedTracking(
+            detector=detector,
+            tracker=tracker,
+            stride=detect_stride,
+            adaptive=adaptive_stride,
+            motion_threshold=motion_threshold,
+        )
+        reporters["tracking"] = tracking.stats
+        stages = [
+            Stage(
+                "detect_track",
+                detect_track_step(tracking),
+                queue_size=queue_size,
+                policy=capture_policy,
+            )
+        ]
+    else:
+        stages = [
+            Stage(
+                "detect",
+                detect_step(detector),
+                workers=detect_workers,
+                queue_size=queue_size,
+                policy=capture_policy,
+            ),
+            Stage("track", track_step(tracker), queue_size=queue_size),
+        ]
+
+    max_faces = None
+    if controller is not None:
+        reporters["quality"] = controller.stats
+        sink = observed_sink(sink, controller)
+
+        def max_faces() -> Optional[int]:
+            return controller.max_faces
+
+    stages += [
+        Stage(
+            "face",
+            face_step(extractor, max_faces),
+            workers=face_workers,
+            queue_size=queue_size,
+        ),
+        Stage("sink", sink, queue_size=queue_size, policy=sink_policy),
+    ]
+    pipeline = Pipeline(
+        source=source,
+        stages=stages,
+        name=name,
+        reporters=reporters,
+        trace=trace,
+        on_finish=on_finish,
+    )
+    if controller is not None:
+        controller.watch(pipeline)
+    return pipeline
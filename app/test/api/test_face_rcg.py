@@ -0,0 +1,106 @@
+import time
+
+import numpy as np
+from fastapi import FastAPI, WebSocketDisconnect
+from fastapi.testclient import TestClient
+
+from app.api.routes import face_rcg
+from app.pipeline import FramePacket, StreamManager
+from app.pipeline.sessions import SessionManager
+
+
+class _FakeDetector:
+    def inference(self, frame):
+        return np.array([[0, 0, 10, 10, 0.9, 0]])
+
+
+class _FakeTracker:
+    def inference(self, detections, frame):
+        return np.array([[0, 0, 10, 10, 7, 0.9, 0, 0]])
+
+
+class _FakeExtractor:
+    def inference_batch(self, crops):
+        return [[{"prob": 0.9, "bbox": np.array([1, 2, 3, 4]), "vec": [0.1]}]]
+
+
+def _slow_source(frames: int):
+    frame = np.zeros((16, 16, 3), dtype=np.uint8)
+    for index in range(frames):
+        time.sleep(0.02)
+        yield FramePacket(index=index, frame=frame)
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.include_router(face_rcg.router)
+    app.state.sessions = SessionManager(
+        lambda sink: StreamManager(
+            detector=_FakeDetector(),
+            tracker_factory=_FakeTracker,
+            extractor=_FakeExtractor(),
+            sink=sink,
+            capture_policy="block",
+        )
+    )
+    return TestClient(app)
+
+
+def _wait_released(client: TestClient, name: str, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while client.get(f"/sessions/{name}").status_code != 404:
+        assert time.monotonic() < deadline, f"session {name} was not released"
+        time.sleep(0.01)
+
+
+def test_session_lifecycle():
+    """Checks sessions can be started, streamed, inspected and stopped."""
+
+    client = _client()
+    response = client.post("/start", json={"name": "cam", "source": "unused"})
+    assert response.status_code == 200  # the file does not exist, the session ends
+    _wait_released(client, "cam")
+
+    client.app.state.sessions.start("cam", _slow_source(500))
+
+    with client.websocket_connect("/sessions/cam/results") as websocket:
+        message = websocket.receive_json()
+    assert message["tracks"][0]["track_id"] == 7
+    assert message["tracks"][0]["faces"] == [{"prob": 0.9, "bbox": [1, 2, 3, 4]}]
+
+    status = client.get("/sessions/cam").json()
+    assert status["running"] and set(status["queue_depths"]) == {
+        "detect",
+        "track",
+        "face",
+        "sink",
+    }
+
+    assert client.post("/stop", json={"name": "cam"}).status_code == 200
+    assert client.post("/stop", json={"name": "cam"}).status_code == 404
+    assert client.get("/sessions").json() == []
+    client.app.state.sessions.close()
+
+
+def test_session_source_ends():
+    """Checks subscribers are closed and the name released when a source ends."""
+
+    client = _client()
+    client.app.state.sessions.start("cam", _slow_source(10))
+
+    frames = []
+    with client.websocket_connect("/sessions/cam/results") as websocket:
+        try:
+            while True:
+                frames.append(websocket.receive_json()["frame"])
+        except WebSocketDisconnect:
+            pass
+
+    assert frames and frames == sorted(frames)
+    _wait_released(client, "cam")
+    assert client.get("/sessions").json() == []
+    assert (
+        client.post("/start", json={"name": "cam", "source": "unused"}).status_code
+        == 200
+    )
+    client.app.state.sessions.close()
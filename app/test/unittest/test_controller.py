@@ -0,0 +1,188 @@
+import time
+
+import numpy as np
+
+from app.common.metrics import REGISTRY
+from app.modules.face_detect.cache import CachedFaceExtractor, FaceResultCache
+from app.modules.face_detect.roi import FaceRoiExtractor
+from app.pipeline import FramePacket, QualityController, build_video_pipeline
+from app.pipeline.video import face_step
+
+
+class _FakeDetector:
+    def __init__(self):
+        self.imgsz = 640
+        self.threshold = 0.75
+
+    def inference(self, frame):
+        return np.array([[0, 0, 10, 10, 0.9, 0]])
+
+
+class _FakeTracker:
+    def inference(self, detections, frame):
+        return np.array([[0, 0, 10, 10, 1, 0.9, 0, 0]])
+
+
+class _FakeExtractor:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def inference_batch(self, crops):
+        self.batch_sizes.append(len(crops))
+        return [[{"prob": float(crop.shape[1])}] for crop in crops]
+
+
+def _stages(queue_depth=0, dropped=0, processed=0, latency_ms=5):
+    return {
+        "detect": {
+            "queue_depth": queue_depth,
+            "dropped": dropped,
+            "processed": processed,
+            "latency_ms": latency_ms,
+        }
+    }
+
+
+def test_controller_degrades_and_recovers():
+    """Checks the knobs follow the latency, one level per decision."""
+
+    REGISTRY.clear()
+    detector = _FakeDetector()
+    roi = FaceRoiExtractor(_FakeExtractor(), max_side=320)
+    controller = QualityController(
+        0.1, detector=detector, face_roi=roi, recover_after=2, name="cam"
+    )
+    assert controller.max_faces is None
+
+    assert controller.update([0.2] * 10, _stages()) == 1
+    assert controller.update([0.2] * 10, _stages()) == 2
+    assert (detector.imgsz, detector.threshold) == (512, 0.8)
+    assert (controller.max_faces, roi.max_side) == (6, 224)
+    assert REGISTRY.gauge("quality_level", controller="cam") == 2
+    assert REGISTRY.gauge("quality_imgsz", controller="cam") == 512
+
+    # between the recovery ratio and the target: the level holds
+    assert controller.update([0.08], _stages()) == 2
+    assert controller.update([0.01], _stages()) == 2
+    assert controller.update([0.01], _stages()) == 1
+    assert (
+        REGISTRY.counter("quality_changes_total", direction="recover", controller="cam")
+        == 1
+    )
+    assert controller.stats()["degrades"] == 2
+
+
+def test_controller_queue_pressure():
+    """Checks full queues and drops degrade even when the latency looks fine."""
+
+    controller = QualityController(1.0)
+    controller._capacities = {"detect": 10}
+
+    assert controller.update([0.01], _stages(queue_depth=9)) == 1
+    assert controller.update([0.01], _stages(dropped=3)) == 2
+    assert controller.update([0.01], _stages(dropped=3)) == 2
+    assert "imgsz" not in controller.stats()
+
+
+def test_controller_keeps_the_configured_knobs():
+    """Checks level 0 is the configuration, full size crops included."""
+
+    detector = _FakeDetector()
+    detector.imgsz, detector.threshold = 600, 0.97
+    roi = FaceRoiExtractor(_FakeExtractor(), max_side=0)
+    controller = QualityController(0.1, detector=detector, face_roi=roi)
+
+    assert (detector.imgsz, detector.threshold, roi.max_side) == (600, 0.97, 0)
+    controller.update([0.2], _stages())
+    assert roi.max_side == 256
+
+
+def test_controller_bottleneck_follows_the_interval():
+    """Checks the bottleneck comes from the last interval, not the mean since start."""
+
+    controller = QualityController(1.0)
+    slow = _stages(processed=100, latency_ms=50)["detect"]
+    stages = {"detect": slow, "face": dict(slow, latency_ms=10)}
+    controller.update([0.01], stages)
+    assert controller.bottleneck == "detect"
+
+    # detect got fast, face slow: the means since start still point to detect
+    stages = {
+        "detect": dict(slow, processed=200, latency_ms=(5000 + 100 * 5) / 200),
+        "face": dict(slow, processed=200, latency_ms=(1000 + 100 * 40) / 200),
+    }
+    controller.update([0.01], stages)
+    assert controller.bottleneck == "face"
+
+
+def test_face_step_max_faces():
+    """Checks only the largest tracks are looked up under a face budget."""
+
+    extractor = _FakeExtractor()
+    step = face_step(extractor, max_faces=lambda: 2)
+    tracks = np.array(
+        [
+            [0, 0, 10, 20, 1, 0.9, 0, 0],
+            [0, 0, 30, 60, 2, 0.9, 0, 0],
+            [0, 0, 20, 40, 3, 0.9, 0, 0],
+        ]
+    )
+    packet = FramePacket(index=0, frame=np.zeros((64, 64, 3), dtype=np.uint8))
+    packet.tracks = tracks
+    faces = step(packet).faces
+
+    assert extractor.batch_sizes == [2]
+    assert faces == [[], [{"prob": 30.0}], [{"prob": 20.0}]]
+
+
+def test_pipeline_with_controller():
+    """Checks the controller sees the frames reaching the sink."""
+
+    frame = np.zeros((32, 32, 3), dtype=np.uint8)
+    source = [
+        FramePacket(index=i, frame=frame, timestamp=time.time() - 1) for i in range(5)
+    ]
+    detector = _FakeDetector()
+    controller = QualityController(0.5, detector=detector, interval=0)
+    pipeline = build_video_pipeline(
+        source=source,
+        detector=detector,
+        tracker=_FakeTracker(),
+        extractor=_FakeExtractor(),
+        sink=lambda packet: None,
+        controller=controller,
+    )
+    stats = pipeline.run()
+
+    assert stats["quality"]["degrades"] >= 1
+    assert detector.imgsz < 640
+
+
+def test_face_step_max_faces_per_track():
+    """Checks the budget only limits the lookups of a per-track extractor."""
+
+    extractor = _FakeExtractor()
+    cached = CachedFaceExtractor(extractor, cache=FaceResultCache(ttl_frames=2))
+    limit = [None]
+    step = face_step(cached, max_faces=lambda: limit[0])
+    tracks = np.array(
+        [
+            [0, 0, 10, 20, 1, 0.9, 0, 0],
+            [0, 0, 30, 60, 2, 0.9, 0, 0],
+            [0, 0, 20, 40, 3, 0.9, 0, 0],
+        ]
+    )
+    frame = np.zeros((64, 64, 3), dtype=np.uint8)
+
+    def run():
+        packet = FramePacket(index=0, frame=frame)
+        packet.tracks = tracks
+        return step(packet).faces
+
+    run()
+    limit[0] = 1
+    fresh = run()  # served from the cache, no lookup
+    stale = run()  # every entry expired, only the largest track is looked up
+
+    assert extractor.batch_sizes == [3, 1]
+    assert all(fresh) and all(stale)
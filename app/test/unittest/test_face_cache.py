@@ -0,0 +1,79 @@
+import numpy as np
+
+from app.modules.face_detect.cache import CachedFaceExtractor, FaceResultCache
+
+
+class _FakeExtractor:
+    def __init__(self):
+        self.calls = []
+
+    def inference_batch(self, crops):
+        self.calls.append(len(crops))
+        return [[{"prob": 0.95, "bbox": [0, 0, 10, 10]}] for _ in crops]
+
+
+def test_face_result_cache():
+    """Checks hits, TTL and scale-change refreshes and idle eviction."""
+
+    cache = FaceResultCache(ttl_frames=5, ttl_seconds=10, max_idle_frames=3)
+    faces = [{"prob": 0.9, "bbox": [0, 0, 10, 20], "landmarks": [[5, 5]]}]
+    cache.put(1, [0, 0, 100, 200], faces, frame_idx=0, now=0.0)
+
+    hit = cache.get(1, [10, 10, 110, 210], frame_idx=1, now=0.1)
+    assert hit[0]["bbox"] == [0, 0, 10, 20]
+
+    # 10% larger box => face is rescaled
+    hit = cache.get(1, [0, 0, 110, 220], frame_idx=2, now=0.2)
+    assert np.allclose(hit[0]["bbox"], [0, 0, 11, 22])
+    assert np.allclose(hit[0]["landmarks"], [[5.5, 5.5]])
+
+    assert cache.get(1, [0, 0, 200, 400], frame_idx=3, now=0.3) is None  # scale
+    assert cache.get(1, [0, 0, 100, 200], frame_idx=5, now=0.5) is None  # ttl
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    cache.put(2, [0, 0, 100, 200], [{"prob": 0.3}], frame_idx=5, now=0.5)
+    assert cache.get(2, [0, 0, 100, 200], frame_idx=6, now=0.6) is None  # low prob
+
+    assert cache.evict_idle(frame_idx=10) == 2
+    assert len(cache) == 0
+
+
+def test_cached_face_extractor():
+    """Checks only new tracks reach the extractor."""
+
+    extractor = _FakeExtractor()
+    service = CachedFaceExtractor(extractor=extractor)
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    tracks = np.array([[0, 0, 50, 100, 1, 0.9, 0, 0], [60, 0, 110, 100, 2, 0.9, 0, 0]])
+
+    first = service.inference(frame=frame, tracks=tracks)
+    second = service.inference(frame=frame, tracks=tracks)
+
+    assert extractor.calls == [2]
+    assert first == second
+    assert service.cache.hit_rate == 0.5
+
+
+def test_edge_tracks_are_cached_by_their_clipped_box():
+    """Checks a track leaving the frame keeps its face on the visible crop."""
+
+    extractor = _FakeExtractor()
+    service = CachedFaceExtractor(extractor=extractor)
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+
+    service.inference(frame=frame, tracks=np.array([[-50, 0, 50, 100, 1, 0.9, 0, 0]]))
+    # the box moved by 5 pixels but its visible crop did not change
+    hit = service.inference(
+        frame=frame, tracks=np.array([[-45, 0, 55, 100, 1, 0.9, 0, 0]])
+    )
+
+    assert extractor.calls == [1]
+    assert np.allclose(hit[0][0]["bbox"], [0, 0, 11, 10])
+
+
+def test_empty_boxes_are_misses():
+    cache = FaceResultCache()
+    cache.put(1, [10, 10, 10, 50], [{"prob": 0.9, "bbox": [0, 0, 1, 1]}], frame_idx=0)
+
+    assert cache.get(1, [10, 10, 20, 50], frame_idx=1) is None
+    assert cache.peek(1, [10, 10, 20, 50]) is None
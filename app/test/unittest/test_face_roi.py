@@ -0,0 +1,97 @@
+import numpy as np
+
+from app.common.metrics import REGISTRY, render_prometheus
+from app.common.utils.file import image_to_bytes
+from app.common.utils.image import crop_images, face_to_frame
+from app.modules.face_detect.roi import FaceRoiExtractor
+
+
+class _CornerExtractor:
+    """Returns a face spanning each image, with a landmark at its center."""
+
+    def __init__(self):
+        self.shapes = []
+
+    def inference_batch(self, crops):
+        faces = []
+        for crop in crops:
+            self.shapes.append(crop.shape[:2])
+            h, w = crop.shape[:2]
+            faces.append([{"bbox": [0, 0, w, h], "landmarks": [[w / 2, h / 2]]}])
+        return faces
+
+
+def test_faces_are_mapped_back_to_the_person_crop():
+    """Checks the head region is downsized and the faces mapped back exactly."""
+    REGISTRY.clear()
+    inner = _CornerExtractor()
+    extractor = FaceRoiExtractor(inner, head_ratio=0.5, width_ratio=0.5, max_side=50)
+    crop = np.zeros((400, 200, 3), dtype=np.uint8)
+
+    face = extractor.inference_batch([crop])[0][0]
+
+    assert inner.shapes == [(50, 25)]
+    # each region pixel covers 4x4 crop pixels, mapped back to their center
+    assert np.allclose(face["bbox"], [51.5, 1.5, 151.5, 201.5])
+    assert np.allclose(face["landmarks"], [[101.5, 101.5]])
+
+
+def test_encoded_bytes_are_measured():
+    """Checks the encoded sizes are sampled every `measure_every` batches."""
+    REGISTRY.clear()
+    extractor = FaceRoiExtractor(_CornerExtractor(), max_side=32, measure_every=2)
+    crop = np.random.default_rng(0).integers(0, 255, (256, 128, 3), dtype=np.uint8)
+
+    for _ in range(3):
+        extractor.inference_batch([crop])
+    roi_bytes = len(image_to_bytes(extractor.narrow(crop)[0]))
+    stats = extractor.stats()
+
+    assert stats["measured_crops"] == 2
+    assert stats["roi_bytes"] == 2 * roi_bytes
+    assert stats["saved_ratio"] > 0.9
+    assert f'face_crop_encoded_bytes_total{{stage="roi"}} {2 * roi_bytes}' in (
+        render_prometheus()
+    )
+
+
+class _BrightestPixel:
+    """Returns a face on the brightest pixel of each image."""
+
+    def inference_batch(self, crops):
+        faces = []
+        for crop in crops:
+            y, x = np.unravel_index(np.argmax(crop[..., 0]), crop.shape[:2])
+            faces.append([{"bbox": [x, y, x, y], "landmarks": [[x, y]]}])
+        return faces
+
+
+def test_faces_round_trip_to_the_frame():
+    """Checks a face found in the downsized region lands on its frame position."""
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    frame[70:74, 190:194] = 255  # the crop starts at (100, 50)
+    person = [100.7, 50.2, 300, 450]
+    extractor = FaceRoiExtractor(
+        _BrightestPixel(), head_ratio=0.5, width_ratio=0.5, max_side=50
+    )
+
+    crops, _ = crop_images(frame, [person])
+    bbox, landmarks = face_to_frame(extractor.inference_batch(crops)[0][0], person)
+
+    assert np.allclose(bbox, [191.5, 71.5, 191.5, 71.5])
+    assert np.allclose(landmarks, [[191.5, 71.5]])
+
+
+def test_empty_crops_are_passed_through():
+    extractor = FaceRoiExtractor(_CornerExtractor(), max_side=0)
+    crop = np.zeros((40, 20, 3), dtype=np.uint8)
+
+    results = extractor.inference_batch([np.zeros((0, 0, 3), np.uint8), crop])
+
+    assert np.allclose(results[1][0]["bbox"], [0, 0, 20, 20])
+
+
+def test_jpeg_quality():
+    image = np.random.default_rng(0).integers(0, 255, (64, 64, 3), dtype=np.uint8)
+
+    assert len(image_to_bytes(image, quality=50)) < len(image_to_bytes(image))
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.modules.face_detect.mediapipe_detector import _to_faces
+from app.modules.face_detect.router import FaceRouter
+
+
+class _FakeExtractor:
+    def __init__(self, faces):
+        self.faces = faces
+        self.calls = []
+
+    def inference_batch(self, crops):
+        self.calls.append(len(crops))
+        return [list(self.faces(crop)) for crop in crops]
+
+
+def _crops():
+    # the first pixel tells whether the crop holds a face
+    return [np.full((8, 8, 3), value, dtype=np.uint8) for value in (1, 0, 1)]
+
+
+def test_remote_is_only_called_for_crops_with_a_face():
+    local = _FakeExtractor(lambda crop: [{"prob": 0.9}] if crop[0, 0, 0] else [])
+    remote = _FakeExtractor(lambda crop: [{"prob": 0.9, "vec": [0.0]}])
+    router = FaceRouter(local=local, remote=remote)
+
+    results = router.inference_batch(_crops())
+
+    assert remote.calls == [2]
+    assert [bool(faces and "vec" in faces[0]) for faces in results] == [
+        True,
+        False,
+        True,
+    ]
+    assert router.stats() == {"local_crops": 3, "remote_crops": 2}
+
+
+def test_routes():
+    local = _FakeExtractor(lambda crop: [{"prob": 0.9}])
+    remote = _FakeExtractor(lambda crop: [{"prob": 0.9, "vec": [0.0]}])
+    router = FaceRouter(local=local, remote=remote, route="never")
+
+    assert "vec" not in router.inference(_crops()[0])[0]
+    assert remote.calls == []
+    assert "vec" in router.inference(_crops()[0], route="always")[0]
+    assert local.calls == [1]
+
+
+def test_mediapipe_result_uses_the_insightface_schema():
+    detection = SimpleNamespace(
+        bounding_box=SimpleNamespace(origin_x=10, origin_y=20, width=30, height=40),
+        categories=[SimpleNamespace(score=0.8)],
+        keypoints=[SimpleNamespace(x=0.5, y=0.25)],
+    )
+    faces = _to_faces(SimpleNamespace(detections=[detection]), width=100, height=200)
+
+    assert faces == [{"bbox": [10, 20, 40, 60], "prob": 0.8, "landmarks": [[50, 50]]}]
+
+
+def test_local_faces_are_kept_when_the_remote_fails():
+    local = _FakeExtractor(lambda crop: [{"prob": 0.9}] if crop[0, 0, 0] else [])
+    remote = _FakeExtractor(lambda crop: [])  # e.g. the request timed out
+    router = FaceRouter(local=local, remote=remote)
+
+    results = router.inference_batch(_crops())
+
+    assert results == [[{"prob": 0.9}], [], [{"prob": 0.9}]]
@@ -0,0 +1,113 @@
+import asyncio
+
+import cv2
+import httpx
+import numpy as np
+import pytest
+
+from app.common.utils.file import ImageCache, aload_images, load_images
+
+
+def _jpeg(value: int) -> bytes:
+    image = np.full((8, 8, 3), value, dtype=np.uint8)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def _client(requests: list) -> httpx.AsyncClient:
+    """Serves /<value>.jpg with an ETag, answering 304 when it matches."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        if request.url.path == "/missing.jpg":
+            return httpx.Response(404)
+        etag = f'"{request.url.path}"'
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"etag": etag})
+        value = int(request.url.path.strip("/").split(".")[0])
+        return httpx.Response(200, content=_jpeg(value), headers={"etag": etag})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_load_images(tmp_path):
+    """Checks URLs and files are loaded concurrently and failures are reported."""
+    path = tmp_path / "local.jpg"
+    path.write_bytes(_jpeg(200))
+    sources = [f"http://images/{v}.jpg" for v in (10, 20, 30)]
+    sources += ["http://images/missing.jpg", str(path)]
+
+    async def run():
+        client = _client([])
+        results = [r async for r in aload_images(sources, concurrency=2, client=client)]
+        await client.aclose()
+        return results
+
+    results = sorted(asyncio.run(run()))
+
+    assert [r.index for r in results] == [0, 1, 2, 3, 4]
+    assert [int(r.image[0, 0, 0]) // 10 for r in results if r.image is not None] == [
+        1,
+        2,
+        3,
+        20,
+    ]
+    assert isinstance(results[3].error, httpx.HTTPStatusError)
+
+
+def test_cached_images_are_revalidated_by_etag():
+    requests = []
+    cache = ImageCache(max_bytes=1024 * 1024)
+    sources = ["http://images/10.jpg", "http://images/20.jpg"]
+
+    async def run():
+        client = _client(requests)
+        for _ in range(2):
+            async for _ in aload_images(sources, client=client, cache=cache):
+                pass
+        await client.aclose()
+
+    asyncio.run(run())
+
+    assert len(requests) == 4
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert len(cache) == 2
+
+
+def test_cache_is_bounded():
+    cache = ImageCache(max_bytes=10)
+    cache.put("a", b"123456", etag=None)
+    cache.put("b", b"123456", etag=None)
+
+    assert cache.get("a") is None
+    assert cache.size == 6
+
+
+def test_load_images_stops_early(tmp_path):
+    paths = []
+    for idx in range(20):
+        path = tmp_path / f"{idx}.jpg"
+        path.write_bytes(_jpeg(idx))
+        paths.append(str(path))
+
+    loaded = load_images(paths, concurrency=2)
+    first = next(loaded)
+    loaded.close()
+
+    assert first.image is not None
+
+
+def test_failing_sources_are_raised(tmp_path):
+    """Checks an error of the sources iterable reaches the caller instead of hanging."""
+    path = tmp_path / "local.jpg"
+    path.write_bytes(_jpeg(50))
+
+    def sources():
+        yield str(path)
+        raise OSError("listing failed")
+
+    loaded = []
+    with pytest.raises(OSError, match="listing failed"):
+        for item in load_images(sources(), concurrency=2):
+            loaded.append(item)
+
+    assert len(loaded) <= 1
@@ -0,0 +1,43 @@
+import numpy as np
+
+from app.modules.recognition.gallery import FaceGallery
+
+
+def test_gallery_search():
+    """Checks batched top-k search and incremental add/remove."""
+
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(50, 16)).astype(np.float32)
+    gallery = FaceGallery(dim=16, capacity=4)
+    gallery.add([f"id-{i}" for i in range(50)], embeddings)
+
+    queries = embeddings[[3, 7, 42]] * 5 + rng.normal(scale=0.01, size=(3, 16))
+    scores, ids = gallery.search(queries, k=3)
+
+    assert [matches[0] for matches in ids] == ["id-3", "id-7", "id-42"]
+    assert scores.shape == (3, 3) and np.all(np.diff(scores, axis=1) <= 0)
+    assert np.allclose(scores[:, 0], 1, atol=1e-3)
+
+    assert gallery.remove(["id-7", "unknown"]) == 1
+    assert len(gallery) == 49 and "id-7" not in gallery
+    assert gallery.identify(queries, threshold=0.99) == ["id-3", None, "id-42"]
+
+
+def test_gallery_persistence(tmp_path):
+    """Checks a saved gallery is memory-mapped on load and stays editable."""
+
+    rng = np.random.default_rng(1)
+    embeddings = rng.normal(size=(10, 8)).astype(np.float32)
+    gallery = FaceGallery(dim=8)
+    gallery.add([str(i) for i in range(10)], embeddings)
+    gallery.save(str(tmp_path))
+
+    loaded = FaceGallery.load(str(tmp_path))
+    assert isinstance(loaded.embeddings, np.memmap)
+    assert loaded.identify(embeddings[[5]]) == ["5"]
+
+    loaded.add(["new"], rng.normal(size=(1, 8)))
+    loaded.remove(["0"])
+    assert len(loaded) == 10 and loaded.identify(embeddings[[9]]) == ["9"]
+    # the file on disk is left untouched
+    assert len(FaceGallery.load(str(tmp_path))) == 10
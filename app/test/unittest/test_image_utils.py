@@ -0,0 +1,55 @@
+import numpy as np
+
+from app.common.utils.image import (
+    adjust_bbox,
+    adjust_bboxes,
+    adjust_landmarks,
+    crop_image,
+    crop_images,
+    reproject_landmarks,
+    xyxy_to_xywh,
+    xyxy_to_xywh_batch,
+)
+
+
+def test_box_utils():
+    """Checks the batched box utilities against their scalar wrappers."""
+
+    person_boxes = np.array([[0, 0, 100, 200], [50, 50, 150, 150]])
+    face_boxes = np.array([[10, 10, 30, 40], [0, 0, 20, 20]])
+
+    adjusted = adjust_bboxes(person_boxes, face_boxes)
+    assert adjusted.tolist() == [[40, 85, 60, 115], [90, 90, 110, 110]]
+    assert adjust_bbox(person_boxes[1], face_boxes[1]) == [90, 90, 110, 110]
+
+    assert xyxy_to_xywh_batch(face_boxes).tolist() == [[10, 10, 20, 30], [0, 0, 20, 20]]
+    assert xyxy_to_xywh((10, 10, 30, 40)) == (10, 10, 20, 30)
+
+
+def test_crop_images():
+    """Checks crops are clipped views of the image."""
+
+    image = np.arange(10 * 20 * 3, dtype=np.uint8).reshape(10, 20, 3)
+    boxes = np.array([[-5, 2, 4.7, 8, 1, 0.9], [15, 5, 30, 20, 2, 0.8]])
+
+    crops, clipped = crop_images(image, boxes)
+
+    assert clipped.tolist() == [[0, 2, 4, 8], [15, 5, 20, 10]]
+    assert crops[0].shape == (6, 4, 3) and crops[1].shape == (5, 5, 3)
+    assert np.shares_memory(crops[0], image)
+    assert np.array_equal(crop_image(image, boxes[1, :4]), crops[1])
+    assert crop_images(image, np.empty((0, 8)))[0] == []
+
+
+def test_landmarks():
+    """Checks landmarks keep their relative position in the target box."""
+
+    landmarks = np.array([[[10, 10], [20, 30]]])
+    moved = reproject_landmarks(landmarks, [[0, 0, 20, 40]], [[100, 100, 140, 120]])
+
+    assert moved.tolist() == [[[120, 105], [140, 115]]]
+    assert adjust_landmarks([(10, 10), (20, 30)], [0, 0, 20, 40]) == [
+        (10, 10),
+        (20, 30),
+    ]
+    assert adjust_landmarks([], [0, 0, 20, 40]) == []
@@ -1,6 +1,8 @@
 import cv2
 
-from app.modules import FaceInsightExtractor, PersonDetect, Tracking
+from app.core.config import Settings
+from app.modules import Tracking
+from app.modules.registry import default_registry
 
 from app.common.utils.image import draw_bounding_box, draw_landmarks
 
@@ -8,13 +10,16 @@ from app.common.utils.image import draw_bounding_box, draw_landmarks
 def test_inference():
     """Performs inference on a test image using face, person, and tracking services."""
 
+    # Load the models once
+    models = default_registry(Settings())
+    print(models.load_all())
+    face_extractor = models.get("insightface")
+
     # Load image
     image = cv2.imread(filename="./examples/test_00.jpg")
 
     # Person detection
-    person_boxes = PersonDetect(model_path="./weights/yolo11n.pt").inference(
-        frame=image
-    )
+    person_boxes = models.get("person_detect").inference(frame=image)
 
     # Tracking (assuming detections are already in person_boxes)
     track_resp = Tracking().inference(detections=person_boxes, frame=image)
@@ -22,7 +27,7 @@ def test_inference():
 
     for resp in track_resp:
         # Face extraction (assuming a single person is detected)
-        face_resp = FaceInsightExtractor().inference(frame=image)[0]
+        face_resp = face_extractor.inference(frame=image)[0]
         track_person = int(resp[4])
         print(
             f"Track ID: {track_person}\n-> Detection Rate: {face_resp.get('prob')}\
@@ -40,6 +45,7 @@ def test_inference():
     cv2.imshow("Test Pipeline", image)
     cv2.waitKey(0)  # Wait for key press to close the window
     cv2.destroyAllWindows()
+    models.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,323 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import msgpack
+import numpy as np
+import pytest
+
+from app.modules.face_detect.insightface import (
+    AsyncFaceInsightExtractor,
+    FaceInsightExtractor,
+)
+
+
+def _mock_transport(requests: list) -> httpx.MockTransport:
+    """Builds a transport answering each image with a face whose prob is its index."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        images = json.loads(request.content)["images"]["data"]
+        requests.append(len(images))
+        data = [{"faces": [{"prob": float(i)}]} for i in range(len(images))]
+        return httpx.Response(200, json={"data": data})
+
+    return httpx.MockTransport(handler)
+
+
+def _crops() -> list:
+    crops = [np.zeros((32, 32, 3), dtype=np.uint8) for _ in range(5)]
+    crops.insert(2, np.zeros((0, 0, 3), dtype=np.uint8))  # empty crop is skipped
+    return crops
+
+
+def test_inference_batch():
+    """Checks that crops are batched and the results stay aligned with the input."""
+
+    requests = []
+    client = httpx.Client(transport=_mock_transport(requests))
+    crops = _crops()
+
+    with FaceInsightExtractor(max_batch_size=2, client=client) as extractor:
+        results = extractor.inference_batch(crops=crops)
+
+    assert requests == [2, 2, 1]
+    assert len(results) == len(crops)
+    assert results[2] == []
+    assert [r[0]["prob"] for i, r in enumerate(results) if i != 2] == [
+        0.0,
+        1.0,
+        0.0,
+        1.0,
+        0.0,
+    ]
+    assert not client.is_closed  # shared clients are left open
+
+
+def test_async_inference_batch():
+    """Checks the asynchronous extractor returns the same aligned results."""
+
+    async def run():
+        requests = []
+        client = httpx.AsyncClient(transport=_mock_transport(requests))
+        async with AsyncFaceInsightExtractor(max_batch_size=2, client=client) as ex:
+            results = await ex.inference_batch(crops=_crops())
+        await client.aclose()
+        return requests, results
+
+    requests, results = asyncio.run(run())
+
+    assert sorted(requests) == [1, 2, 2]
+    assert results[2] == []
+    assert results[5][0]["prob"] == 0.0
+
+
+def test_msgpack_transport():
+    """Checks raw bytes are sent and msgpack responses are decoded into arrays."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.headers["content-type"] == "application/msgpack"
+        payload = msgpack.unpackb(request.content, raw=False)
+        assert isinstance(payload["images"]["data"][0], bytes)
+        face = {
+            "prob": 0.9,
+            "bbox": [1, 2, 3, 4],
+            "landmarks": [[1, 1], [2, 2]],
+            "vec": np.arange(4, dtype=np.float32).tobytes(),
+        }
+        return httpx.Response(
+            200,
+            content=msgpack.packb({"data": [{"faces": [face]}]}, use_bin_type=True),
+            headers={"content-type": "application/msgpack"},
+        )
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    extractor = FaceInsightExtractor(client=client, use_msgpack=True)
+    face = extractor.inference(frame=np.zeros((32, 32, 3), dtype=np.uint8))[0]
+
+    assert face["bbox"].shape == (4,)
+    assert face["landmarks"].shape == (2, 2)
+    assert face["vec"].dtype == np.float32
+    assert face["vec"].tolist() == [0.0, 1.0, 2.0, 3.0]
+
+
+def _replica_transport(handlers: dict) -> httpx.MockTransport:
+    """Routes each request to the handler of its host."""
+    return httpx.MockTransport(lambda request: handlers[request.url.host](request))
+
+
+def _ok(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"data": [{"faces": [{"prob": 0.9}]}]})
+
+
+def _slow(delay: float):
+    def handler(request: httpx.Request) -> httpx.Response:
+        time.sleep(delay)
+        return httpx.Response(200, json={"data": [{"faces": [{"prob": 0.1}]}]})
+
+    return handler
+
+
+def _frame() -> np.ndarray:
+    return np.zeros((32, 32, 3), dtype=np.uint8)
+
+
+def test_least_outstanding_replica():
+    """Checks requests go to the replica with the fewest in flight."""
+
+    extractor = FaceInsightExtractor(
+        url=["http://a/extract", "http://b/extract"], client=httpx.Client()
+    )
+    first = extractor._pick()
+    second = extractor._pick()
+
+    assert (first.url, second.url) == ("http://a/extract", "http://b/extract")
+    assert extractor._pick(exclude=first) is second
+
+
+def test_transport_errors_eject_replica():
+    """Checks timeouts no longer propagate and a failing replica gets ejected."""
+
+    calls = []
+
+    def down(request):
+        calls.append(request.url.host)
+        raise httpx.ConnectTimeout("timed out", request=request)
+
+    def up(request):
+        calls.append(request.url.host)
+        return _ok(request)
+
+    client = httpx.Client(transport=_replica_transport({"a": down, "b": up}))
+    extractor = FaceInsightExtractor(
+        url=["http://a/extract", "http://b/extract"],
+        client=client,
+        hedge=False,
+        failure_threshold=2,
+    )
+    results = [extractor.inference(frame=_frame()) for _ in range(4)]
+
+    assert results == [[], [], [{"prob": 0.9}], [{"prob": 0.9}]]
+    assert calls == ["a", "a", "b", "b"]
+    assert [replica["ejected"] for replica in extractor.replica_stats()] == [
+        True,
+        False,
+    ]
+
+
+def test_failed_requests_release_the_replica():
+    """Checks any failure frees the replica and stays out of the hedging delay."""
+
+    def garbled(request):
+        return httpx.Response(200, content=b"{", headers={"content-type": "json"})
+
+    def broken(request):
+        raise RuntimeError("bug")
+
+    client = httpx.Client(transport=_replica_transport({"a": garbled, "b": broken}))
+    extractor = FaceInsightExtractor(
+        url=["http://a/extract", "http://b/extract"],
+        client=client,
+        hedge=False,
+        hedge_delay=0.05,
+        hedge_min_samples=1,
+        failure_threshold=1,
+    )
+
+    assert extractor.inference(frame=_frame()) == []
+    with pytest.raises(RuntimeError, match="bug"):
+        extractor.inference(frame=_frame())
+    assert [replica["outstanding"] for replica in extractor.replica_stats()] == [0, 0]
+    assert [replica["ejected"] for replica in extractor.replica_stats()] == [
+        True,
+        True,
+    ]
+    assert extractor._hedge_after() == 0.05
+
+
+def test_hedged_request():
+    """Checks a slow request is hedged and the fastest replica answers."""
+
+    client = httpx.Client(transport=_replica_transport({"a": _slow(0.5), "b": _ok}))
+    extractor = FaceInsightExtractor(
+        url=["http://a/extract", "http://b/extract"], client=client, hedge_delay=0.05
+    )
+    start = time.perf_counter()
+    faces = extractor.inference(frame=_frame())
+
+    assert faces == [{"prob": 0.9}]
+    assert time.perf_counter() - start < 0.4
+    assert extractor.hedges == 1
+    extractor.close()
+
+
+def test_request_deadline():
+    """Checks a request fails once its deadline passed, even if hedged."""
+
+    client = httpx.Client(transport=_replica_transport({"a": _slow(1), "b": _slow(1)}))
+    extractor = FaceInsightExtractor(
+        url=["http://a/extract", "http://b/extract"],
+        client=client,
+        deadline=0.2,
+        hedge_delay=0.05,
+    )
+    start = time.perf_counter()
+
+    assert extractor.inference(frame=_frame()) == []
+    assert time.perf_counter() - start < 0.5
+    extractor.close()
+
+
+def test_request_deadline_without_hedging():
+    """Checks the deadline bounds the whole request of a single replica."""
+
+    client = httpx.Client(transport=_replica_transport({"a": _slow(1)}))
+    extractor = FaceInsightExtractor(
+        url="http://a/extract", client=client, deadline=0.2
+    )
+    start = time.perf_counter()
+
+    assert extractor.inference(frame=_frame()) == []
+    assert time.perf_counter() - start < 0.5
+
+
+def test_queued_requests_are_not_hedged():
+    """Checks the time spent waiting for a pool worker does not trigger hedges."""
+
+    client = httpx.Client(
+        transport=_replica_transport({"a": _slow(0.03), "b": _slow(0.03)})
+    )
+    extractor = FaceInsightExtractor(
+        url=["http://a/extract", "http://b/extract"],
+        client=client,
+        max_connections=2,
+        hedge_delay=0.1,
+        hedge_min_samples=1000,
+    )
+    threads = [
+        threading.Thread(target=extractor.inference, kwargs={"frame": _frame()})
+        for _ in range(16)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert extractor.hedges == 0
+    assert [replica["outstanding"] for replica in extractor.replica_stats()] == [0, 0]
+    extractor.close()
+
+
+def test_async_request_deadline_without_hedging():
+    """Checks the deadline bounds an asynchronous request of a single replica."""
+
+    async def slow(request):
+        await asyncio.sleep(1)
+        return _ok(request)
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(slow))
+        extractor = AsyncFaceInsightExtractor(
+            url="http://a/extract", client=client, deadline=0.2
+        )
+        start = time.perf_counter()
+        faces = await extractor.inference(frame=_frame())
+        await client.aclose()
+        return faces, time.perf_counter() - start, extractor
+
+    faces, elapsed, extractor = asyncio.run(run())
+
+    assert faces == [] and elapsed < 0.5
+    assert extractor.replica_stats()[0]["failures"] == 1
+
+
+def test_async_hedged_request():
+    """Checks the asynchronous extractor hedges and cancels the slow request."""
+
+    async def slow(request):
+        await asyncio.sleep(0.5)
+        return _ok(request)
+
+    async def fast(request):
+        return httpx.Response(200, json={"data": [{"faces": [{"prob": 0.7}]}]})
+
+    async def run():
+        handlers = {"a": slow, "b": fast}
+        transport = httpx.MockTransport(lambda r: handlers[r.url.host](r))
+        client = httpx.AsyncClient(transport=transport)
+        extractor = AsyncFaceInsightExtractor(
+            url=["http://a/extract", "http://b/extract"],
+            client=client,
+            hedge_delay=0.05,
+        )
+        faces = await extractor.inference(frame=_frame())
+        await asyncio.sleep(0)
+        await client.aclose()
+        return faces, extractor
+
+    faces, extractor = asyncio.run(run())
+
+    assert faces == [{"prob": 0.7}]
+    assert extractor.hedges == 1
+    assert [replica["outstanding"] for replica in extractor.replica_stats()] == [0, 0]
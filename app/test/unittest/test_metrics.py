@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.common.metrics import LATENCY_BUCKETS, REGISTRY, render_prometheus, trace
+from app.interface import ServiceInterface
+
+
+class _EchoService(ServiceInterface):
+    def inference(self, payload):
+        if payload is None:
+            raise ValueError("empty payload")
+        return payload
+
+
+class _AsyncEchoService(ServiceInterface):
+    async def inference(self, payload):
+        return payload
+
+
+def test_service_calls_are_recorded():
+    """Checks calls, errors and trace spans are recorded for every service call."""
+    REGISTRY.clear()
+    service = _EchoService(name="echo")
+
+    with trace() as spans:
+        for _ in range(10):
+            service.inference(1)
+        with pytest.raises(ValueError):
+            service.inference(None)
+
+    summary = REGISTRY.summary()["echo.inference"]
+    assert summary["calls"] == 11
+    assert summary["errors"] == 1
+    assert 0 <= summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"]
+    assert spans["echo"] > 0
+
+
+def test_async_service_calls_are_recorded():
+    REGISTRY.clear()
+    service = _AsyncEchoService(name="async_echo")
+
+    assert asyncio.run(service.inference(3)) == 3
+    assert REGISTRY.get("async_echo").calls == 1
+
+
+def test_render_prometheus():
+    REGISTRY.clear()
+    service = _EchoService(name="echo")
+    service.inference(1)
+    service.metrics_for("request").observe_payload(sent=100, received=20)
+
+    text = render_prometheus()
+
+    assert 'service_calls_total{service="echo",method="inference"} 1' in text
+    assert (
+        'service_latency_seconds_bucket{service="echo",method="inference",le="+Inf"} 1'
+        in text
+    )
+    assert 'service_bytes_sent_total{service="echo",method="request"} 100' in text
+
+
+def _families(text):
+    """Parses the exposition text, checking each family is one contiguous block."""
+    families, current = {}, None
+    for line in text.splitlines():
+        if not line:
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            assert name not in families, f"{name} is declared twice"
+            families[name], current = (kind, []), name
+            continue
+        sample = line.split("{")[0].split(" ")[0]
+        kind = families[current][0]
+        suffixes = ("_bucket", "_sum", "_count") if kind == "histogram" else ("",)
+        assert any(sample == current + suffix for suffix in suffixes), (
+            f"{sample} is outside of its family block"
+        )
+        families[current][1].append(line)
+    return families
+
+
+def test_render_prometheus_families():
+    """Checks every family is rendered as one block after its TYPE line."""
+
+    REGISTRY.clear()
+    _EchoService(name="first").inference(1)
+    _EchoService(name="second").inference(2)
+    REGISTRY.increment("bytes_total", 10, stage="raw")
+    REGISTRY.set_gauge("level", 2, controller="cam")
+    REGISTRY.increment("bytes_total", 5, stage="roi")
+
+    families = _families(render_prometheus())
+
+    assert families["service_calls_total"][0] == "counter"
+    assert len(families["service_calls_total"][1]) == 2
+    assert len(families["service_latency_seconds"][1]) == 2 * (len(LATENCY_BUCKETS) + 3)
+    assert len(families["bytes_total"][1]) == 2
+    assert families["level"] == ("gauge", ['level{controller="cam"} 2'])
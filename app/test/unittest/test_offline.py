@@ -0,0 +1,59 @@
+import json
+
+import cv2
+import numpy as np
+
+from app.pipeline.offline import process_video
+
+
+class _Detector:
+    batch_size = 4
+
+    def __init__(self):
+        self.batches = []
+
+    def inference_batch(self, frames):
+        self.batches.append(len(frames))
+        return [np.array([[10, 10, 50, 90, 0.9, 0]], dtype=np.float32) for _ in frames]
+
+
+class _Tracker:
+    def inference(self, detections, frame):
+        return np.hstack([detections[:, :4], [[1, 0.9, 0, -1]]])
+
+
+class _Extractor:
+    def inference_batch(self, crops):
+        return [[{"bbox": [1, 2, 3, 4], "prob": 0.8, "vec": [0.5]}] for _ in crops]
+
+
+def _write_video(path, frames=12):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 25, (64, 96))
+    for idx in range(frames):
+        writer.write(np.full((96, 64, 3), idx * 10, dtype=np.uint8))
+    writer.release()
+
+
+def test_process_video(tmp_path):
+    """Checks every frame is written, in order, with batched detection."""
+    video, output = tmp_path / "in.mp4", tmp_path / "out.jsonl"
+    _write_video(video)
+    detector = _Detector()
+
+    stats = process_video(
+        str(video),
+        detector=detector,
+        tracker=_Tracker(),
+        extractor=_Extractor(),
+        output=str(output),
+        video_output=str(tmp_path / "annotated.mp4"),
+        progress_interval=0,
+    )
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [record["frame"] for record in records] == list(range(12))
+    assert records[0]["tracks"][0]["track_id"] == 1
+    assert "vec" not in records[0]["tracks"][0]["faces"][0]
+    assert sum(detector.batches) == 12
+    assert stats["frames"] == 12
+    assert cv2.VideoCapture(str(tmp_path / "annotated.mp4")).isOpened()
@@ -0,0 +1,38 @@
+import numpy as np
+
+from app.modules.human_detect.onnx_backend import letterbox, postprocess
+
+
+def test_letterbox():
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    frame[..., 2] = 255  # red in BGR
+
+    tensor, scales, pads = letterbox([frame], imgsz=160)
+
+    assert tensor.shape == (1, 3, 160, 160)
+    assert tensor.dtype == np.float32
+    assert scales.tolist() == [0.5]
+    assert pads.tolist() == [[0, 20]]
+    assert tensor[0, 0, 80, 80] == 1.0  # RGB order
+    assert np.isclose(tensor[0, 0, 0, 0], 114 / 255)  # padding
+
+
+def test_postprocess_maps_person_boxes_back_to_the_frame():
+    """Checks non-person and low-confidence anchors are dropped and boxes rescaled."""
+    # anchors: a person, a duplicate of it, a low-confidence person and a car
+    output = np.zeros((4 + 3, 4), dtype=np.float32)
+    output[:4] = np.array(
+        [[80, 80, 100, 120], [82, 82, 100, 120], [20, 20, 10, 10], [40, 40, 20, 20]],
+        dtype=np.float32,
+    ).T
+    output[4] = [0.9, 0.85, 0.3, 0.1]
+    output[6, 3] = 0.95
+
+    boxes = postprocess(
+        output, scale=0.5, pad=np.array([0, 20]), shape=(240, 320), conf=0.5
+    )
+
+    assert boxes.shape == (1, 6)
+    assert boxes[0, :4].tolist() == [60, 0, 260, 240]
+    assert np.isclose(boxes[0, 4], 0.9)
+    assert boxes[0, 5] == 0
@@ -0,0 +1,62 @@
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.modules.human_detect.person_detection import PersonDetect
+
+
+class _FakeTensor:
+    def __init__(self, data):
+        self.data = data
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.data.copy()
+
+
+class _FakeResult:
+    def __init__(self, value):
+        self.boxes = SimpleNamespace(
+            data=_FakeTensor(np.array([[value + 0.4, 1.6, 20.2, 30.7, 0.9, 0]]))
+        )
+
+
+class _FakeYOLO:
+    def __init__(self, model_path):
+        self.calls = []
+
+    def predict(self, source, **kwargs):
+        frames = source if isinstance(source, list) else [source]
+        self.calls.append((len(frames), kwargs["imgsz"]))
+        return [_FakeResult(float(frame[0, 0, 0])) for frame in frames]
+
+
+def test_inference_batch(monkeypatch):
+    """Checks frames are chunked by batch size and results stay aligned."""
+
+    monkeypatch.setitem(sys.modules, "ultralytics", SimpleNamespace(YOLO=_FakeYOLO))
+    detector = PersonDetect(model_path="fake.pt", batch_size=2, imgsz=320)
+    frames = [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(5)]
+
+    results = detector.inference_batch(frames=frames)
+
+    assert detector.model.calls == [(2, 320), (2, 320), (1, 320)]
+    assert [int(boxes[0, 0]) for boxes in results] == [0, 1, 2, 3, 4]
+    assert results[0][0, :4].tolist() == [0, 1, 20, 30]
+
+
+def test_onnx_backend_without_ultralytics(monkeypatch):
+    """Checks the ONNX backend does not need ultralytics, nor torch."""
+
+    from app.modules.human_detect import onnx_backend
+
+    monkeypatch.setitem(sys.modules, "ultralytics", None)  # importing it fails
+    monkeypatch.setattr(
+        onnx_backend, "OnnxPersonModel", lambda model_path, **kwargs: model_path
+    )
+    detector = PersonDetect(model_path="fake.pt", backend="onnx")
+
+    assert detector.model == "fake.pt"
@@ -0,0 +1,68 @@
+import random
+import threading
+import time
+
+from app.pipeline import DROP_OLDEST, KEEP_LATEST, Pipeline, Stage, StageQueue
+from app.pipeline.queues import SENTINEL
+
+
+def test_stage_queue_policies():
+    """Checks the overflow policies never drop the end-of-stream sentinel."""
+
+    queue = StageQueue(maxsize=2, policy=DROP_OLDEST)
+    for item in range(4):
+        queue.put(item)
+    assert [queue.get()[1] for _ in range(2)] == [2, 3]
+    assert queue.dropped == 2
+
+    queue = StageQueue(maxsize=5, policy=KEEP_LATEST)
+    queue.put(1)
+    queue.put_sentinel()
+    queue.put(2)
+    queue.put(3)
+    assert queue.get()[1] is SENTINEL
+    assert queue.get()[1] == 3
+
+
+def test_pipeline_keeps_order():
+    """Checks multi-worker stages forward their outputs in input order."""
+
+    outputs = []
+
+    def slow_square(item):
+        time.sleep(random.random() / 1000)
+        return item * item
+
+    pipeline = Pipeline(
+        source=range(50),
+        stages=[
+            Stage("square", slow_square, workers=4),
+            Stage("odd", lambda item: item if item % 2 else None),
+            Stage("sink", outputs.append),
+        ],
+    )
+    stats = pipeline.run()
+
+    assert outputs == [i * i for i in range(50) if i % 2]
+    assert stats["stages"]["square"]["processed"] == 50
+    assert not pipeline.is_running()
+
+
+def test_pipeline_stop():
+    """Checks a stopped pipeline shuts down even when its source never ends."""
+
+    started = threading.Event()
+
+    def endless():
+        while True:
+            yield 1
+
+    def sink(item):
+        started.set()
+        time.sleep(0.001)
+
+    pipeline = Pipeline(source=endless(), stages=[Stage("sink", sink)]).start()
+    assert started.wait(timeout=5)
+    pipeline.stop()
+
+    assert pipeline.join(timeout=5)
@@ -0,0 +1,49 @@
+import cv2
+import numpy as np
+
+from app.modules.face_detect.quality import BestFrameSelector, crop_quality
+
+
+def _textured(h, w, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+
+
+def test_crop_quality_prefers_sharp_large_upright_crops():
+    sharp = _textured(200, 80)
+    blurred = cv2.GaussianBlur(sharp, (15, 15), 5)
+
+    assert crop_quality(sharp) > crop_quality(blurred)
+    assert crop_quality(sharp) > crop_quality(_textured(50, 20))
+    assert crop_quality(sharp) > crop_quality(_textured(80, 200))
+    assert crop_quality(sharp, face={"prob": 0.9, "pose": [0, 80, 0]}) < 0.2 * (
+        crop_quality(sharp)
+    )
+    assert crop_quality(np.zeros((0, 0, 3), dtype=np.uint8)) == 0.0
+
+
+class _Extractor:
+    def __init__(self):
+        self.batches = []
+
+    def inference_batch(self, crops):
+        self.batches.append([float(crop.std()) for crop in crops])
+        return [[{"bbox": [0, 0, 10, 10], "prob": 0.9}] for _ in crops]
+
+
+def test_only_the_best_crop_of_each_window_is_submitted():
+    """Checks a track is submitted once per window, with its sharpest crop."""
+    extractor = _Extractor()
+    selector = BestFrameSelector(extractor, window=10, top_k=1)
+    sharp = _textured(200, 80)
+    track = [[0, 0, 80, 200, 1, 0.9, 0, 0]]
+
+    results = []
+    for frame_idx in range(30):
+        crop = sharp if frame_idx == 15 else cv2.GaussianBlur(sharp, (9, 9), 3)
+        results.append(selector.inference(frame=crop, tracks=track))
+
+    assert len(extractor.batches) == 3  # first frame, then one per window
+    assert extractor.batches[2] == [float(sharp.std())]  # frames 11 to 20
+    assert selector.stats()["submit_ratio"] == 0.1
+    assert all(result[0] and result[0][0]["prob"] == 0.9 for result in results)
@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+import pytest
+
+from app.modules.registry import ModelRegistry
+
+
+def test_models_are_loaded_once_and_warmed_up():
+    """Checks a model is built and warmed up once and its instance is shared."""
+    built, warmed = [], []
+    registry = ModelRegistry()
+    registry.register("model", lambda: built.append(1) or object(), warmed.append)
+
+    first = registry.get("model")
+
+    assert registry.get("model") is first
+    assert built == [1]
+    assert warmed == [first]
+    assert registry.stats()["models"]["model"]["load_ms"] is not None
+
+
+def test_failed_warmup_is_reported():
+    def warmup(model):
+        raise ConnectionError("service down")
+
+    registry = ModelRegistry()
+    registry.register("remote", object, warmup)
+    report = registry.load_all()
+
+    assert report["startup_ms"] is not None
+    assert report["models"]["remote"]["loaded"]
+    assert report["models"]["remote"]["warmup_error"] == "service down"
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_modules_import_lazily():
+    """Checks importing the services and the settings does not import the models."""
+    code = (
+        "import sys, app.modules, app.core.config; "
+        "app.core.config.Settings(); "
+        "assert not {'ultralytics', 'boxmot', 'torch'} & set(sys.modules)"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
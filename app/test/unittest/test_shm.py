@@ -0,0 +1,67 @@
+import multiprocessing as mp
+from functools import partial
+
+import cv2
+import numpy as np
+import pytest
+
+from app.pipeline.shm import FrameRing, run_multiprocess
+
+
+def _count_frames(results, ring, worker_idx):
+    indices = [meta["index"] for frame, meta in ring.frames()]
+    results.put((worker_idx, indices))
+
+
+def _fail(ring, worker_idx):
+    raise RuntimeError("worker crashed")
+
+
+def _write_video(path, frames=12):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    for value in range(frames):
+        writer.write(np.full((48, 64, 3), value * 10, dtype=np.uint8))
+    writer.release()
+
+
+def test_frame_ring():
+    """Checks frames round-trip through the slots and slots are recycled."""
+
+    ring = FrameRing(slots=2, shape=(4, 4, 3))
+    try:
+        for value in range(3):
+            ring.put(np.full((4, 4, 3), value, dtype=np.uint8), {"index": value})
+            slot, frame, meta = ring.get(timeout=5)
+            assert frame.sum() == value * 48 and meta == {"index": value}
+            ring.release(slot)
+        ring.close_writer()
+        assert ring.get(timeout=5) is None
+    finally:
+        ring.close()
+        ring.unlink()
+
+
+def test_run_multiprocess(tmp_path):
+    """Checks every decoded frame reaches exactly one worker process."""
+
+    video_path = str(tmp_path / "video.avi")
+    _write_video(video_path)
+
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    run_multiprocess(
+        video_path, partial(_count_frames, results), workers=2, slots=3, ctx=ctx
+    )
+
+    indices = sorted(idx for _ in range(2) for idx in results.get(timeout=5)[1])
+    assert indices == list(range(12))
+
+
+def test_run_multiprocess_worker_failure(tmp_path):
+    """Checks the capture stops instead of waiting for slots a dead worker holds."""
+
+    video_path = str(tmp_path / "video.avi")
+    _write_video(video_path)
+
+    with pytest.raises(RuntimeError, match="worker-0"):
+        run_multiprocess(video_path, _fail, workers=1, slots=2)
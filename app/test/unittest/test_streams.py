@@ -0,0 +1,179 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.pipeline import DetectionBatcher, FaceBatcher, FramePacket, StreamManager
+
+
+class _FakeDetector:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def inference_batch(self, frames):
+        self.batch_sizes.append(len(frames))
+        return [np.array([[0, 0, 10, 10, 0.9, 0]]) for _ in frames]
+
+
+class _FakeTracker:
+    def inference(self, detections, frame):
+        return np.array([[0, 0, 10, 10, 1, 0.9, 0, 0]])
+
+
+class _FakeExtractor:
+    def inference_batch(self, crops):
+        return [[{"prob": 0.9}] for _ in crops]
+
+
+def test_detection_batcher():
+    """Checks frames submitted from several threads are detected together."""
+
+    detector = _FakeDetector()
+    batcher = DetectionBatcher(detector, max_batch_size=4, max_wait=0.2)
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    futures = []
+    threads = [
+        threading.Thread(target=lambda: futures.append(batcher.submit(frame)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(len(future.result(timeout=5)) == 1 for future in futures)
+    batcher.close()
+    assert detector.batch_sizes == [4]
+
+
+class _SlowExtractor:
+    def __init__(self, delay=0.05, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.batch_sizes = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def inference_batch(self, crops):
+        with self.lock:
+            self.batch_sizes.append(len(crops))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        if self.fail:
+            raise RuntimeError("backend down")
+        return [[{"prob": float(crop[0, 0, 0])}] for crop in crops]
+
+
+def _crops(*values):
+    return [np.full((4, 4, 3), value, dtype=np.uint8) for value in values]
+
+
+def test_face_batcher():
+    """Checks crops of several callers are coalesced and resolved in order."""
+
+    extractor = _SlowExtractor()
+    batcher = FaceBatcher(extractor, max_batch_size=8, max_wait=0.2)
+    futures = [batcher.submit(_crops(i, i + 10)) for i in range(3)]
+    results = [future.result(timeout=5) for future in futures]
+    batcher.close()
+
+    assert extractor.batch_sizes == [6]
+    assert [[faces[0]["prob"] for faces in result] for result in results] == [
+        [i, i + 10] for i in range(3)
+    ]
+    assert batcher.submit([]).result() == []
+
+
+def test_face_batcher_concurrency():
+    """Checks the calls in flight are bounded and a caller may span batches."""
+
+    extractor = _SlowExtractor(delay=0.05)
+    batcher = FaceBatcher(extractor, max_batch_size=2, max_wait=0, max_concurrency=2)
+    result = batcher.inference_batch(_crops(*range(10)))
+    batcher.close()
+
+    assert [faces[0]["prob"] for faces in result] == list(range(10))
+    assert max(extractor.batch_sizes) <= 2
+    assert extractor.max_in_flight <= 2
+    assert batcher.stats()["crops"] == 10
+
+
+def test_face_batcher_error():
+    """Checks a failed call fails the callers of its crops."""
+
+    batcher = FaceBatcher(_SlowExtractor(delay=0, fail=True))
+    with pytest.raises(RuntimeError, match="backend down"):
+        batcher.inference_batch(_crops(1))
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(_crops(1))
+
+
+class _ShortDetector:
+    def inference_batch(self, frames):
+        return [np.zeros((0, 6)) for _ in frames[1:]]
+
+
+class _ShortExtractor:
+    def inference_batch(self, crops):
+        return [[]]
+
+
+def test_batchers_fail_on_missing_results():
+    """Checks callers fail instead of hanging when results are missing."""
+
+    detector = DetectionBatcher(_ShortDetector(), max_batch_size=2, max_wait=0.2)
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    futures = [detector.submit(frame), detector.submit(frame)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="results for"):
+            future.result(timeout=5)
+    detector.close()
+
+    faces = FaceBatcher(_ShortExtractor(), max_batch_size=2, max_wait=0.2)
+    with pytest.raises(RuntimeError, match="1 results for 2 crops"):
+        faces.submit(_crops(1, 2)).result(timeout=5)
+    faces.close()
+
+
+def test_stream_manager():
+    """Checks every stream is processed with its own tracker."""
+
+    results = {}
+    lock = threading.Lock()
+
+    def sink(stream_id, packet):
+        with lock:
+            results.setdefault(stream_id, []).append(packet.index)
+
+    def source():
+        frame = np.zeros((32, 32, 3), dtype=np.uint8)
+        return [FramePacket(index=i, frame=frame) for i in range(10)]
+
+    trackers = []
+
+    def tracker_factory():
+        trackers.append(_FakeTracker())
+        return trackers[-1]
+
+    manager = StreamManager(
+        detector=_FakeDetector(),
+        tracker_factory=tracker_factory,
+        extractor=_FakeExtractor(),
+        sink=sink,
+        capture_policy="block",
+    )
+    with manager:
+        for stream_id in ("cam-0", "cam-1", "cam-2"):
+            manager.add_stream(stream_id, source())
+        manager.join(timeout=10)
+        stats = manager.stats()
+
+    assert len(trackers) == 3
+    assert results == {sid: list(range(10)) for sid in ("cam-0", "cam-1", "cam-2")}
+    assert stats["detection"]["frames"] == 30
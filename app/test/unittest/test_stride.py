@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from app.modules.tracking.stride import StridedTracking
+
+
+class _FakeDetector:
+    def __init__(self):
+        self.calls = 0
+
+    def inference(self, frame):
+        self.calls += 1
+        return np.array([[0, 0, 10, 20, 0.9, 0]], dtype=np.float32)
+
+
+class _FakeTracker:
+    def __init__(self, velocity=0.0):
+        self.velocity = velocity
+        self.x = 0.0
+
+    def update(self, detections, frame, max_age):
+        return np.array([[self.x, 0, self.x + 10, 20, 1, 0.9, 0, 0]])
+
+    def predict(self, frame, max_age):
+        self.x += self.velocity
+        return np.array([[self.x, 0, self.x + 10, 20, 1, 0.9, 0, -1]])
+
+
+def test_fixed_stride():
+    """Checks the detector only runs every `stride` frames."""
+
+    detector = _FakeDetector()
+    tracking = StridedTracking(detector=detector, tracker=_FakeTracker(), stride=3)
+    frame = np.zeros((4, 4, 3), dtype=np.uint8)
+
+    tracks = [tracking.inference(frame=frame) for _ in range(7)]
+
+    assert detector.calls == 3  # frames 0, 3 and 6
+    assert tracking.stats() == {"detected_frames": 3, "predicted_frames": 4}
+    assert all(int(t[0][4]) == 1 for t in tracks)
+
+
+def test_adaptive_stride():
+    """Checks fast motion triggers an early detection."""
+
+    detector = _FakeDetector()
+    tracking = StridedTracking(
+        detector=detector,
+        tracker=_FakeTracker(velocity=5.0),
+        stride=10,
+        adaptive=True,
+        motion_threshold=0.3,
+    )
+    frame = np.zeros((4, 4, 3), dtype=np.uint8)
+
+    for _ in range(4):
+        tracking.inference(frame=frame)
+
+    # 5px then 10px of drift on a 20px box: the second one triggers a detection
+    assert detector.calls == 2
+
+
+def test_strided_ocsort_keeps_tracks():
+    """Checks a real OcSort reports the tracks on every frame of a stride."""
+
+    pytest.importorskip("boxmot")
+    from app.modules.tracking.ocsort_tracker import Tracking
+
+    class _MovingDetector:
+        def __init__(self):
+            self.x = 0.0
+
+        def inference(self, frame):
+            self.x += 3
+            return np.array([[self.x, 10, self.x + 40, 90, 0.9, 0]], dtype=np.float32)
+
+    tracking = StridedTracking(detector=_MovingDetector(), tracker=Tracking(), stride=2)
+    frame = np.zeros((200, 200, 3), dtype=np.uint8)
+
+    tracks = [tracking.inference(frame=frame) for _ in range(8)]
+
+    assert all(len(frame_tracks) == 1 for frame_tracks in tracks)
+    assert len({int(frame_tracks[0][4]) for frame_tracks in tracks}) == 1
+    assert tracking.stats() == {"detected_frames": 4, "predicted_frames": 4}
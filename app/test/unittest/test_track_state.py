@@ -0,0 +1,48 @@
+import numpy as np
+
+from app.modules.tracking.state import TrackStateStore
+
+
+def _track(track_id, x1=10.0, y1=20.0):
+    return [x1, y1, x1 + 40, y1 + 80, track_id, 0.9, 0, 0]
+
+
+def test_update_keeps_the_best_face_in_frame_coordinates():
+    store = TrackStateStore(capacity=4, embedding_dim=2)
+    face = {"bbox": [1, 2, 11, 12], "prob": 0.7, "landmarks": [[5, 5]], "vec": [1, 0]}
+    worse = dict(face, prob=0.5, vec=[0, 1])
+
+    store.update([_track(1.0)], frame_idx=0, faces=[[face]])
+    store.update([_track(1.0, x1=12.0)], frame_idx=1, faces=[[worse]])
+
+    state = store.get(1)
+    assert state.bbox.tolist() == [12, 20, 52, 100]
+    assert state.face_bbox.tolist() == [13, 22, 23, 32]  # last face
+    assert state.landmarks[0].tolist() == [17, 25]
+    assert state.best_score == np.float32(0.7)
+    assert state.embedding.tolist() == [1, 0]  # of the best face
+    assert (state.first_seen, state.last_seen) == (0, 1)
+
+
+def test_tracks_expire():
+    store = TrackStateStore(capacity=4, max_age=2)
+    store.update([_track(1), _track(2)], frame_idx=0)
+    store.update([_track(2)], frame_idx=3)
+
+    assert 1 not in store and 2 in store
+
+    store.update([], frame_idx=4, active_ids=[])
+    assert len(store) == 0
+
+
+def test_memory_is_bounded():
+    store = TrackStateStore.from_budget(64 * 1024, embedding_dim=512, max_age=10**6)
+    nbytes = store.nbytes
+
+    for frame_idx in range(3 * store.capacity):
+        store.update([_track(frame_idx)], frame_idx=frame_idx)
+
+    assert store.nbytes == nbytes <= 64 * 1024
+    assert len(store) == store.capacity
+    assert store.evictions == 2 * store.capacity
+    assert frame_idx in store
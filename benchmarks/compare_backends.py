@@ -0,0 +1,155 @@
+"""
+Accuracy and latency of the PersonDetect backends on the bundled example images.
+
+The PyTorch backend is the reference: the boxes of the ONNX backends are matched to
+its boxes by IoU, and every backend is timed on the same images.
+
+    python -m benchmarks.compare_backends --model ./weights/yolo11n.pt --threads 4
+"""
+
+import argparse
+import glob
+import json
+import time
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+
+from app.modules.human_detect.person_detection import PersonDetect
+
+BACKENDS = {
+    "torch": {"backend": "torch"},
+    "onnx": {"backend": "onnx"},
+    "onnx_int8": {"backend": "onnx", "int8": True},
+}
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Returns the IoU of every pair of [x1, y1, x2, y2] boxes of `a` and `b`."""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def match(reference: np.ndarray, boxes: np.ndarray, threshold: float = 0.5) -> Dict:
+    """
+    Greedily matches boxes to the reference boxes by IoU.
+
+    Returns:
+        The number of reference boxes, predicted boxes and matches, and the IoU and
+        absolute confidence difference of each match.
+    """
+    result = {
+        "reference": len(reference),
+        "predicted": len(boxes),
+        "ious": [],
+        "conf_diffs": [],
+    }
+    if not len(reference) or not len(boxes):
+        return result
+
+    ious = iou_matrix(reference[:, :4], boxes[:, :4])
+    while ious.size and ious.max() >= threshold:
+        i, j = np.unravel_index(ious.argmax(), ious.shape)
+        result["ious"].append(float(ious[i, j]))
+        result["conf_diffs"].append(float(abs(reference[i, 4] - boxes[j, 4])))
+        ious[i, :] = -1
+        ious[:, j] = -1
+    return result
+
+
+def run_backend(
+    images: List[np.ndarray], options: Dict[str, Any], args: argparse.Namespace
+) -> Dict[str, Any]:
+    """Times one backend on every image and returns its boxes and latencies."""
+    detector = PersonDetect(
+        model_path=args.model,
+        threshold=args.threshold,
+        imgsz=args.imgsz,
+        intra_op_threads=args.threads,
+        inter_op_threads=args.inter_threads,
+        **options,
+    )
+    detector.inference(frame=images[0])  # warmup
+
+    latencies, boxes = [], []
+    for _ in range(args.repeat):
+        boxes = []
+        for image in images:
+            start = time.perf_counter()
+            boxes.append(np.asarray(detector.inference(frame=image)).reshape(-1, 6))
+            latencies.append(1000 * (time.perf_counter() - start))
+
+    return {
+        "boxes": boxes,
+        "mean_ms": float(np.mean(latencies)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def compare(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    paths = sorted(glob.glob(f"{args.images}/*.jpg"))
+    images = [image for image in map(cv2.imread, paths) if image is not None]
+    if not images:
+        raise FileNotFoundError(f"No images found in {args.images}/.")
+
+    runs = {name: run_backend(images, BACKENDS[name], args) for name in args.backends}
+    reference = runs.get("torch")
+
+    report = {}
+    for name, run in runs.items():
+        row = {"mean_ms": run["mean_ms"], "p95_ms": run["p95_ms"]}
+        if reference is not None and name != "torch":
+            matches = [
+                match(ref, boxes)
+                for ref, boxes in zip(reference["boxes"], run["boxes"])
+            ]
+            matched = sum(len(m["ious"]) for m in matches)
+            ious = [iou for m in matches for iou in m["ious"]]
+            diffs = [diff for m in matches for diff in m["conf_diffs"]]
+            row.update(
+                recall=matched / max(sum(m["reference"] for m in matches), 1),
+                precision=matched / max(sum(m["predicted"] for m in matches), 1),
+                mean_iou=float(np.mean(ious)) if ious else 0.0,
+                mean_conf_diff=float(np.mean(diffs)) if diffs else 0.0,
+                speedup=reference["mean_ms"] / run["mean_ms"],
+            )
+        report[name] = row
+    return report
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="./weights/yolo11n.pt")
+    parser.add_argument("--images", default="examples")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--threshold", type=float, default=0.75)
+    parser.add_argument("--threads", type=int, default=0, help="intra-op threads")
+    parser.add_argument("--inter-threads", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument(
+        "--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS)
+    )
+    parser.add_argument("--output", help="Write the report as JSON to this path.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    report = compare(args)
+
+    for name, row in report.items():
+        print(f"{name:>10}: " + ", ".join(f"{k}={v:.3f}" for k, v in row.items()))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Offline benchmark of the processing modes, runnable on a CPU-only machine.
+
+A stub insightface server replaces the remote service and the frames are either
+synthetic or the bundled `examples/` images. Each scenario runs in its own process
+so that its peak RSS is measured in isolation, and the results are written as JSON.
+
+    python -m benchmarks.run --frames 200 --latency-ms 20 --output bench.json
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List
+
+import cv2
+import numpy as np
+
+from benchmarks.stub_server import StubInsightFaceServer
+
+
+# ===== INPUTS =====
+class SyntheticDetector:
+    """
+    Stands in for PersonDetect without model weights: returns the same people on
+    every frame, drifting slightly so that the tracker keeps their IDs.
+    """
+
+    def __init__(self, people: int = 8, seed: int = 0) -> None:
+        rng = np.random.default_rng(seed)
+        self.boxes = np.zeros((people, 6), dtype=np.float32)
+        self.boxes[:, 0] = rng.uniform(0, 500, people)
+        self.boxes[:, 1] = rng.uniform(0, 200, people)
+        self.boxes[:, 2] = self.boxes[:, 0] + rng.uniform(60, 120, people)
+        self.boxes[:, 3] = self.boxes[:, 1] + rng.uniform(150, 250, people)
+        self.boxes[:, 4] = 0.9
+        self.frame_idx = 0
+
+    def inference(self, frame: Any) -> np.ndarray:
+        boxes = self.boxes.copy()
+        boxes[:, [0, 2]] += (self.frame_idx % 50) * 0.5
+        self.frame_idx += 1
+        return boxes
+
+    def inference_batch(self, frames: List[Any]) -> List[np.ndarray]:
+        return [self.inference(frame) for frame in frames]
+
+
+def load_frames(source: str, count: int) -> List[np.ndarray]:
+    """
+    Builds the input frames.
+
+    Args:
+        source: 'synthetic', or 'examples' to cycle through the bundled images.
+        count: The number of frames.
+
+    Returns:
+        A list of BGR frames.
+    """
+    if source == "examples":
+        images = [cv2.imread(path) for path in sorted(glob.glob("examples/*.jpg"))]
+        images = [
+            cv2.resize(image, (640, 480)) for image in images if image is not None
+        ]
+        if not images:
+            raise FileNotFoundError("No images found in examples/.")
+        return [images[idx % len(images)] for idx in range(count)]
+
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    return [np.roll(base, idx, axis=1) for idx in range(count)]
+
+
+def build_detector(config: Dict[str, Any]) -> Any:
+    if config["detector"] == "yolo":
+        from app.modules.human_detect.person_detection import PersonDetect
+
+        return PersonDetect(model_path=config["model_path"])
+    return SyntheticDetector(people=config["people"])
+
+
+def build_tracker() -> Any:
+    from app.modules.tracking.ocsort_tracker import Tracking
+
+    return Tracking()
+
+
+def build_extractor(config: Dict[str, Any]) -> Any:
+    from app.modules.face_detect.insightface import FaceInsightExtractor
+
+    return FaceInsightExtractor(url=config["url"], use_msgpack=config["msgpack"])
+
+
+# ===== SCENARIOS =====
+def run_sequential(config: Dict[str, Any], frames: List[np.ndarray]) -> Dict[str, Any]:
+    """The loop of test_video.py: every stage in turn on the calling thread."""
+    from app.common.utils.image import crop_images
+
+    detector, tracker = build_detector(config), build_tracker()
+    timings = {"detect": 0.0, "track": 0.0, "face": 0.0}
+
+    with build_extractor(config) as extractor:
+        start = time.perf_counter()
+        for frame in frames:
+            t0 = time.perf_counter()
+            detections = detector.inference(frame=frame)
+            t1 = time.perf_counter()
+            tracks = tracker.inference(detections=detections, frame=frame)
+            t2 = time.perf_counter()
+            if len(tracks):
+                crops, _ = crop_images(image=frame, boxes=tracks)
+                extractor.inference_batch(crops=crops)
+            t3 = time.perf_counter()
+            timings["detect"] += t1 - t0
+            timings["track"] += t2 - t1
+            timings["face"] += t3 - t2
+        elapsed = time.perf_counter() - start
+
+    return {
+        "elapsed": elapsed,
+        "stage_latency_ms": {
+            stage: 1000 * total / len(frames) for stage, total in timings.items()
+        },
+    }
+
+
+def _run_pipeline(config: Dict[str, Any], frames: List[np.ndarray], **kwargs):
+    from app.pipeline import FramePacket, build_video_pipeline
+
+    packets = (FramePacket(index=idx, frame=frame) for idx, frame in enumerate(frames))
+    with build_extractor(config) as extractor:
+        if kwargs.pop("face_cache", False):
+            from app.modules.face_detect.cache import CachedFaceExtractor
+
+            extractor = CachedFaceExtractor(extractor)
+        pipeline = build_video_pipeline(
+            source=packets,
+            detector=build_detector(config),
+            tracker=build_tracker(),
+            extractor=extractor,
+            sink=lambda packet: None,
+            **kwargs,
+        )
+        stats = pipeline.run()
+
+    result = {
+        "elapsed": stats["elapsed"],
+        "stage_latency_ms": {
+            stage: values["latency_ms"] for stage, values in stats["stages"].items()
+        },
+    }
+    if "tracking" in stats:
+        result["tracking"] = stats["tracking"]
+    return result
+
+
+def run_pipeline(config: Dict[str, Any], frames: List[np.ndarray]) -> Dict[str, Any]:
+    """The threaded app.pipeline, one worker per stage."""
+    return _run_pipeline(config, frames)
+
+
+def run_pipeline_cache(config: Dict[str, Any], frames: List[np.ndarray]):
+    """The threaded pipeline with the per-track face result cache."""
+    return _run_pipeline(config, frames, face_cache=True)
+
+
+def run_pipeline_stride(config: Dict[str, Any], frames: List[np.ndarray]):
+    """The threaded pipeline detecting every third frame."""
+    return _run_pipeline(config, frames, detect_stride=3)
+
+
+SCENARIOS: Dict[str, Callable[[Dict[str, Any], List[np.ndarray]], Dict[str, Any]]] = {
+    "sequential": run_sequential,
+    "pipeline": run_pipeline,
+    "pipeline_cache": run_pipeline_cache,
+    "pipeline_stride": run_pipeline_stride,
+}
+
+
+def _run_scenario(name: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    frames = load_frames(config["frames_source"], config["frames"])
+    result = SCENARIOS[name](config, frames)
+    result["frames"] = len(frames)
+    result["fps"] = len(frames) / result["elapsed"] if result["elapsed"] else 0.0
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    return result
+
+
+def run_benchmarks(config: Dict[str, Any], scenarios: List[str]) -> Dict[str, Any]:
+    """
+    Runs the scenarios against a stub insightface server.
+
+    Args:
+        config: The benchmark settings, see `parse_args`.
+        scenarios: The names of the scenarios to run.
+
+    Returns:
+        A JSON-serializable report with the settings, the environment and, per
+        scenario, its fps, per-stage latency, requests per frame and peak RSS.
+    """
+    report = {
+        "config": dict(config),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "scenarios": {},
+    }
+    with StubInsightFaceServer(
+        latency=config["latency_ms"] / 1000,
+        latency_per_image=config["latency_per_image_ms"] / 1000,
+    ) as server:
+        config = {**config, "url": server.url}
+        ctx = mp.get_context("spawn")
+        for name in scenarios:
+            server.reset()
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+                result = executor.submit(_run_scenario, name, config).result()
+            stats = server.stats()
+            result["requests"] = stats["requests"]
+            result["requests_per_frame"] = stats["requests"] / result["frames"]
+            result["bytes_sent_per_frame"] = stats["bytes_received"] / result["frames"]
+            report["scenarios"][name] = result
+            print(
+                f"{name:>16}: {result['fps']:7.1f} fps, "
+                f"{result['requests_per_frame']:.2f} req/frame, "
+                f"{result['peak_rss_mb']:.0f} MB"
+            )
+    return report
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS)
+    )
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument(
+        "--frames-source", choices=["synthetic", "examples"], default="synthetic"
+    )
+    parser.add_argument(
+        "--people", type=int, default=8, help="People per synthetic frame."
+    )
+    parser.add_argument(
+        "--detector", choices=["synthetic", "yolo"], default="synthetic"
+    )
+    parser.add_argument("--model-path", default="./weights/yolo11n.pt")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--latency-per-image-ms", type=float, default=2.0)
+    parser.add_argument("--msgpack", action="store_true")
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    config = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in ("scenarios", "output")
+    }
+    report = run_benchmarks(config, args.scenarios)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
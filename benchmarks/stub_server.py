@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+import msgpack
+import numpy as np
+
+
+def _fake_face(binary: bool) -> dict:
+    vec = np.linspace(-1, 1, 512, dtype=np.float32)
+    return {
+        "prob": 0.99,
+        "bbox": [10, 8, 42, 48],
+        "landmarks": [[18, 22], [34, 22], [26, 30], [20, 38], [32, 38]],
+        "vec": vec.tobytes() if binary else vec.tolist(),
+        "age": 30,
+        "gender": 0,
+        "mask": False,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _send(self, body: bytes, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("content-type", content_type)
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self._send(json.dumps(self.server.stats()).encode(), "application/json")
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("content-length", 0)))
+        binary = "msgpack" in self.headers.get("content-type", "")
+        payload = msgpack.unpackb(body, raw=False) if binary else json.loads(body)
+        images = payload["images"]["data"]
+
+        time.sleep(self.server.latency + self.server.latency_per_image * len(images))
+        self.server.count(len(images), len(body))
+
+        data = {
+            "data": [{"status": "ok", "faces": [_fake_face(binary)]} for _ in images]
+        }
+        if binary or payload.get("msgpack"):
+            self._send(msgpack.packb(data, use_bin_type=True), "application/msgpack")
+        else:
+            self._send(json.dumps(data).encode(), "application/json")
+
+
+class StubInsightFaceServer(ThreadingHTTPServer):
+    """
+    A local HTTP server mimicking the insightface `/extract` API with a configurable
+    latency. Every image gets one fake face; requests, images and bytes are counted.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.02,
+        latency_per_image: float = 0.002,
+    ) -> None:
+        """
+        Initializes the server. It is not serving until `start` is called.
+
+        Args:
+            host: The interface to bind.
+            port: The port to bind. 0 picks a free one.
+            latency: The fixed delay, in seconds, of every request.
+            latency_per_image: The additional delay, in seconds, per image.
+        """
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.latency_per_image = latency_per_image
+        self._lock = threading.Lock()
+        self._thread = None
+        self.reset()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/extract"
+
+    def count(self, images: int, nbytes: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.images += images
+            self.bytes_received += nbytes
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "images": self.images,
+                "bytes_received": self.bytes_received,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.images = 0
+            self.bytes_received = 0
+
+    def start(self) -> "StubInsightFaceServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
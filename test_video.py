@@ -2,13 +2,13 @@ import cv2
 import time
 
 from app.modules import FaceInsightExtractor, PersonDetect, Tracking
+from app.modules.tracking.state import TrackStateStore
 
 from app.common.utils.image import (
-    adjust_bbox,
-    adjust_landmarks,
     xyxy_to_xywh,
     draw_bounding_box,
-    crop_image,
+    face_to_frame,
+    crop_images,
 )
 
 
@@ -30,7 +30,8 @@ def test_video(video_path: str = ""):
 
     # Performance tracking
     start_time = time.time()
-    track_counter = {}
+    track_states = TrackStateStore()
+    frame_idx = 0
 
     while cap.isOpened():
         success, frame = cap.read()
@@ -44,29 +45,29 @@ def test_video(video_path: str = ""):
 
         # Process each tracked person
         if len(track_resp) != 0:
-            for resp in track_resp:
-                person_frame = crop_image(
-                    image=frame, bbox=resp[:4]
-                )  # Crop using track_resp
-
-                # Extract face insights
-                face_resp = insightface.inference(frame=person_frame)
+            # Crop every tracked person and extract face insights in one request
+            person_frames, _ = crop_images(image=frame, boxes=track_resp)
+            face_resps = insightface.inference_batch(crops=person_frames)
+
+            # Update track information
+            track_states.update(
+                track_resp,
+                frame_idx,
+                faces=face_resps,
+                active_ids=tracker.active_ids(),
+            )
+
+            for resp, face_resp in zip(track_resp, face_resps):
                 if face_resp:
                     face_resp = face_resp[0]
 
-                    # Adjust bounding box and landmarks (if available)
-                    bbox = face_resp.get("bbox")
-                    bbox = adjust_bbox(resp[:4], bbox)
-                    landmarks = face_resp.get("landmarks")
-                    landmarks = adjust_landmarks(landmarks, bbox)
+                    # Map bounding box and landmarks (if available) to the frame
+                    bbox, landmarks = face_to_frame(face_resp, resp)
 
                     # Create caption (optional)
                     face_detection_prob = "{:.3f}".format(float(face_resp.get("prob")))
                     caption = f"Track ID: {int(resp[4])}-Face Detection Rate: {str(face_detection_prob)}"
 
-                    # Update track information
-                    track_counter[resp[4]] = (bbox, landmarks, caption)
-
                     # Draw bounding box and landmarks (if available)
                     if bbox:
                         frame = draw_bounding_box(
@@ -80,6 +81,7 @@ def test_video(video_path: str = ""):
 
         if cv2.waitKey(1) & 0xFF == ord("q"):
             break
+        frame_idx += 1
 
     cap.release()
     cv2.destroyAllWindows()
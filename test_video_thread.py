@@ -1,134 +1,103 @@
-import cv2
 import time
-import threading
-from queue import Queue
-from app.modules import FaceInsightExtractor, PersonDetect, Tracking
+
+import cv2
+
 from app.common.utils.image import (
-    adjust_bbox,
-    adjust_landmarks,
-    xyxy_to_xywh,
     draw_bounding_box,
-    crop_image,
+    face_to_frame,
+    xyxy_to_xywh,
+)
+from app.core.config import Settings
+from app.modules import FaceInsightExtractor, PersonDetect, Tracking
+from app.modules.face_detect.roi import FaceRoiExtractor
+from app.modules.tracking.state import TrackStateStore
+from app.pipeline import (
+    KEEP_LATEST,
+    FramePacket,
+    QualityController,
+    build_video_pipeline,
 )
 
 # Initialize models
+settings = Settings()
 model = PersonDetect(model_path="./weights/yolo11n.pt")
 tracker = Tracking()
-insightface = FaceInsightExtractor()
-track_counter = {}
-
-
-def capture_frames(video_path: str, frame_queue, stop_event):
-    cap = cv2.VideoCapture(video_path or 0)
-    while cap.isOpened() and not stop_event.is_set():
-        success, frame = cap.read()
-        if not success:
-            break
-        if not frame_queue.full():
-            frame_queue.put(frame)
-        else:
-            time.sleep(0.01)  # Avoid spinning
-
-    cap.release()
-    stop_event.set()
-
-
-def process_frames(frame_queue, result_queue, stop_event):
-    while not stop_event.is_set():
-        frame = frame_queue.get()  # Wait for frames
-
-        # Detect people
-        person_boxes = model.inference(frame=frame)
-
-        track_resp = tracker.inference(detections=person_boxes, frame=frame)
-
-        # Process each tracked person
-        if len(track_resp) != 0:
-            for resp in track_resp:
-                person_frame = crop_image(
-                    image=frame, bbox=resp[:4]
-                )  # Crop using track_resp
-
-                # Extract face insights
-                face_resp = insightface.inference(frame=person_frame)
-                if face_resp:
-                    face_resp = face_resp[0]
-
-                    # Adjust bounding box and landmarks (if available)
-                    bbox = face_resp.get("bbox")
-                    bbox = adjust_bbox(resp[:4], bbox)
-                    landmarks = face_resp.get("landmarks")
-                    landmarks = adjust_landmarks(landmarks, bbox)
-
-                    # Create caption (optional)
-                    face_detection_prob = "{:.3f}".format(float(face_resp.get("prob")))
-                    caption = f"Track ID: {int(resp[4])}-Face Detection Rate: {str(face_detection_prob)}"
-
-                    # Update track information
-                    track_counter[resp[4]] = (bbox, landmarks, caption)
-
-                    # Draw bounding box and landmarks (if available)
-                    if bbox:
-                        frame = draw_bounding_box(
-                            frame, xyxy_to_xywh(bbox), caption=caption
-                        )
-        # Put processed frame into the result queue
-        if not result_queue.full():
-            result_queue.put(frame)
-
-
-def display_frames(result_queue, stop_event):
-    while not stop_event.is_set():
-        frame = result_queue.get()  # Wait for frames
-        cv2.imshow("Tracking Person and Get Face Info", frame)
-
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            stop_event.set()
-            break
-
-    cv2.destroyAllWindows()
+# Only the head region of each person is sent, so the controller can downsize it
+insightface = FaceRoiExtractor(
+    FaceInsightExtractor(),
+    head_ratio=settings.FACE_ROI_HEAD_RATIO,
+    max_side=settings.FACE_ROI_MAX_SIDE,
+)
+track_states = TrackStateStore()
 
 
-def main(
-    video_path: str,
-    frame_queue: Queue,
-    result_queue: Queue,
-    stop_event: threading.Event,
-):
-    start_time = time.time()
+def display_frame(packet: FramePacket, pipeline) -> None:
+    frame = packet.frame
 
-    capture_thread = threading.Thread(
-        target=capture_frames, args=(video_path, frame_queue, stop_event)
-    )
-    process_thread = threading.Thread(
-        target=process_frames, args=(frame_queue, result_queue, stop_event)
-    )
-    display_thread = threading.Thread(
-        target=display_frames, args=(result_queue, stop_event)
+    # Update track information
+    track_states.update(
+        packet.tracks,
+        packet.index,
+        faces=packet.faces,
+        active_ids=tracker.active_ids(),
     )
 
-    capture_thread.start()
-    process_thread.start()
-    display_thread.start()
+    for resp, face_resp in zip(packet.tracks, packet.faces):
+        if not face_resp:
+            continue
+        face_resp = face_resp[0]
+
+        # Map bounding box and landmarks (if available) to the frame
+        bbox, landmarks = face_to_frame(face_resp, resp)
+
+        # Create caption (optional)
+        face_detection_prob = "{:.3f}".format(float(face_resp.get("prob")))
+        caption = (
+            f"Track ID: {int(resp[4])}-Face Detection Rate: {str(face_detection_prob)}"
+        )
+
+        # Draw bounding box and landmarks (if available)
+        if bbox:
+            frame = draw_bounding_box(frame, xyxy_to_xywh(bbox), caption=caption)
+
+    cv2.imshow("Tracking Person and Get Face Info", frame)
+
+    if cv2.waitKey(1) & 0xFF == ord("q"):
+        pipeline.stop()
 
-    capture_thread.join()
-    process_thread.join()
-    display_thread.join()
+
+def main(video_path: str, queue_size: int = 10):
+    start_time = time.time()
+
+    # Degrade the detection and the face lookups instead of dropping frames
+    controller = None
+    if settings.TARGET_LATENCY_MS > 0:
+        controller = QualityController(
+            settings.TARGET_LATENCY_MS / 1000, detector=model, face_roi=insightface
+        )
+
+    pipeline = build_video_pipeline(
+        source=video_path or 0,
+        detector=model,
+        tracker=tracker,
+        extractor=insightface,
+        sink=lambda packet: display_frame(packet, pipeline),
+        queue_size=queue_size,
+        sink_policy=KEEP_LATEST,
+        detect_stride=settings.DETECT_STRIDE,
+        adaptive_stride=settings.DETECT_ADAPTIVE,
+        motion_threshold=settings.DETECT_MOTION_THRESHOLD,
+        controller=controller,
+    )
+    stats = pipeline.run()
+    cv2.destroyAllWindows()
 
     print(f"Total processing time: {time.time() - start_time}")
+    print(stats)
 
 
 if __name__ == "__main__":
-    frame_queue = Queue(maxsize=10)
-    result_queue = Queue(maxsize=10)
-    stop_event = threading.Event()
-
-    main(
-        video_path="./examples/videos/face_detection.mp4",
-        frame_queue=frame_queue,
-        result_queue=result_queue,
-        stop_event=stop_event,
-    )
+    main(video_path="./examples/videos/face_detection.mp4")
 
 
 """